@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# async_document.py - asyncio front end to PdfDocument
+
+# Opening a document and resolving objects means blocking open(), seek() and
+# read() calls. Calling them from a coroutine would stall the event loop, so
+# AsyncPdfDocument runs them in a bounded thread pool, and many documents can
+# be inspected concurrently by one process.
+#
+#     async with AsyncPdfDocument(filepath) as doc:
+#         root = await doc.deref(doc.trailer.data['Root'])
+#         async for page in doc.pages():
+#             ...
+
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from document import PdfDocument
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# The file I/O thread pool
+#-------------------------------------------------------------------------------
+
+# Shared by all the documents that aren't given their own executor. The number
+# of threads bounds the number of blocking calls in progress at any time.
+io_workers = 8
+_executor = None
+
+def get_executor():
+    """Return the shared file I/O thread pool, creating it if needed."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=io_workers,
+                                       thread_name_prefix='pdf-io')
+    return _executor
+
+#-------------------------------------------------------------------------------
+# class AsyncPdfDocument
+#-------------------------------------------------------------------------------
+
+class AsyncPdfDocument:
+    """A PdfDocument whose blocking operations run in a thread pool."""
+
+    # Objects are resolved this many at a time by the async iterators, so that
+    # each trip to the thread pool does a useful amount of work.
+    batch_sz = 64
+
+    def __init__(self, filepath, executor=None):
+        self.doc = PdfDocument(filepath)
+        self.executor = executor or get_executor()
+
+    @property
+    def trailer(self):
+        return self.doc.trailer
+
+    async def _run(self, func, *args):
+        """Run func(*args) in the thread pool."""
+        # Each thread of the pool reads through its own cursor, so operations
+        # on the same document can be in progress at the same time
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    #---------------------------------------------------------------------------
+    # open, close
+    #---------------------------------------------------------------------------
+
+    async def open(self):
+        """Open the file, read the trailer and the cross-reference section."""
+        await self._run(self.doc.open)
+
+    async def close(self):
+        await self._run(self.doc.close)
+
+    #---------------------------------------------------------------------------
+    # get_object, deref
+    #---------------------------------------------------------------------------
+
+    async def get_object(self, objn, gen=0):
+        """Return the object defined with number objn, None if not found."""
+        return await self._run(self.doc.get_object, objn, gen)
+
+    async def deref(self, o):
+        """Return the object referenced by 'o', or 'o' itself if direct."""
+        return await self._run(self.doc.deref, o)
+
+    #---------------------------------------------------------------------------
+    # objects, pages
+    #---------------------------------------------------------------------------
+
+    def _get_objects(self, objns):
+        return [(objn, gen, self.doc.get_object(objn, gen))
+                for objn, gen in objns]
+
+    async def objects(self):
+        """Yield (objn, gen, PdfObject) for every object in use."""
+        objns = await self._run(self.doc.object_numbers)
+        for k in range(0, len(objns), self.batch_sz):
+            batch = await self._run(self._get_objects,
+                                    objns[k:k + self.batch_sz])
+            for x in batch:
+                yield x
+
+    def _next_pages(self, it):
+        return [p for _, p in zip(range(self.batch_sz), it)]
+
+    async def pages(self):
+        """Yield the page dictionaries, in order."""
+        # The page tree is walked in the thread pool, a batch at a time
+        it = self.doc.pages()
+        while True:
+            batch = await self._run(self._next_pages, it)
+            for p in batch:
+                yield p
+            if len(batch) < self.batch_sz:
+                return
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    print('This module is not meant to be executed directly.')
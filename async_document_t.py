@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# async_document_t.py
+
+import asyncio
+import os
+import unittest
+from async_document import AsyncPdfDocument
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class AsyncPdfDocumentTest(unittest.TestCase):
+    """Test the asyncio front end."""
+
+    path = 't'
+
+    def test01(self):
+        """Open, deref, iterate over objects and pages."""
+        filepath = os.path.join(AsyncPdfDocumentTest.path, 'doc01.pdf')
+
+        async def inspect():
+            async with AsyncPdfDocument(filepath) as doc:
+                root = await doc.deref(doc.trailer.data['Root'])
+                objns = [objn async for objn, gen, o in doc.objects()]
+                pages = [p async for p in doc.pages()]
+                return root, objns, pages
+
+        root, objns, pages = asyncio.run(inspect())
+        self.assertEqual(b'Catalog', root.data['Type'].data)
+        self.assertEqual(list(range(1, 11)), objns)
+        self.assertEqual(2, len(pages))
+
+    def test02(self):
+        """Several documents inspected concurrently."""
+        filepaths = [os.path.join(AsyncPdfDocumentTest.path, name)
+                     for name in ['doc01.pdf', 'doc02.pdf']*4]
+
+        async def count_objects(filepath):
+            async with AsyncPdfDocument(filepath) as doc:
+                return len([o async for o in doc.objects()])
+
+        async def inspect_all():
+            return await asyncio.gather(*[count_objects(fp)
+                                          for fp in filepaths])
+
+        self.assertEqual([10, 10]*4, asyncio.run(inspect_all()))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
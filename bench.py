@@ -0,0 +1,744 @@
+#!/usr/bin/env python
+# bench.py - measure the throughput of the parsing layers
+
+# Usage: python bench.py [name ...]
+#
+# Each benchmark builds its own synthetic, well-formed input in memory, so the
+# numbers can be compared from one machine (or one commit) to another.
+
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from object_stream import EObject, ObjectStream, PdfObject, read_startxref
+from token_stream import EToken, TokenStream, PdfEOFError
+from push_token_stream import push_tokens
+from parallel_decode import decode_streams
+from document import DocumentCore, PdfDocument, Revision
+from metadata import metadata_batch
+from ndjson_export import export_ndjson
+from columnar_export import export_columns, read_columns
+from content_stream import content_operations
+from text_extract import extract_text
+import cmap
+from image_export import export_images_batch
+from dedup_index import DedupIndex
+from object_graph import reachability
+from page_report import page_report
+from name_index import NameIndex
+from corpus_watch import CorpusWatcher
+from scheduler import SizeScheduler, decoded_sizes, split_streams
+from byte_source import open_source
+
+#-------------------------------------------------------------------------------
+# Synthetic input
+#-------------------------------------------------------------------------------
+
+def make_objects(n):
+    """Return the bytes of 'n' well-formed indirect object definitions."""
+    parts = []
+    for i in range(1, n + 1):
+        parts.append(
+            b'%d 0 obj\r\n<</Type/Page/Parent 3 0 R/MediaBox[0 0 595.276 841.89]'
+            b'/Resources<</Font<</F1 %d 0 R/F2 %d 0 R>>/ProcSet[/PDF/Text]>>'
+            b'/Contents %d 0 R/Title(Page number %d)/ID<0a1b2c3d>>>\r\nendobj\r\n'
+            % (i, i + 1, i + 2, i + 3, i))
+    return b''.join(parts)
+
+def make_pdf(bodies):
+    """Return the bytes of a PDF file whose objects 1, 2, ... are 'bodies'.
+
+    Object 1 must be the catalog."""
+    out = bytearray(b'%PDF-1.4\r\n')
+    offsets = []
+    for i, body in enumerate(bodies, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\r\n%s\r\nendobj\r\n' % (i, body)
+    startxref = len(out)
+    out += b'xref\r\n0 %d\r\n0000000000 65535 f\r\n' % (len(bodies) + 1)
+    for offset in offsets:
+        out += b'%010d 00000 n\r\n' % offset
+    out += (b'trailer\r\n<</Size %d/Root 1 0 R>>\r\nstartxref\r\n%d\r\n%%%%EOF\r\n'
+            % (len(bodies) + 1, startxref))
+    return bytes(out)
+
+def make_image_streams(n, sz):
+    """Return the bodies of 'n' Flate image streams of 'sz' bytes each."""
+    rnd = random.Random(0)
+    bodies = [b'<</Type/Catalog>>']
+    for _ in range(n):
+        # Noisy, so that it doesn't compress too much
+        data = bytes(rnd.getrandbits(4)*16 for _ in range(sz))
+        zd = zlib.compress(data)
+        bodies.append(b'<</Subtype/Image/Filter/FlateDecode/Length %d>>'
+                      b'\r\nstream\r\n%s\r\nendstream' % (len(zd), zd))
+    return bodies
+
+#-------------------------------------------------------------------------------
+# timed - best of 'repeat' runs
+#-------------------------------------------------------------------------------
+
+def timed(func, repeat=3):
+    """Run func() 'repeat' times, return (best elapsed time, last result)."""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        res = func()
+        elapsed = time.perf_counter() - t0
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, res
+
+#-------------------------------------------------------------------------------
+# bench_objects - ObjectStream.next_object() on well-formed input
+#-------------------------------------------------------------------------------
+
+def bench_objects(n=2000):
+    data = make_objects(n)
+
+    def parse(strict):
+        ob = ObjectStream('<bench>', io.BytesIO(data), strict=strict)
+        cnt = 0
+        if strict:
+            try:
+                while True:
+                    ob.next_object()
+                    cnt += 1
+            except PdfEOFError:
+                pass
+        else:
+            while True:
+                o = ob.next_object()
+                if o.type == EObject.EOF:
+                    break
+                cnt += 1
+        return cnt
+
+    for strict in (False, True):
+        elapsed, cnt = timed(lambda: parse(strict))
+        mode = 'strict' if strict else 'default'
+        print(f'objects ({mode:7}): {cnt} objects, {len(data)} bytes,'
+              f' {cnt/elapsed:10,.0f} objects/s')
+
+#-------------------------------------------------------------------------------
+# bench_tokens - TokenStream (pull) against PushTokenStream (push)
+#-------------------------------------------------------------------------------
+
+def bench_tokens(n=2000, chunk_sz=4096):
+    data = make_objects(n)
+
+    def pull():
+        tk = TokenStream('<bench>', io.BytesIO(data))
+        cnt = 0
+        while tk.next_token().type != EToken.EOF:
+            cnt += 1
+        return cnt
+
+    def push():
+        chunks = (data[i:i+chunk_sz] for i in range(0, len(data), chunk_sz))
+        return sum(1 for _ in push_tokens(chunks)) - 1
+
+    for name, func in [('pull', pull), ('push', push)]:
+        elapsed, cnt = timed(func)
+        print(f'tokens  ({name:7}): {cnt} tokens, {len(data)} bytes,'
+              f' {cnt/elapsed:10,.0f} tokens/s')
+
+#-------------------------------------------------------------------------------
+# bench_decode - decode_streams() with different pools
+#-------------------------------------------------------------------------------
+
+def bench_decode(n=64, sz=256*1024):
+    data = make_pdf(make_image_streams(n, sz))
+    fd, filepath = tempfile.mkstemp(suffix='.pdf')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+
+    def decode(executor):
+        return sum(len(ds.data) for ds in decode_streams(filepath,
+                                                         executor=executor))
+
+    cpus = os.cpu_count()
+    try:
+        for name, ex in [('1 thread', ThreadPoolExecutor(1)),
+                         (f'{cpus} threads', ThreadPoolExecutor(cpus)),
+                         (f'{cpus} procs', ProcessPoolExecutor(cpus))]:
+            with ex:
+                elapsed, total = timed(lambda: decode(ex))
+            print(f'decode  ({name:9}): {n} streams, {len(data)} bytes,'
+                  f' {total/elapsed/2**20:8,.1f} MB/s decoded')
+    finally:
+        os.remove(filepath)
+
+#-------------------------------------------------------------------------------
+# bench_lazy - looking up a few keys, in eager and lazy documents
+#-------------------------------------------------------------------------------
+
+def bench_lazy(n=200, kids=2000):
+    # Catalog, a page tree root with many /Kids, and fonts with /Widths
+    bodies = [b'<</Type/Catalog/Pages 2 0 R>>',
+              b'<</Type/Pages/Count %d/Kids[%s]>>'
+              % (kids, b' '.join(b'%d 0 R' % (i + 3) for i in range(kids)))]
+    widths = b' '.join(b'%d' % (500 + i % 300) for i in range(224))
+    for i in range(n):
+        bodies.append(b'<</Type/Font/Subtype/TrueType/BaseFont/Font%d'
+                      b'/FirstChar 32/LastChar 255/Widths[%s]'
+                      b'/FontDescriptor<</Flags 32/FontBBox[-500 -300 1200 900]'
+                      b'/ItalicAngle 0/Ascent 900/Descent -300>>>>' % (i, widths))
+    data = make_pdf(bodies)
+    fd, filepath = tempfile.mkstemp(suffix='.pdf')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+
+    def lookup(lazy):
+        with PdfDocument(filepath, lazy=lazy) as doc:
+            root = doc.get_object(1)
+            cnt = doc.deref(root.data['Pages']).data['Count'].data
+            names = [doc.get_object(objn).data['BaseFont'].data
+                     for objn in range(3, n + 3)]
+        return len(names) + 2
+
+    try:
+        for lazy in (False, True):
+            elapsed, cnt = timed(lambda: lookup(lazy))
+            mode = 'lazy' if lazy else 'eager'
+            print(f'lazy    ({mode:7}): {cnt} objects, {len(data)} bytes,'
+                  f' {cnt/elapsed:10,.0f} objects/s')
+    finally:
+        os.remove(filepath)
+
+#-------------------------------------------------------------------------------
+# bench_metadata - metadata_batch() over many files
+#-------------------------------------------------------------------------------
+
+def bench_metadata(n=500, pages=50):
+    bodies = [b'<</Type/Catalog/Pages 2 0 R/PageMode/UseNone>>',
+              b'<</Type/Pages/Count %d/Kids[%s]>>'
+              % (pages, b' '.join(b'%d 0 R' % (i + 4) for i in range(pages))),
+              b'<</Title(Benchmark)/Author(bench.py)/Producer(pdfgen)'
+              b"/CreationDate(D:20200401120000+02'00')>>"]
+    for i in range(pages):
+        bodies.append(b'<</Type/Page/Parent 2 0 R/MediaBox[0 0 595 842]>>')
+    data = make_pdf(bodies).replace(b'/Root 1 0 R>>', b'/Root 1 0 R/Info 3 0 R>>')
+    with tempfile.TemporaryDirectory() as tmp:
+        filepaths = []
+        for i in range(n):
+            filepaths.append(os.path.join(tmp, f'{i}.pdf'))
+            with open(filepaths[-1], 'wb') as f:
+                f.write(data)
+
+        elapsed, cnt = timed(lambda: sum(1 for md in metadata_batch(filepaths)
+                                         if md.page_count == pages))
+        print(f'metadata         : {cnt} files, {len(data)} bytes each,'
+              f' {cnt/elapsed:10,.0f} files/s')
+
+#-------------------------------------------------------------------------------
+# bench_ndjson - export_ndjson() of a file with pages, fonts and images
+#-------------------------------------------------------------------------------
+
+def bench_ndjson(n=500):
+    bodies = [b'<</Type/Catalog/Pages 2 0 R>>',
+              b'<</Type/Pages/Count %d/Kids[%s]>>'
+              % (n, b' '.join(b'%d 0 R' % (i + 3) for i in range(n)))]
+    widths = b' '.join(b'%d' % (500 + i % 300) for i in range(224))
+    for i in range(n):
+        bodies.append(b'<</Type/Page/Parent 2 0 R/MediaBox[0 0 595.276 841.89]'
+                      b'/Resources<</Font<</F1 %d 0 R>>>>/Title(Page %d)>>'
+                      % (n + 3, i))
+    bodies.append(b'<</Type/Font/Subtype/TrueType/BaseFont/Font'
+                  b'/FirstChar 32/LastChar 255/Widths[%s]>>' % widths)
+    bodies += make_image_streams(20, 64*1024)[1:]
+    data = make_pdf(bodies)
+    fd, filepath = tempfile.mkstemp(suffix='.pdf')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+
+    try:
+        with open(os.devnull, 'w') as out:
+            elapsed, cnt = timed(lambda: export_ndjson(filepath, out))
+        print(f'ndjson           : {cnt} objects, {len(data)} bytes,'
+              f' {cnt/elapsed:10,.0f} objects/s,'
+              f' {len(data)/elapsed*60/2**20:8,.1f} MB/min')
+    finally:
+        os.remove(filepath)
+
+#-------------------------------------------------------------------------------
+# bench_columns - export_columns() of many files, then read_columns()
+#-------------------------------------------------------------------------------
+
+def bench_columns(n=100, objs=500):
+    bodies = [b'<</Type/Catalog/Pages 2 0 R>>',
+              b'<</Type/Pages/Count %d/Kids[%s]>>'
+              % (objs, b' '.join(b'%d 0 R' % (i + 3) for i in range(objs)))]
+    for i in range(objs):
+        bodies.append(b'<</Type/Page/Parent 2 0 R/MediaBox[0 0 595 842]>>')
+    bodies += make_image_streams(10, 4096)[1:]
+    data = make_pdf(bodies)
+    with tempfile.TemporaryDirectory() as tmp:
+        filepaths = []
+        for i in range(n):
+            filepaths.append(os.path.join(tmp, f'{i}.pdf'))
+            with open(filepaths[-1], 'wb') as f:
+                f.write(data)
+        path = os.path.join(tmp, 'objects.col')
+
+        elapsed, cnt = timed(lambda: export_columns(filepaths, path))
+        print(f'columns, export  : {cnt} objects, {n} files,'
+              f' {cnt/elapsed:10,.0f} objects/s')
+        elapsed, cols = timed(lambda: read_columns(path, ['Type', 'size']))
+        print(f'columns, read    : {len(cols["size"])} rows, 2 columns,'
+              f' {len(cols["size"])/elapsed:10,.0f} rows/s')
+
+#-------------------------------------------------------------------------------
+# bench_content - content_operations() on a page of text and graphics
+#-------------------------------------------------------------------------------
+
+def make_content(lines):
+    """Return the bytes of a content stream with 'lines' lines of text."""
+    ops = [b'q 0.5 0 0 0.5 0 0 cm 0 0 1 rg 36 36 523 770 re f Q', b'BT']
+    for i in range(lines):
+        ops.append(b'/F%d 10 Tf 1 0 0 1 72 %d Tm [(Line)-250(%d, with some'
+                   b' text)-120(and a kerned \\(word\\))] TJ 0 -12 Td'
+                   b' (more text) Tj' % (i % 4, 800 - i % 60 * 12, i))
+    ops.append(b'ET')
+    return b'\n'.join(ops)
+
+def bench_content(lines=20000):
+    data = make_content(lines)
+    elapsed, cnt = timed(lambda: sum(1 for _ in content_operations(data)))
+    print(f'content          : {cnt} operations, {len(data)} bytes,'
+          f' {cnt/elapsed:10,.0f} ops/s, {len(data)/elapsed/2**20:6,.1f} MB/s')
+
+#-------------------------------------------------------------------------------
+# bench_text - extract_text() of a document whose pages share two fonts
+#-------------------------------------------------------------------------------
+
+def bench_text(pages=200, lines=40):
+    cmap = (b'begincmap 1 begincodespacerange <00> <FF> endcodespacerange'
+            b' 1 beginbfrange <20> <7E> <0020> endbfrange endcmap')
+    bodies = [b'<</Type/Catalog/Pages 2 0 R>>',
+              b'<</Type/Pages/Count %d/Kids[%s]/Resources<</Font<</F0 3 0 R'
+              b'/F1 4 0 R>>>>>>'
+              % (pages, b' '.join(b'%d 0 R' % (6 + 2*i)
+                                  for i in range(pages))),
+              b'<</Type/Font/Subtype/Type1/BaseFont/Helvetica/FirstChar 32'
+              b'/Widths[%s]/Encoding/WinAnsiEncoding>>'
+              % b' '.join([b'500']*95),
+              b'<</Type/Font/Subtype/TrueType/BaseFont/Arial/ToUnicode 5 0 R>>',
+              b'<</Length %d>>\r\nstream\r\n%s\r\nendstream'
+              % (len(cmap), cmap)]
+    for i in range(pages):
+        zd = zlib.compress(make_content(lines).replace(b'/F2', b'/F0')
+                           .replace(b'/F3', b'/F1'))
+        bodies.append(b'<</Type/Page/Parent 2 0 R/Contents %d 0 R>>'
+                      % (7 + 2*i))
+        bodies.append(b'<</Filter/FlateDecode/Length %d>>\r\nstream\r\n%s'
+                      b'\r\nendstream' % (len(zd), zd))
+    data = make_pdf(bodies)
+    fd, filepath = tempfile.mkstemp(suffix='.pdf')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+
+    try:
+        elapsed, cnt = timed(lambda: sum(1 for _ in extract_text(filepath)))
+        print(f'text             : {cnt} pages, {lines} lines each,'
+              f' {cnt/elapsed:10,.0f} pages/s')
+    finally:
+        os.remove(filepath)
+
+#-------------------------------------------------------------------------------
+# bench_cmap - get_cmap() of a large ToUnicode CMap, compiled and cached
+#-------------------------------------------------------------------------------
+
+def bench_cmap(n=100, chars=2000):
+    lines = [b'1 begincodespacerange <0000> <FFFF> endcodespacerange']
+    for k in range(0, chars, 100):
+        lines.append(b'100 beginbfchar')
+        lines += [b'<%04X> <%04X>' % (i, 0x4e00 + i) for i in range(k, k + 100)]
+        lines.append(b'endbfchar')
+    data = zlib.compress(b'\n'.join(lines))
+    chain = [(b'FlateDecode', {})]
+
+    def cold():
+        for _ in range(n):
+            cmap.cmap_cache.clear()
+            cmap.get_cmap(data, chain)
+        return n
+
+    elapsed, cnt = timed(cold)
+    print(f'cmap, compiled   : {cnt} CMaps, {chars} codes each,'
+          f' {cnt/elapsed:10,.0f} CMaps/s')
+    elapsed, cnt = timed(lambda: sum(1 for _ in range(n*100)
+                                     if cmap.get_cmap(data, chain)))
+    print(f'cmap, cached     : {cnt} CMaps, {chars} codes each,'
+          f' {cnt/elapsed:10,.0f} CMaps/s')
+    cmap.cmap_cache.clear()
+
+#-------------------------------------------------------------------------------
+# bench_images - export_images_batch() of files full of JPEG and Flate images
+#-------------------------------------------------------------------------------
+
+def bench_images(n=20, images=20, sz=256*1024):
+    rnd = random.Random(0)
+    jpeg = (b'\xff\xd8\xff\xe0\x00\x10JFIF\x00'
+            + bytes(rnd.getrandbits(8) for _ in range(sz)) + b'\xff\xd9')
+    gray = zlib.compress(bytes(rnd.getrandbits(4)*16 for _ in range(sz)))
+    bodies = [b'<</Type/Catalog>>']
+    for i in range(images):
+        if i % 2:
+            d, data = b'/Filter/FlateDecode/ColorSpace/DeviceGray', gray
+        else:
+            d, data = b'/Filter/DCTDecode/ColorSpace/DeviceRGB', jpeg
+        bodies.append(b'<</Subtype/Image/Width 512/Height %d'
+                      b'/BitsPerComponent 8%s/Length %d>>'
+                      b'\r\nstream\r\n%s\r\nendstream'
+                      % (sz // 512, d, len(data), data))
+    data = make_pdf(bodies)
+    tmpdir = tempfile.mkdtemp()
+    filepaths = []
+    for i in range(n):
+        filepath = os.path.join(tmpdir, f'doc{i}.pdf')
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        filepaths.append(filepath)
+
+    def export():
+        return sum(len(images) for _, images in
+                   export_images_batch(filepaths, os.path.join(tmpdir, 'out')))
+
+    try:
+        elapsed, cnt = timed(export)
+        print(f'images           : {cnt} images, {n*len(data)} bytes,'
+              f' {cnt/elapsed:10,.0f} images/s,'
+              f' {n*len(data)/elapsed/2**20:8,.1f} MB/s')
+    finally:
+        shutil.rmtree(tmpdir)
+
+#-------------------------------------------------------------------------------
+# bench_dedup - index the streams of many files, half of them shared
+#-------------------------------------------------------------------------------
+
+def bench_dedup(n=50, streams=20, sz=256*1024):
+    rnd = random.Random(0)
+    shared = make_image_streams(streams // 2, sz)[1:]
+    tmpdir = tempfile.mkdtemp()
+    filepaths = []
+    total = 0
+    for i in range(n):
+        own = [b'<</Length %d>>\r\nstream\r\n%s\r\nendstream'
+               % (sz, bytes(rnd.getrandbits(8) for _ in range(sz // 64))*64)
+               for _ in range(streams // 2)]
+        data = make_pdf([b'<</Type/Catalog>>'] + shared + own)
+        filepath = os.path.join(tmpdir, f'doc{i}.pdf')
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        filepaths.append(filepath)
+        total += len(data)
+
+    def index(decoded):
+        path = os.path.join(tmpdir, 'index.db')
+        if os.path.exists(path):
+            os.remove(path)
+        with DedupIndex(path) as index:
+            for filepath in filepaths:
+                index.add_file(filepath, decoded)
+            return index.saved()
+
+    try:
+        for decoded in (False, True):
+            elapsed, saved = timed(lambda: index(decoded))
+            label = 'dedup, decoded' if decoded else 'dedup'
+            print(f'{label:17}:'
+                  f' {n*streams} streams, {total} bytes,'
+                  f' {total/elapsed/2**20:8,.1f} MB/s, {saved} bytes saved')
+    finally:
+        shutil.rmtree(tmpdir)
+
+#-------------------------------------------------------------------------------
+# bench_graph - reachability() of a file with many objects, some of them dead
+#-------------------------------------------------------------------------------
+
+def bench_graph(n=200000, fanout=100):
+    # A tree: the catalog, then nodes of 'fanout' kids each, down to leaves
+    # that reference each other; one leaf in ten is left out of the tree
+    bodies = [b'<</Type/Catalog/Pages 2 0 R>>']
+    nodes = n // fanout
+    bodies.append(b'<</Kids[%s]>>' % b' '.join(b'%d 0 R' % (3 + i)
+                                             for i in range(nodes)))
+    first_leaf = 3 + nodes
+    for i in range(nodes):
+        kids = [first_leaf + i*fanout + k for k in range(fanout)
+                if k % 10 != 9]
+        bodies.append(b'<</Kids[%s]>>' % b' '.join(b'%d 0 R' % k
+                                                   for k in kids))
+    for i in range(nodes*fanout):
+        bodies.append(b'<</Type/Leaf/Name(Leaf %d 0 R)/Next %d 0 R>>'
+                      % (i, first_leaf + (i + 10) % (nodes*fanout)))
+    data = make_pdf(bodies)
+    fd, filepath = tempfile.mkstemp(suffix='.pdf')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+
+    try:
+        elapsed, res = timed(lambda: reachability(filepath), repeat=1)
+        print(f'graph            : {res.objects} objects, {len(data)} bytes,'
+              f' {res.objects/elapsed:10,.0f} objects/s,'
+              f' {len(res.unreachable)} unreachable')
+    finally:
+        os.remove(filepath)
+
+#-------------------------------------------------------------------------------
+# bench_pages - page_report() of many pages sharing their resources
+#-------------------------------------------------------------------------------
+
+def bench_pages(n=5000, fonts=50):
+    # 1 catalog, 2 pages, 3 resources, 4.. fonts, then a page and its
+    # contents for each page
+    first = 4 + fonts
+    bodies = [b'<</Type/Catalog/Pages 2 0 R>>',
+              b'<</Type/Pages/Count %d/Kids[%s]/Resources 3 0 R>>'
+              % (n, b' '.join(b'%d 0 R' % (first + 2*i) for i in range(n))),
+              b'<</Font<<%s>>>>' % b''.join(b'/F%d %d 0 R' % (k, 4 + k)
+                                             for k in range(fonts))]
+    for k in range(fonts):
+        bodies.append(b'<</Type/Font/Subtype/Type1/BaseFont/F%d>>' % k)
+    for i in range(n):
+        content = b'BT /F%d 12 Tf (Page %d) Tj ET' % (i % fonts, i)
+        bodies.append(b'<</Type/Page/Parent 2 0 R/Contents %d 0 R>>'
+                      % (first + 2*i + 1))
+        bodies.append(b'<</Length %d>>\r\nstream\r\n%s\r\nendstream'
+                      % (len(content), content))
+    data = make_pdf(bodies)
+    fd, filepath = tempfile.mkstemp(suffix='.pdf')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+
+    def report():
+        core = DocumentCore(filepath, lazy=True)
+        core.open()
+        try:
+            return page_report(core)
+        finally:
+            core.close()
+
+    try:
+        elapsed, res = timed(report)
+        print(f'pages            : {len(res.pages)} pages, {len(data)} bytes,'
+              f' {len(res.pages)/elapsed:10,.0f} pages/s,'
+              f' sharing factor {res.sharing:.2f}')
+    finally:
+        os.remove(filepath)
+
+#-------------------------------------------------------------------------------
+# bench_names - NameIndex of many files, then queries over 100k files
+#-------------------------------------------------------------------------------
+
+def bench_names(n=200, files=100000, terms=2000):
+    data = make_pdf([b'<</Type/Catalog/Pages 2 0 R/OpenAction 3 0 R>>',
+                     b'<</Type/Pages/Kids[]/Count 0>>',
+                     b'<</S/JavaScript/JS(app.alert(1))>>']
+                    + make_image_streams(50, 1024)[1:])
+    tmpdir = tempfile.mkdtemp()
+    filepaths = []
+    for i in range(n):
+        filepath = os.path.join(tmpdir, f'doc{i}.pdf')
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        filepaths.append(filepath)
+
+    def index_files():
+        path = os.path.join(tmpdir, 'files.idx')
+        if os.path.exists(path):
+            os.remove(path)
+        with NameIndex(path) as index:
+            return index.add_files(filepaths)
+
+    # A synthetic corpus, term k is used by one file in k+1
+    rnd = random.Random(0)
+    names = [f'/Key{k}' for k in range(terms)]
+    corpus = [(f'file{i}.pdf', {names[k] for k in range(0, terms, 7)
+                                if rnd.randrange(k + 1) == 0})
+              for i in range(files)]
+
+    try:
+        elapsed, cnt = timed(index_files)
+        print(f'names, index     : {cnt} files, {n*len(data)} bytes,'
+              f' {cnt/elapsed:10,.0f} files/s')
+        path = os.path.join(tmpdir, 'corpus.idx')
+        with NameIndex(path) as index:
+            for k in range(0, files, files // 10):
+                index.add_names(corpus[k:k + files // 10])
+        sz = os.path.getsize(path)
+
+        def query():
+            with NameIndex(path) as index:
+                return (len(index.files_with('/Key0'))
+                        + len(index.files_with_any(['/Key7', '/Key14']))
+                        + len(index.files_with_all(['/Key0', '/Key7'])))
+
+        elapsed, cnt = timed(query)
+        print(f'names, query     : {files} files, {sz} bytes,'
+              f' {elapsed*1000:8,.1f} ms for 3 queries')
+    finally:
+        shutil.rmtree(tmpdir)
+
+#-------------------------------------------------------------------------------
+# bench_watch - CorpusWatcher.refresh() of a directory, then of a few changes
+#-------------------------------------------------------------------------------
+
+def bench_watch(n=1000, changed=10):
+    data = make_pdf([b'<</Type/Catalog>>'] + make_image_streams(20, 4096)[1:])
+    tmpdir = tempfile.mkdtemp()
+    pdfdir = os.path.join(tmpdir, 'pdf')
+    os.mkdir(pdfdir)
+    filepaths = []
+    for i in range(n):
+        filepath = os.path.join(pdfdir, f'doc{i}.pdf')
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        filepaths.append(filepath)
+
+    try:
+        with CorpusWatcher(pdfdir, os.path.join(tmpdir, 'stats.db')) as w:
+            elapsed, changes = timed(w.refresh, repeat=1)
+            print(f'watch, full      : {len(changes.added)} files,'
+                  f' {len(changes.added)/elapsed:10,.0f} files/s')
+
+            def touch():
+                for filepath in filepaths[:changed]:
+                    with open(filepath, 'ab') as f:
+                        f.write(b'\n')
+                return w.refresh()
+
+            elapsed, changes = timed(touch)
+            print(f'watch, changes   : {len(changes.changed)} of {n} files,'
+                  f' {elapsed*1000:8,.1f} ms')
+    finally:
+        shutil.rmtree(tmpdir)
+
+def bench_schedule(n=200, large=400, workers=4):
+    # Many small files, and one large file, listed last
+    small = make_pdf(make_image_streams(2, 64*1024))
+    big = make_pdf(make_image_streams(large, 64*1024))
+    tmpdir = tempfile.mkdtemp()
+    filepaths = []
+    for i, data in enumerate([small]*n + [big]):
+        filepath = os.path.join(tmpdir, f'doc{i:04}.pdf')
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        filepaths.append(filepath)
+    mb = (len(small)*n + len(big)) / 1e6
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            elapsed, _ = timed(lambda: list(executor.map(decoded_sizes,
+                                                         filepaths)),
+                               repeat=1)
+            print(f'schedule, naive  : {mb/elapsed:8,.1f} MB/s')
+
+            sched = SizeScheduler(decoded_sizes, workers=workers,
+                                  executor=executor,
+                                  split=lambda fp: split_streams(fp, workers),
+                                  split_sz=len(big))
+            elapsed, _ = timed(lambda: list(sched.run(filepaths)), repeat=1)
+            print(f'schedule, sized  : {mb/elapsed:8,.1f} MB/s')
+            print(f'                   {sched.report}')
+    finally:
+        shutil.rmtree(tmpdir)
+
+class CountingFileIO(io.FileIO):
+    """A raw file that counts the reads and seeks, the system calls."""
+
+    calls = 0
+
+    def readinto(self, b):
+        CountingFileIO.calls += 1
+        return super().readinto(b)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        CountingFileIO.calls += 1
+        return super().seek(offset, whence)
+
+def bench_blocks(n=20000, lookups=5000):
+    # Random object resolution, as deref_object() does it
+    rnd = random.Random(0)
+    bodies = [b'<</Type/Catalog>>'] + [b'<</Type/Font/Name/F%d/Widths[%s]>>'
+                                        % (i, b' '.join([b'500']*20))
+                                        for i in range(n)]
+    refs = [rnd.randrange(1, n + 1) for _ in range(lookups)]
+    # Mostly near each other, as the objects of a page are
+    refs = [r if i % 4 == 0 else min(n, refs[i - 1] + rnd.randrange(4))
+            for i, r in enumerate(refs)]
+    tmpdir = tempfile.mkdtemp()
+    filepath = os.path.join(tmpdir, 'objects.pdf')
+    with open(filepath, 'wb') as f:
+        f.write(make_pdf(bodies))
+
+    def resolve(f):
+        ob = ObjectStream(filepath, f, strict=True)
+        rev = Revision(read_startxref(f)[0])
+        rev.load(ob)
+        ob.xref_sec = rev.xref_sec
+        for objn in refs:
+            ob.deref_object(PdfObject(EObject.IND_OBJ_REF,
+                                      {'objn': objn, 'gen': 0}))
+
+    try:
+        def plain():
+            CountingFileIO.calls = 0
+            with io.BufferedReader(CountingFileIO(filepath)) as f:
+                resolve(f)
+            return CountingFileIO.calls
+
+        elapsed, calls = timed(plain)
+        print(f'blocks, file     : {lookups/elapsed:10,.0f} objects/s,'
+              f' {calls} syscalls')
+
+        def cached():
+            with open_source(filepath) as f:
+                resolve(f)
+                return f.source.source.reads, f.source.hit_rate()
+
+        elapsed, (calls, rate) = timed(cached)
+        print(f'blocks, cached   : {lookups/elapsed:10,.0f} objects/s,'
+              f' {calls} syscalls, hit rate {rate:.0%}')
+    finally:
+        shutil.rmtree(tmpdir)
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+benchmarks = {
+    'objects': bench_objects,
+    'tokens': bench_tokens,
+    'decode': bench_decode,
+    'lazy': bench_lazy,
+    'metadata': bench_metadata,
+    'ndjson': bench_ndjson,
+    'columns': bench_columns,
+    'content': bench_content,
+    'text': bench_text,
+    'cmap': bench_cmap,
+    'images': bench_images,
+    'dedup': bench_dedup,
+    'graph': bench_graph,
+    'pages': bench_pages,
+    'names': bench_names,
+    'watch': bench_watch,
+    'schedule': bench_schedule,
+    'blocks': bench_blocks,
+}
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(benchmarks)
+    for name in names:
+        if name not in benchmarks:
+            print(f'Unknown benchmark "{name}", choose from: '
+                  + ', '.join(benchmarks))
+            exit(-1)
+        benchmarks[name]()
@@ -0,0 +1,443 @@
+#!/usr/bin/env python
+# byte_source.py - where the bytes read by a ByteStream come from
+
+# ByteStream, ObjectStream and the others read a file object: seek(), tell()
+# and read(). Here the bytes come from a byte source, which only has to
+# read n bytes at an offset:
+#
+#     FileSource    a local file, with os.pread()
+#     MmapSource    a mapped file
+#     HttpSource    a remote file, with HTTP range requests
+#
+# and SourceFile turns a byte source into a file object, that can be handed
+# over to an ObjectStream.
+#
+# Resolving objects jumps around the file, and each jump would read a
+# ByteStream buffer from scratch: open_source() reads local files through a
+# BlockCache too, so that the blocks read recently are found in memory, and
+# the blocks that follow a sequential read are read ahead.
+#
+# A range request costs a round trip, so HttpSource is read through a
+# BlockCache: the file is read in aligned blocks, kept in an LRU cache, and
+# the consecutive blocks that are missing for a read are fetched with a
+# single request. The tail of the file, where the trailer and often the last
+# xref section are, is fetched at once, with the size of the file.
+#
+# To open a remote file touches a few KB of it, even if it weighs GB:
+#
+#     f = open_source('https://example.com/big.pdf')
+#     ob = ObjectStream('big.pdf', f, strict=True)
+#     trailer, offset = ob.get_tail()
+
+import http.client
+import os
+import re
+import sys
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# Byte sources: size(), read_at(offset, n), read_tail(n), close()
+#-------------------------------------------------------------------------------
+
+class FileSource:
+    """A local file."""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.fd = os.open(filepath, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        self.sz = os.fstat(self.fd).st_size
+        self.reads = 0       # calls to the OS
+        self.bytes_read = 0
+
+    def size(self):
+        return self.sz
+
+    def read_at(self, offset, n):
+        """Return up to n bytes at offset, fewer at the end of the file."""
+        self.reads += 1
+        if hasattr(os, 'pread'):
+            data = os.pread(self.fd, n, offset)
+        else:
+            # No pread() on Windows
+            os.lseek(self.fd, offset, os.SEEK_SET)
+            data = os.read(self.fd, n)
+        self.bytes_read += len(data)
+        return data
+
+    def read_into(self, offset, bufs):
+        """Fill the buffers in bufs with the bytes at offset, in one call,
+        return the number of bytes read."""
+        if not hasattr(os, 'preadv'):
+            # No preadv() on Windows or macOS < 11
+            data = self.read_at(offset, sum(len(b) for b in bufs))
+            k = 0
+            for b in bufs:
+                chunk = data[k:k + len(b)]
+                b[:len(chunk)] = chunk
+                k += len(b)
+            return len(data)
+        self.reads += 1
+        n = os.preadv(self.fd, bufs, offset)
+        self.bytes_read += n
+        return n
+
+    def read_tail(self, n):
+        """Return (the last n bytes, their offset)."""
+        start = max(0, self.sz - n)
+        return self.read_at(start, self.sz - start), start
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+class MmapSource:
+    """A mapped file, mmap or any bytes-like object."""
+
+    def __init__(self, mm):
+        self.mm = mm
+        self.reads = 0
+        self.bytes_read = 0
+
+    def size(self):
+        return len(self.mm)
+
+    def read_at(self, offset, n):
+        self.reads += 1
+        data = self.mm[offset:offset + n]
+        self.bytes_read += len(data)
+        return data
+
+    def read_tail(self, n):
+        start = max(0, len(self.mm) - n)
+        return self.read_at(start, len(self.mm) - start), start
+
+    def close(self):
+        # The mapping belongs to the caller
+        pass
+
+# Content-Range: bytes 0-1023/146515
+content_range_re = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+
+class HttpSource:
+    """A remote file, read with HTTP range requests on one connection."""
+
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f'not an http(s) URL: {url}')
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.path = parts.path or '/'
+        if parts.query:
+            self.path += '?' + parts.query
+        self.conn = None
+        self.sz = None
+        self.reads = 0       # requests
+        self.bytes_read = 0
+
+    def _request(self, method, headers):
+        """Return (status, headers, body) of a request, the connection is
+        opened again once if the server closed it."""
+        for attempt in (0, 1):
+            if self.conn is None:
+                cls = http.client.HTTPSConnection if self.scheme == 'https' \
+                    else http.client.HTTPConnection
+                self.conn = cls(self.netloc, timeout=self.timeout)
+            try:
+                self.conn.request(method, self.path, headers=headers)
+                resp = self.conn.getresponse()
+                if method == 'GET' and resp.status == 200:
+                    # The Range was ignored: don't download the whole file
+                    self.conn.close()
+                    self.conn = None
+                    return resp.status, resp.headers, b''
+                body = resp.read()
+            except (http.client.HTTPException, ConnectionError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+                continue
+            self.reads += 1
+            self.bytes_read += len(body)
+            return resp.status, resp.headers, body
+
+    def _ranged(self, spec):
+        """Return (body, first offset, file size) of a GET with Range spec."""
+        status, headers, body = self._request('GET', {'Range': spec})
+        if status == 416:
+            # Past the end of the file
+            return b'', self.sz, self.sz
+        if status != 206:
+            raise OSError(f'{self.url}: expecting 206 Partial Content,'
+                          f' got {status} (range requests not supported?)')
+        m = content_range_re.match(headers.get('Content-Range', ''))
+        if not m:
+            raise OSError(f'{self.url}: bad Content-Range header')
+        if m[3] != '*':
+            self.sz = int(m[3])
+        return body, int(m[1]), self.sz
+
+    def size(self):
+        if self.sz is None:
+            status, headers, _ = self._request('HEAD', {})
+            if status != 200 or 'Content-Length' not in headers:
+                raise OSError(f'{self.url}: can\'t get the size, {status}')
+            self.sz = int(headers['Content-Length'])
+        return self.sz
+
+    def read_at(self, offset, n):
+        if n <= 0 or (self.sz is not None and offset >= self.sz):
+            return b''
+        body, _, _ = self._ranged(f'bytes={offset}-{offset + n - 1}')
+        return body
+
+    def read_tail(self, n):
+        """Return (the last n bytes, their offset), and learn the size of the
+        file on the way, in one request."""
+        body, start, _ = self._ranged(f'bytes=-{n}')
+        return body, start
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+#-------------------------------------------------------------------------------
+# class BlockCache
+#-------------------------------------------------------------------------------
+
+class BlockCache:
+    """A byte source read in aligned blocks, kept in an LRU cache.
+
+    A read that misses the block after the last one read is sequential: the
+    blocks that follow it are read ahead, 1, 2, 4, ... up to max_readahead
+    blocks, and the window closes on the first random read. The consecutive
+    blocks missing for a read, readahead included, are read at once, with
+    read_into() (os.preadv()) if the source has it.
+    """
+
+    def __init__(self, source, blk_sz=64*1024, max_blocks=256,
+                 max_readahead=16):
+        self.source = source
+        self.blk_sz = blk_sz
+        self.max_blocks = max_blocks
+        self.max_readahead = max_readahead
+        self.blocks = OrderedDict()  # block number -> bytes, oldest first
+        self.tail_start = -1         # of the prefetched tail
+        self.tail = b''
+        self.next_blk = -1           # the block after the last one read
+        self.window = 0              # readahead, in blocks
+        self.hits = 0                # blocks found in the cache
+        self.misses = 0              # blocks read from the source
+        self.readahead = 0           # blocks read ahead of a sequential read
+        self.reads = 0               # reads from the source
+
+    def size(self):
+        return self.source.size()
+
+    def hit_rate(self):
+        """Return the fraction of the blocks found in the cache."""
+        cnt = self.hits + self.misses
+        return self.hits / cnt if cnt else 0.0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hit_rate(), 'readahead': self.readahead,
+                'reads': self.reads, 'cached': len(self.blocks)}
+
+    def prefetch_tail(self, n):
+        """Read the last n bytes of the file, in one go."""
+        self.tail, self.tail_start = self.source.read_tail(n)
+        self.reads += 1
+
+    def read_tail(self, n):
+        sz = self.size()
+        start = max(0, sz - n)
+        return self.read_at(start, sz - start), start
+
+    def _fetch(self, first, cnt):
+        """Read cnt blocks from block first, return them."""
+        bs = self.blk_sz
+        self.reads += 1
+        if hasattr(self.source, 'read_into'):
+            # Straight into the blocks, no copy
+            blocks = [bytearray(bs) for _ in range(cnt)]
+            n = self.source.read_into(first*bs, blocks)
+            for i, blk in enumerate(blocks):
+                if n < (i + 1)*bs:
+                    # The end of the file
+                    del blk[max(0, n - i*bs):]
+            return blocks
+        data = self.source.read_at(first*bs, cnt*bs)
+        return [data[i*bs:(i + 1)*bs] for i in range(cnt)]
+
+    def read_at(self, offset, n):
+        sz = self.size()
+        end = min(offset + n, sz)
+        if offset >= end:
+            return b''
+        if 0 <= self.tail_start <= offset:
+            self.hits += 1
+            return self.tail[offset - self.tail_start:end - self.tail_start]
+
+        bs = self.blk_sz
+        first, last = offset // bs, (end - 1) // bs
+        found = {}
+        missing = []
+        for k in range(first, last + 1):
+            blk = self.blocks.get(k)
+            if blk is None:
+                missing.append(k)
+            else:
+                self.blocks.move_to_end(k)
+                found[k] = blk
+        self.hits += len(found)
+        self.misses += len(missing)
+
+        if missing:
+            # Sequential if it goes on from the last block read, or from
+            # within it
+            if self.next_blk - 1 <= first <= self.next_blk:
+                self.window = min(max(1, 2*self.window), self.max_readahead)
+            else:
+                self.window = 0
+            if missing[-1] == last:
+                k = last + 1
+                nblocks = (sz + bs - 1) // bs
+                while (k <= last + self.window and k < nblocks
+                       and k not in self.blocks):
+                    missing.append(k)
+                    self.readahead += 1
+                    k += 1
+        self.next_blk = last + 1
+
+        # One read per run of consecutive missing blocks
+        i = 0
+        while i < len(missing):
+            j = i
+            while j + 1 < len(missing) and missing[j + 1] == missing[j] + 1:
+                j += 1
+            blocks = self._fetch(missing[i], j - i + 1)
+            for k, blk in zip(range(missing[i], missing[j] + 1), blocks):
+                self.blocks[k] = blk
+                if k <= last:
+                    found[k] = blk
+            i = j + 1
+        while len(self.blocks) > self.max_blocks:
+            self.blocks.popitem(last=False)
+
+        if first == last:
+            return bytes(memoryview(found[first])[offset - first*bs:
+                                                  end - first*bs])
+        data = b''.join(found[k] for k in range(first, last + 1))
+        return data[offset - first*bs:end - first*bs]
+
+    def close(self):
+        self.blocks.clear()
+        self.source.close()
+
+#-------------------------------------------------------------------------------
+# class SourceFile
+#-------------------------------------------------------------------------------
+
+class SourceFile:
+    """A read-only file object over a byte source, with its own position."""
+
+    def __init__(self, source):
+        self.source = source
+        self.pos = 0
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.pos
+        elif whence == os.SEEK_END:
+            offset += self.source.size()
+        self.pos = max(0, offset)
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def read(self, n=-1):
+        if n < 0:
+            n = max(0, self.source.size() - self.pos)
+        data = self.source.read_at(self.pos, n)
+        self.pos += len(data)
+        return data
+
+    def close(self):
+        self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+#-------------------------------------------------------------------------------
+# open_source
+#-------------------------------------------------------------------------------
+
+http_blk_sz = 64*1024
+http_tail_sz = 16*1024
+file_blk_sz = 16*1024
+file_max_blocks = 512
+
+def open_source(location, blk_sz=None, tail_sz=http_tail_sz):
+    """Return a SourceFile that reads location, a filepath or an http(s)
+    URL, through a BlockCache of blk_sz blocks. The last tail_sz bytes of a
+    remote file are read at once."""
+    if location.startswith(('http://', 'https://')):
+        source = BlockCache(HttpSource(location), blk_sz or http_blk_sz)
+        source.prefetch_tail(tail_sz)
+    else:
+        source = BlockCache(FileSource(location), blk_sz or file_blk_sz,
+                            file_max_blocks)
+    return SourceFile(source)
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print(f'Usage: {sys.argv[0]} <filepath or URL>')
+        exit(-1)
+    from document import Revision
+    from object_stream import ObjectStream, read_startxref
+    f = open_source(sys.argv[1])
+    try:
+        ob = ObjectStream(sys.argv[1], f, strict=True)
+        rev = Revision(read_startxref(f)[0])
+        rev.load(ob)
+        ob.xref_sec = rev.xref_sec
+        print(f'trailer: {rev.trailer}')
+        root = rev.trailer.data.get('Root')
+        if root is not None:
+            print(f'catalog: {ob.deref_object(root)}')
+        src = f.source
+        print(f'{src.source.reads} reads, {src.source.bytes_read} bytes of'
+              f' {src.size()}, {src.stats()}')
+    finally:
+        f.close()
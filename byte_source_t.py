@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# byte_source_t.py
+
+import functools
+import http.server
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+from byte_source import (BlockCache, FileSource, HttpSource, MmapSource,
+                         SourceFile, open_source)
+from document import Revision
+from object_stream import ObjectStream, read_startxref
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# A local stand-in for object storage: a directory served with Range support
+#-------------------------------------------------------------------------------
+
+class RangeHandler(http.server.SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        sz = os.path.getsize(path)
+        spec = self.headers.get('Range')
+        if spec is None:
+            self.send_response(200)
+            self.send_header('Content-Length', str(sz))
+            self.end_headers()
+            if body:
+                with open(path, 'rb') as f:
+                    self.wfile.write(f.read())
+            return
+        m = re.fullmatch(r'bytes=(\d*)-(\d*)', spec)
+        if m[1]:
+            start = int(m[1])
+            end = min(int(m[2]), sz - 1) if m[2] else sz - 1
+        else:
+            start, end = max(0, sz - int(m[2])), sz - 1
+        if start >= sz:
+            self.send_response(416)
+            self.send_header('Content-Range', f'bytes */{sz}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(206)
+        self.send_header('Content-Range', f'bytes {start}-{end}/{sz}')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        if body:
+            with open(path, 'rb') as f:
+                f.seek(start)
+                self.wfile.write(f.read(end - start + 1))
+
+    def do_GET(self):
+        self._send(True)
+
+    def do_HEAD(self):
+        self._send(False)
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    # Ignores Range, like a server that doesn't support it
+    def log_message(self, *args):
+        pass
+
+def serve(directory, handler):
+    """Start serving directory in a thread, return the server."""
+    server = http.server.ThreadingHTTPServer(
+        ('127.0.0.1', 0), functools.partial(handler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def big_pdf(pad_sz):
+    """Return a PDF file with a stream of pad_sz bytes before its xref."""
+    bodies = [b'<</Type/Catalog/Pages 2 0 R>>',
+              b'<</Type/Pages/Kids[]/Count 0>>',
+              b'<</Length %d>>\nstream\n%s\nendstream' % (pad_sz,
+                                                           b'x'*pad_sz)]
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for i, body in enumerate(bodies, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n%s\nendobj\n' % (i, body)
+    startxref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(bodies) + 1)
+    for offset in offsets:
+        out += b'%010d 00000 n \n' % offset
+    out += (b'trailer\n<</Size %d/Root 1 0 R>>\nstartxref\n%d\n%%%%EOF\n'
+            % (len(bodies) + 1, startxref))
+    return bytes(out)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class ByteSourceTest(unittest.TestCase):
+    """Test the byte sources, the block cache, and range requests."""
+
+    path = 't'
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test01(self):
+        """SourceFile reads like a file, from all the sources."""
+        filepath = os.path.join(ByteSourceTest.path, 'doc01.pdf')
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        for source in (FileSource(filepath), MmapSource(data),
+                       BlockCache(MmapSource(data), blk_sz=64)):
+            sf = SourceFile(source)
+            self.assertEqual(data[:10], sf.read(10))
+            self.assertEqual(data[10:500], sf.read(490))
+            self.assertEqual(len(data) - 20, sf.seek(-20, os.SEEK_END))
+            self.assertEqual(data[-20:], sf.read())
+            self.assertEqual(b'', sf.read(10))
+            sf.seek(100)
+            self.assertEqual(data[100:], sf.read(len(data)))
+            self.assertEqual((data[-30:], len(data) - 30),
+                             source.read_tail(30))
+            sf.close()
+
+    def test02(self):
+        """Blocks cached, consecutive misses read at once, LRU eviction."""
+        data = bytes(range(256))*16
+        source = MmapSource(data)
+        cache = BlockCache(source, blk_sz=256, max_blocks=4)
+        self.assertEqual(data[100:900], cache.read_at(100, 800))
+        self.assertEqual((1, 0, 4), (source.reads, cache.hits, cache.misses))
+
+        # Cached, no read
+        self.assertEqual(data[300:600], cache.read_at(300, 300))
+        self.assertEqual((1, 2), (source.reads, cache.hits))
+
+        # Blocks 4 and 5 evict blocks 0 and 3, the least recently used
+        self.assertEqual(data[1024:1500], cache.read_at(1024, 476))
+        self.assertEqual(2, source.reads)
+        self.assertEqual([1, 2, 4, 5], sorted(cache.blocks))
+
+        # Blocks 2 and 3: one hit, one miss
+        self.assertEqual(data[512:1000], cache.read_at(512, 488))
+        self.assertEqual(3, source.reads)
+
+        # The prefetched tail
+        cache.prefetch_tail(100)
+        reads = source.reads
+        self.assertEqual(data[-50:], cache.read_at(len(data) - 50, 500))
+        self.assertEqual(reads, source.reads)
+
+    def test03(self):
+        """Open a remote file: only its tail and the objects are fetched."""
+        data = big_pdf(4*1024*1024)
+        with open(os.path.join(self.tmp, 'big.pdf'), 'wb') as f:
+            f.write(data)
+        server = serve(self.tmp, RangeHandler)
+        try:
+            url = f'http://127.0.0.1:{server.server_port}/big.pdf'
+            f = open_source(url, blk_sz=16*1024, tail_sz=4*1024)
+            http_source = f.source.source
+            self.assertIsInstance(http_source, HttpSource)
+            self.assertEqual(len(data), f.source.size())
+
+            ob = ObjectStream(url, f, strict=True)
+            trailer, offset = ob.get_tail()
+            self.assertEqual(data.rfind(b'\nxref\n') + 1, offset)
+            self.assertEqual(4, trailer.data['Size'].data)
+
+            rev = Revision(read_startxref(f)[0])
+            rev.load(ob)
+            ob.xref_sec = rev.xref_sec
+            catalog = ob.deref_object(rev.trailer.data['Root'])
+            self.assertEqual(b'Catalog', bytes(catalog.data['Type'].data))
+            pages = ob.deref_object(catalog.data['Pages'])
+            self.assertEqual(0, pages.data['Count'].data)
+
+            # The tail, and a block at the start of the file
+            self.assertLessEqual(http_source.reads, 3)
+            self.assertLess(http_source.bytes_read, 64*1024)
+            f.close()
+
+            # Missing file, and past the end
+            with self.assertRaises(OSError):
+                open_source(url.replace('big', 'none'))
+            source = HttpSource(url)
+            self.assertEqual(len(data), source.size())
+            self.assertEqual(data[-5:], source.read_at(len(data) - 5, 100))
+            self.assertEqual(b'', source.read_at(len(data), 10))
+            source.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test04(self):
+        """A server that ignores Range is reported, not read in full."""
+        with open(os.path.join(self.tmp, 'doc.pdf'), 'wb') as f:
+            f.write(big_pdf(1000))
+        server = serve(self.tmp, QuietHandler)
+        try:
+            url = f'http://127.0.0.1:{server.server_port}/doc.pdf'
+            with self.assertRaises(OSError):
+                open_source(url)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test05(self):
+        """Sequential reads are read ahead, random reads aren't."""
+        data = os.urandom(256*1024)
+        filepath = os.path.join(self.tmp, 'data.bin')
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        source = FileSource(filepath)
+        cache = BlockCache(source, blk_sz=1024, max_blocks=1024,
+                           max_readahead=32)
+        sf = SourceFile(cache)
+        chunks = []
+        while True:
+            chunk = sf.read(500)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        self.assertEqual(data, b''.join(chunks))
+        # 1 + 1 + 2 + 4 + 8 + 16 + 32 + 32 + ... blocks per read
+        self.assertEqual(cache.reads, source.reads)
+        self.assertLess(source.reads, 16)
+        self.assertEqual(256, cache.misses + cache.readahead)
+        self.assertGreater(cache.hit_rate(), 0.9)
+
+        # A random read closes the window
+        cache = BlockCache(FileSource(filepath), blk_sz=1024)
+        self.assertEqual(data[5000:5100], cache.read_at(5000, 100))
+        self.assertEqual(data[90000:90100], cache.read_at(90000, 100))
+        self.assertEqual((0, 2, 2), (cache.readahead, cache.misses,
+                                     cache.reads))
+        self.assertEqual(data[91000:91100], cache.read_at(91000, 100))
+        self.assertEqual((1, 3), (cache.readahead, cache.reads))
+        self.assertEqual(data[92000:92100], cache.read_at(92000, 100))
+        self.assertEqual(3, cache.reads)
+        self.assertEqual({'hits': 1, 'misses': 3, 'hit_rate': 0.25,
+                          'readahead': 1, 'reads': 3, 'cached': 4},
+                         cache.stats())
+        cache.close()
+        source.close()
+
+if __name__ == '__main__':
+    unittest.main()
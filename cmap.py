@@ -0,0 +1,338 @@
+#!/usr/bin/env python
+# cmap.py - compiled CMaps, cached across documents
+
+# A CMap (PDF Spec, § 9.7.5 CMaps, and § 9.10.3 ToUnicode CMaps) maps the
+# character codes of a string to CIDs (an encoding CMap) or to unicode text (a
+# /ToUnicode CMap). Its syntax is that of a content stream:
+#
+#     1 begincodespacerange <0000> <FFFF> endcodespacerange
+#     2 beginbfchar <0003> <0020> <0011> <00660069> endbfchar
+#     1 beginbfrange <0024> <003D> <0041> endbfrange
+#     1 begincidrange <0000> <00FF> 0 endcidrange
+#
+# so it's parsed with content_operations(): the CMap operators are regular
+# character runs that TokenStream would only report as errors. The mappings
+# are compiled into lookup structures:
+#
+#     - single-byte codes: a dense list of 256 entries
+#     - multi-byte codes from bfchar/cidchar: a dict per code length (<01> and
+#       <0001> are different codes)
+#     - multi-byte ranges from bfrange/cidrange: a table per code length,
+#       sorted by the first code of each range, searched with bisect
+#
+# A CMap that is based on another one (usecmap) is compiled on top of it, if
+# it's one of the predefined CMaps, else CMapError is raised: a CMap without
+# its base would map only some of the codes.
+#
+# The same CMaps come up again and again, in document after document (the
+# ToUnicode CMaps of the common fonts, all the Identity ones). get_cmap()
+# keeps the compiled CMaps in a process-wide LRU cache, keyed by a hash of the
+# stream data, so that each one is parsed only once.
+
+import hashlib
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from content_stream import content_operations
+from filters import decode_stream
+from object_stream import EObject
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# Glyph names
+#-------------------------------------------------------------------------------
+
+# The glyph names found in /Differences arrays, beyond the ones that are a
+# single character, or uniXXXX (Adobe Glyph List, the usual part of it)
+glyph_names = {
+    'space': ' ', 'exclam': '!', 'quotedbl': '"', 'numbersign': '#',
+    'dollar': '$', 'percent': '%', 'ampersand': '&', 'quotesingle': "'",
+    'parenleft': '(', 'parenright': ')', 'asterisk': '*', 'plus': '+',
+    'comma': ',', 'hyphen': '-', 'period': '.', 'slash': '/', 'zero': '0',
+    'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5',
+    'six': '6', 'seven': '7', 'eight': '8', 'nine': '9', 'colon': ':',
+    'semicolon': ';', 'less': '<', 'equal': '=', 'greater': '>',
+    'question': '?', 'at': '@', 'bracketleft': '[', 'backslash': '\\',
+    'bracketright': ']', 'asciicircum': '^', 'underscore': '_', 'grave': '`',
+    'braceleft': '{', 'bar': '|', 'braceright': '}', 'asciitilde': '~',
+    'quoteleft': '‘', 'quoteright': '’', 'quotedblleft': '“',
+    'quotedblright': '”', 'endash': '–', 'emdash': '—',
+    'bullet': '•', 'ellipsis': '…', 'fi': 'fi', 'fl': 'fl',
+    'ff': 'ff', 'ffi': 'ffi', 'ffl': 'ffl', 'minus': '−',
+    'degree': '°', 'copyright': '©', 'registered': '®',
+    'trademark': '™', 'section': '§', 'paragraph': '¶',
+    'dagger': '†', 'daggerdbl': '‡', 'nbspace': ' ',
+    'eacute': 'é', 'egrave': 'è', 'agrave': 'à',
+    'ccedilla': 'ç', 'germandbls': 'ß', 'quotesinglbase': '‚',
+    'quotedblbase': '„', 'guillemotleft': '«',
+    'guillemotright': '»', 'Euro': '€',
+}
+
+uni_re = re.compile(r'(?:uni|u)([0-9A-Fa-f]{4,6})$')
+
+def glyph_unicode(name):
+    """Return the text of a glyph name, '' if unknown."""
+    name = name.split('.')[0]
+    if len(name) == 1:
+        return name
+    s = glyph_names.get(name)
+    if s is not None:
+        return s
+    m = uni_re.match(name)
+    if m:
+        try:
+            return chr(int(m.group(1), 16))
+        except ValueError:
+            pass
+    return ''
+
+#-------------------------------------------------------------------------------
+# class CMap
+#-------------------------------------------------------------------------------
+
+class CMapError(Exception):
+    """The CMap could not be compiled."""
+    pass
+
+def _utf16(b):
+    return bytes(b).decode('utf-16-be', errors='replace')
+
+def _incremented(s, i):
+    """Return text s, with its last code unit incremented i times."""
+    b = s.encode('utf-16-be')
+    if not b:
+        return s
+    v = (int.from_bytes(b[-2:], 'big') + i) & 0xffff
+    return _utf16(b[:-2] + v.to_bytes(2, 'big'))
+
+class CMap:
+    """A compiled CMap, mapping codes to text (str) or CIDs (int)."""
+
+    def __init__(self):
+        self.ranges = []           # (lo, hi) bytes of the code space ranges
+        self.code_len = None       # the code length, if there's only one
+        self.dense = [None]*256    # single-byte code -> value
+        # By code length n > 1
+        self.chars = {}            # n -> {code: value}
+        self.starts = {}           # n -> array, first code of each range
+        self.ends = {}             # n -> array, last code of each range
+        self.dst = {}              # n -> [int, str (incremented) or list]
+        self.usecmap = None        # the name of the base CMap
+        self.base = None           # the base CMap, looked up last
+
+    def lookup(self, code, n=2):
+        """Return the value of an n-byte code, None if it isn't mapped."""
+        if n == 1:
+            v = self.dense[code]
+            if v is not None:
+                return v
+        else:
+            chars = self.chars.get(n)
+            v = chars.get(code) if chars else None
+            if v is not None:
+                return v
+        starts = self.starts.get(n)
+        k = bisect_right(starts, code) - 1 if starts else -1
+        if k < 0 or code > self.ends[n][k]:
+            return self.base.lookup(code, n) if self.base else None
+        dst = self.dst[n][k]
+        i = code - starts[k]
+        if isinstance(dst, int):
+            return dst + i
+        if isinstance(dst, list):
+            return dst[i] if i < len(dst) else None
+        return _incremented(dst, i)
+
+    def codes(self, s):
+        """Yield the (code, length) of each character code of string s."""
+        n = self.code_len
+        if n is not None:
+            for i in range(0, len(s) - n + 1, n):
+                yield int.from_bytes(s[i:i+n], 'big'), n
+            return
+        i = 0
+        while i < len(s):
+            for lo, hi in self.ranges:
+                k = len(lo)
+                b = s[i:i+k]
+                if len(b) == k and all(l <= c <= h
+                                       for l, c, h in zip(lo, b, hi)):
+                    break
+            else:
+                # PDF Spec, § 9.7.6.3: not in the code space, use the length
+                # of the shortest range
+                k = len(self.ranges[0][0]) if self.ranges else 1
+            yield int.from_bytes(s[i:i+k], 'big'), k
+            i += k
+
+#-------------------------------------------------------------------------------
+# compile_cmap
+#-------------------------------------------------------------------------------
+
+def _value(o):
+    """The destination of a bfchar, bfrange, cidchar, cidrange."""
+    if o.type == EObject.STRING:
+        return _utf16(o.data)
+    if o.type == EObject.INTEGER:
+        return o.data
+    if o.type == EObject.NAME:
+        # A glyph name, found in old ToUnicode CMaps
+        return glyph_unicode(bytes(o.data).decode('latin-1'))
+    return None
+
+def compile_cmap(data):
+    """Parse the decoded data of a CMap stream, return a CMap.
+
+    Raise CMapError if it's based on a CMap that isn't predefined.
+    """
+    cm = CMap()
+    ranges = []  # (n, lo, hi, dst) of the multi-byte ranges
+
+    def add_range(lo, hi, n, dst):
+        if n == 1:
+            # Single-byte ranges go into the dense table, they're small
+            for i, code in enumerate(range(lo, min(hi, 255) + 1)):
+                if isinstance(dst, list):
+                    cm.dense[code] = dst[i] if i < len(dst) else None
+                elif isinstance(dst, int):
+                    cm.dense[code] = dst + i
+                else:
+                    cm.dense[code] = _incremented(dst, i)
+        else:
+            ranges.append((n, lo, hi, dst))
+
+    for op, operands in content_operations(data):
+        if op == 'usecmap':
+            if not operands or operands[-1].type != EObject.NAME:
+                continue
+            cm.usecmap = bytes(operands[-1].data)
+            cm.base = predefined.get(cm.usecmap)
+            if cm.base is None:
+                raise CMapError(f'usecmap {cm.usecmap.decode("latin-1")}:'
+                                ' not a predefined CMap')
+        elif op == 'endcodespacerange':
+            for i in range(0, len(operands) - 1, 2):
+                lo, hi = operands[i].data, operands[i+1].data
+                if len(lo) == len(hi) and lo:
+                    cm.ranges.append((bytes(lo), bytes(hi)))
+        elif op in ('endbfchar', 'endcidchar'):
+            for i in range(0, len(operands) - 1, 2):
+                src, dst = operands[i], _value(operands[i+1])
+                if src.type != EObject.STRING or dst is None:
+                    continue
+                n = len(src.data)
+                code = int.from_bytes(src.data, 'big')
+                if n == 1:
+                    cm.dense[code] = dst
+                elif n > 1:
+                    cm.chars.setdefault(n, {})[code] = dst
+        elif op in ('endbfrange', 'endcidrange'):
+            for i in range(0, len(operands) - 2, 3):
+                lo, hi, dst = operands[i:i+3]
+                if lo.type != EObject.STRING or hi.type != EObject.STRING:
+                    continue
+                n = len(lo.data)
+                lo = int.from_bytes(lo.data, 'big')
+                hi = int.from_bytes(hi.data, 'big')
+                # PDF Spec, § 9.7.6.2: codes are at most 4 bytes long
+                if hi < lo or n > 4:
+                    continue
+                if dst.type == EObject.ARRAY:
+                    add_range(lo, hi, n, [_value(o) for o in dst.data])
+                elif dst.type in (EObject.STRING, EObject.INTEGER):
+                    add_range(lo, hi, n, _value(dst))
+
+    ranges.sort(key=lambda r: r[:2])
+    for n, lo, hi, dst in ranges:
+        if n not in cm.starts:
+            cm.starts[n], cm.ends[n], cm.dst[n] = array('Q'), array('Q'), []
+        cm.starts[n].append(lo)
+        cm.ends[n].append(hi)
+        cm.dst[n].append(dst)
+    if not cm.ranges and cm.base is not None:
+        cm.ranges = list(cm.base.ranges)
+    cm.ranges.sort(key=lambda r: len(r[0]))
+    lengths = {len(lo) for lo, _ in cm.ranges}
+    # Most CMaps have a single code length, 1 or 2 bytes
+    cm.code_len = lengths.pop() if len(lengths) == 1 else None
+    return cm
+
+#-------------------------------------------------------------------------------
+# Predefined CMaps
+#-------------------------------------------------------------------------------
+
+def identity_cmap():
+    """Return the Identity-H (or -V) CMap: 2-byte codes, CID = code."""
+    cm = CMap()
+    cm.ranges = [(b'\x00\x00', b'\xff\xff')]
+    cm.code_len = 2
+    cm.starts[2] = array('Q', [0])
+    cm.ends[2] = array('Q', [0xffff])
+    cm.dst[2] = [0]
+    return cm
+
+predefined = {
+    b'Identity-H': identity_cmap(),
+    b'Identity-V': identity_cmap(),
+}
+
+#-------------------------------------------------------------------------------
+# get_cmap - the process-wide cache
+#-------------------------------------------------------------------------------
+
+# hash of the stream data (and filters) -> CMap, least recently used first
+cmap_cache = OrderedDict()
+cmap_cache_sz = 512
+cmap_lock = threading.Lock()
+
+def get_cmap(data, chain=()):
+    """Return the compiled CMap of stream data, decoded with filter chain.
+
+    chain is a list of (filter name, parms), as returned by filter_chain().
+    The data isn't even decoded when the same stream has been seen before.
+    """
+    h = hashlib.blake2b(bytes(data), digest_size=16)
+    h.update(repr(chain).encode())
+    key = h.digest()
+    with cmap_lock:
+        cm = cmap_cache.get(key)
+        if cm is not None:
+            cmap_cache.move_to_end(key)
+            return cm
+
+    if chain:
+        data, rest = decode_stream(data, chain)
+        if rest:
+            return None
+    cm = compile_cmap(data)
+
+    with cmap_lock:
+        cmap_cache[key] = cm
+        while len(cmap_cache) > cmap_cache_sz:
+            cmap_cache.popitem(last=False)
+    return cm
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    print('This module is not meant to be executed directly.')
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# cmap_t.py
+
+import unittest
+import zlib
+import cmap
+from cmap import CMapError, compile_cmap, get_cmap, predefined
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+to_unicode = b"""/CIDInit /ProcSet findresource begin
+12 dict begin
+begincmap
+/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def
+/CMapName /Adobe-Identity-UCS def
+2 begincodespacerange
+<00> <80>
+<8140> <FFFF>
+endcodespacerange
+2 beginbfchar
+<41> <0042>
+<8141> <00660069>
+endbfchar
+3 beginbfrange
+<61> <63> <0061>
+<9000> <9002> [<03B1> <03B2> /gamma]
+<A000> <A0FF> <4E00>
+endbfrange
+endcmap
+CMapName currentdict /CMap defineresource pop
+end
+end"""
+
+class CMapTest(unittest.TestCase):
+    """Test the compiled CMaps."""
+
+    def test01(self):
+        """bfchar and bfrange, single and double byte codes."""
+        cm = compile_cmap(to_unicode)
+        self.assertIsNone(cm.code_len)
+        self.assertEqual('B', cm.dense[0x41])
+        self.assertEqual(['a', 'b', 'c'], cm.dense[0x61:0x64])
+        self.assertEqual('fi', cm.lookup(0x8141))
+        self.assertEqual('β', cm.lookup(0x9001))
+        self.assertEqual('', cm.lookup(0x9002))  # no such glyph name
+        self.assertEqual('丁', cm.lookup(0xa001))
+        self.assertIsNone(cm.lookup(0xa100))
+        self.assertIsNone(cm.lookup(0x41))  # 0x0041 isn't 0x41
+
+        # Codes are split according to the code space
+        self.assertEqual([(0x41, 1), (0x8141, 2), (0x62, 1), (0xa041, 2)],
+                         list(cm.codes(b'A\x81\x41b\xa0\x41')))
+
+    def test02(self):
+        """cidrange, and the Identity CMap."""
+        cm = compile_cmap(b'1 begincodespacerange <0000> <FFFF>'
+                          b' endcodespacerange 1 begincidrange <0100> <01FF>'
+                          b' 34 endcidrange')
+        self.assertEqual(2, cm.code_len)
+        self.assertEqual(34 + 0x10, cm.lookup(0x0110))
+        self.assertEqual(0x1234, predefined[b'Identity-H'].lookup(0x1234))
+
+    def test03(self):
+        """The same stream data is compiled only once, LRU eviction."""
+        cmap.cmap_cache.clear()
+        data = zlib.compress(to_unicode)
+        chain = [(b'FlateDecode', {})]
+        cm = get_cmap(data, chain)
+        self.assertEqual('fi', cm.lookup(0x8141))
+        self.assertIs(cm, get_cmap(bytes(data), chain))
+        self.assertIsNot(cm, get_cmap(to_unicode))
+
+        sz = cmap.cmap_cache_sz
+        cmap.cmap_cache_sz = 2
+        try:
+            get_cmap(b'1 beginbfchar <01> <0041> endbfchar')
+            self.assertIsNot(cm, get_cmap(data, chain))
+        finally:
+            cmap.cmap_cache_sz = sz
+            cmap.cmap_cache.clear()
+
+    def test04(self):
+        """Codes of different lengths, with the same value, are different."""
+        cm = compile_cmap(b'2 begincodespacerange <00> <7F> <8000> <FFFF>'
+                          b' endcodespacerange'
+                          b' 3 beginbfchar <01> <0041> <0001> <0042>'
+                          b' <000001> <0043> endbfchar'
+                          b' 2 beginbfrange <0010> <0011> <0061>'
+                          b' <001000> <001001> <0078> endbfrange')
+        self.assertEqual('A', cm.lookup(0x01, 1))
+        self.assertEqual('B', cm.lookup(0x01, 2))
+        self.assertEqual('C', cm.lookup(0x01, 3))
+        self.assertEqual('b', cm.lookup(0x11, 2))
+        self.assertEqual('y', cm.lookup(0x1001, 3))
+        self.assertIsNone(cm.lookup(0x1001, 2))
+        self.assertIsNone(cm.lookup(0x11, 3))
+
+    def test05(self):
+        """usecmap: a predefined base CMap, or an error."""
+        cm = compile_cmap(b'/Identity-H usecmap 1 begincidchar <0041> 7'
+                          b' endcidchar')
+        self.assertEqual(b'Identity-H', cm.usecmap)
+        self.assertEqual(7, cm.lookup(0x41))
+        self.assertEqual(0x42, cm.lookup(0x42))
+        self.assertEqual(2, cm.code_len)
+        with self.assertRaises(CMapError):
+            compile_cmap(b'/GBK-EUC-H usecmap 1 begincidchar <0041> 7'
+                         b' endcidchar')
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# columnar_export.py - per-object facts of many files, stored by column
+
+# One row per indirect object, with these columns:
+#
+#     file, objn, gen, offset, size, type, Type, Subtype, filters, length,
+#     decoded_length, error
+#
+# 'type' is the EObject type (STREAM for a dict and stream couple), 'Type' and
+# 'Subtype' the values of those keys in the object's dictionary, 'filters' the
+# comma-separated filter chain. For streams, 'length' is the length of the
+# data in the file, 'decoded_length' its length after the filters (-1 if it
+# couldn't be decoded, or if it's image data). Missing integers are -1,
+# missing strings None. Objects stored in object streams have an offset and
+# a size of -1.
+#
+# An object that can't be parsed gets a row of type 'ERROR', with the reason
+# in 'error'; a file that can't be opened gets a single one, with an objn of
+# -1. One bad file or object mustn't stop the export of a corpus.
+#
+# Rows are accumulated in typed arrays (the array module), and written a row
+# group at a time. String columns are dictionary-encoded: the arrays hold
+# indexes in a table of distinct strings. The file format is:
+#
+#     magic
+#     row group 0: the bytes of each column array, one after the other
+#     row group 1: ...
+#     footer, JSON: the columns, the strings, and for each row group its
+#         number of rows and the offsets of its columns
+#     footer offset (8 bytes, little-endian), magic
+#
+# read_columns() reads back only the columns it's asked for. If pyarrow is
+# installed, a path ending with '.parquet' is written as a Parquet file.
+
+import json
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from document import DocumentCore
+from filters import FilterError, decode_stream
+from object_stream import EObject, filter_chain
+from token_stream import PdfParseError
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# Columns
+#-------------------------------------------------------------------------------
+
+# (name, array typecode), the string columns are marked 's' and stored as
+# str_typecode indexes. Only fixed-width typecodes: 'l' is 8 bytes on Linux,
+# and 4 on Windows
+columns = [('file', 's'), ('objn', 'i'), ('gen', 'i'), ('offset', 'q'),
+           ('size', 'q'), ('type', 's'), ('Type', 's'), ('Subtype', 's'),
+           ('filters', 's'), ('length', 'q'), ('decoded_length', 'q'),
+           ('error', 's')]
+
+str_typecode = 'i'
+
+magic = b'PDFCOL2\n'
+row_group_sz = 65536
+
+#-------------------------------------------------------------------------------
+# object_rows
+#-------------------------------------------------------------------------------
+
+def _name(d, key):
+    o = d.get(key)
+    return o.data.decode('latin-1') if o and o.type == EObject.NAME else None
+
+def _error_row(objn, gen, offset, size, e):
+    return (objn, gen, offset, size, 'ERROR', None, None, None, -1, -1,
+            f'{type(e).__name__}: {e}')
+
+def object_rows(filepath, decode=True):
+    """Yield a tuple of column values (without the file) for each object."""
+    core = DocumentCore(filepath)
+    try:
+        core.open()
+    except (PdfParseError, FilterError) as e:
+        yield _error_row(-1, -1, -1, -1, e)
+        return
+    try:
+        cur = core.cursor()
+        objns = core.object_numbers()
+
+        # The size of an object is the distance to the next thing in the file
+        # that is known to start somewhere: another object, a xref section
+        ends = sorted({core.xref.get_object(objn, gen)[0]
+                       for objn, gen in objns
+                       if not core.xref.get_compressed(objn)}
+                      | {rev.offset for rev in core.xref.all_revisions()}
+                      | {len(core.mm)})
+
+        for objn, gen in objns:
+            offset = size = -1
+            if not core.xref.get_compressed(objn):
+                offset = core.xref.get_object(objn, gen)[0]
+                size = ends[bisect_right(ends, offset)] - offset
+            try:
+                o = cur.get_object(objn, gen, cache=False)
+                if o is None:
+                    continue
+                if o.type == EObject.COUPLE:
+                    chain = filter_chain(o.data[0], cur.deref)
+            except (PdfParseError, FilterError) as e:
+                yield _error_row(objn, gen, offset, size, e)
+                continue
+
+            typ = subtype = filters = None
+            length = decoded_length = -1
+            if o.type == EObject.COUPLE:
+                sd, s = o.data
+                d = sd.data
+                filters = ','.join(name.decode('latin-1')
+                                   for name, _ in chain) or None
+                length = len(s.data)
+                if decode:
+                    try:
+                        data, rest = decode_stream(s.data, chain)
+                        if not rest:
+                            decoded_length = len(data)
+                    except FilterError:
+                        pass
+            elif o.type == EObject.DICTIONARY:
+                d = o.data
+            else:
+                d = {}
+            typ, subtype = _name(d, 'Type'), _name(d, 'Subtype')
+            otype = 'STREAM' if o.type == EObject.COUPLE else str(o.type)
+            yield (objn, gen, offset, size, otype, typ, subtype, filters,
+                   length, decoded_length, None)
+    finally:
+        core.close()
+
+#-------------------------------------------------------------------------------
+# class ColumnarWriter
+#-------------------------------------------------------------------------------
+
+class ColumnarWriter:
+    """Accumulate object rows in column arrays, write them by row group."""
+
+    def __init__(self, path, row_group_sz=row_group_sz):
+        self.path = path
+        self.row_group_sz = row_group_sz
+        self.parquet = path.endswith('.parquet') and pyarrow is not None
+        self.strings = []   # the distinct strings
+        self.codes = {}     # string -> index in self.strings
+        self.row_groups = []  # (rows, [column offsets])
+        self.f = None
+        self.pq_writer = None
+        self._new_row_group()
+        if not self.parquet:
+            self.f = open(path, 'wb')
+            self.f.write(magic)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _new_row_group(self):
+        self.arrays = [array(str_typecode if t == 's' else t)
+                       for _, t in columns]
+        self.rows = 0
+
+    def _code(self, s):
+        if s is None:
+            return -1
+        k = self.codes.get(s)
+        if k is None:
+            k = self.codes[s] = len(self.strings)
+            self.strings.append(s)
+        return k
+
+    def add_row(self, row):
+        """Add a row, a tuple with a value for each column."""
+        for a, (_, t), v in zip(self.arrays, columns, row):
+            a.append(self._code(v) if t == 's' else v)
+        self.rows += 1
+        if self.rows == self.row_group_sz:
+            self.flush()
+
+    def add_file(self, filepath, decode=True):
+        """Add a row for each object of a file, return the number of rows."""
+        cnt = 0
+        for row in object_rows(filepath, decode):
+            self.add_row((filepath,) + row)
+            cnt += 1
+        return cnt
+
+    def flush(self):
+        """Write the rows accumulated so far as a row group."""
+        if self.rows == 0:
+            return
+        if self.parquet:
+            self._flush_parquet()
+        else:
+            offsets = []
+            for a in self.arrays:
+                offsets.append(self.f.tell())
+                if sys.byteorder == 'big':
+                    a.byteswap()
+                a.tofile(self.f)
+            self.row_groups.append((self.rows, offsets))
+        self._new_row_group()
+
+    def _flush_parquet(self):
+        data = {}
+        for a, (name, t) in zip(self.arrays, columns):
+            if t == 's':
+                data[name] = pyarrow.DictionaryArray.from_arrays(
+                    pyarrow.array(a, type=pyarrow.int32(),
+                                  mask=[k == -1 for k in a]),
+                    pyarrow.array(self.strings, type=pyarrow.string()))
+            else:
+                data[name] = pyarrow.array(a, type=pyarrow.int64())
+        table = pyarrow.table(data)
+        if self.pq_writer is None:
+            self.pq_writer = pyarrow.parquet.ParquetWriter(self.path,
+                                                           table.schema)
+        else:
+            # The dictionary has grown since the first row group
+            table = table.cast(self.pq_writer.schema, safe=False)
+        self.pq_writer.write_table(table)
+
+    def close(self):
+        self.flush()
+        if self.parquet:
+            if self.pq_writer:
+                self.pq_writer.close()
+            return
+        if self.f:
+            footer = json.dumps({'columns': columns, 'strings': self.strings,
+                                 'row_groups': self.row_groups}).encode()
+            offset = self.f.tell()
+            self.f.write(footer)
+            self.f.write(struct.pack('<Q', offset))
+            self.f.write(magic)
+            self.f.close()
+            self.f = None
+
+#-------------------------------------------------------------------------------
+# export_columns, read_columns
+#-------------------------------------------------------------------------------
+
+def export_columns(filepaths, path, row_group_sz=row_group_sz, decode=True):
+    """Write the object rows of all the files to path, return the row count."""
+    cnt = 0
+    with ColumnarWriter(path, row_group_sz) as w:
+        for filepath in filepaths:
+            cnt += w.add_file(filepath, decode)
+    return cnt
+
+def read_columns(path, names=None):
+    """Return {column name: list of values} for the columns in names (all of
+    them by default), reading only those columns."""
+    with open(path, 'rb') as f:
+        f.seek(-len(magic) - 8, os.SEEK_END)
+        end = f.tell()
+        offset, = struct.unpack('<Q', f.read(8))
+        if f.read() != magic:
+            raise ValueError(f'{path} is not a columnar export')
+        f.seek(offset)
+        footer = json.loads(f.read(end - offset))
+
+        strings = footer['strings']
+        res = {}
+        for i, (name, t) in enumerate(footer['columns']):
+            if names is not None and name not in names:
+                continue
+            values = array(str_typecode if t == 's' else t)
+            for rows, offsets in footer['row_groups']:
+                f.seek(offsets[i])
+                a = array(values.typecode)
+                a.fromfile(f, rows)
+                if sys.byteorder == 'big':
+                    a.byteswap()
+                values.extend(a)
+            if t == 's':
+                res[name] = [strings[k] if k >= 0 else None for k in values]
+            else:
+                res[name] = values.tolist()
+        return res
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print(f'Usage: {sys.argv[0]} <output> <filepath> ...')
+        exit(-1)
+    cnt = export_columns(sys.argv[2:], sys.argv[1])
+    print(f'{cnt} objects')
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# columnar_export_t.py
+
+import json
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from columnar_export import export_columns, read_columns
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class ColumnarExportTest(unittest.TestCase):
+    """Test the columnar export of per-object facts."""
+
+    path = 't'
+
+    def setUp(self):
+        fd, self.out = tempfile.mkstemp(suffix='.col')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.out)
+
+    def test01(self):
+        """Two files, in row groups smaller than a file."""
+        filepaths = [os.path.join(ColumnarExportTest.path, name)
+                     for name in ['doc01.pdf', 'doc02.pdf']]
+        cnt = export_columns(filepaths, self.out, row_group_sz=3)
+        self.assertEqual(20, cnt)
+
+        cols = read_columns(self.out)
+        self.assertEqual(20, len(cols['objn']))
+        self.assertEqual([filepaths[0]]*10 + [filepaths[1]]*10, cols['file'])
+        rows = list(zip(*cols.values()))
+
+        # Object 6 of doc01.pdf: a compressed stream
+        self.assertEqual((filepaths[0], 6, 0, 431, 119, 'STREAM', None, None,
+                          'FlateDecode', 49, 44, None), rows[5])
+        # Object 1 of doc02.pdf: in an object stream
+        self.assertEqual((filepaths[1], 1, 0, -1, -1, 'DICTIONARY', 'Catalog',
+                          None, None, -1, -1, None), rows[10])
+        self.assertEqual('XRef', cols['Type'][-1])
+
+    def test02(self):
+        """Only the columns asked for are read."""
+        export_columns([os.path.join(ColumnarExportTest.path, 'doc03.pdf')],
+                       self.out)
+        cols = read_columns(self.out, ['objn', 'offset'])
+        self.assertEqual(['objn', 'offset'], list(cols))
+        # Object 8 was updated, its offset is in the newest revision
+        self.assertEqual(1125, dict(zip(cols['objn'], cols['offset']))[8])
+
+    def test03(self):
+        """Not a columnar export."""
+        with open(self.out, 'wb') as f:
+            f.write(b'%PDF-1.4' + b' '*32)
+        with self.assertRaises(ValueError):
+            read_columns(self.out)
+
+    def test04(self):
+        """The same bytes on every platform: 4-byte and 8-byte columns."""
+        filepath = os.path.join(ColumnarExportTest.path, 'doc01.pdf')
+        export_columns([filepath], self.out)
+        with open(self.out, 'rb') as f:
+            data = f.read()
+        offset, = struct.unpack('<Q', data[-16:-8])
+        footer = json.loads(data[offset:-16])
+        rows, offsets = footer['row_groups'][0]
+        self.assertEqual(10, rows)
+        # file, objn, gen: 4 bytes each, offset: 8 bytes
+        self.assertEqual([8, 48, 88, 128, 208], offsets[:5])
+
+    def test05(self):
+        """A file that can't be opened, an object that can't be parsed."""
+        with open(os.path.join(ColumnarExportTest.path, 'doc01.pdf'),
+                  'rb') as f:
+            data = f.read()
+        tmp = tempfile.mkdtemp()
+        try:
+            truncated = os.path.join(tmp, 'truncated.pdf')
+            with open(truncated, 'wb') as f:
+                f.write(data[:600])
+            bad = os.path.join(tmp, 'bad.pdf')
+            with open(bad, 'wb') as f:
+                f.write(data.replace(b'8 0 obj', b'8 0 xbj'))
+            filepath = os.path.join(ColumnarExportTest.path, 'doc02.pdf')
+            cnt = export_columns([truncated, bad, filepath], self.out)
+        finally:
+            shutil.rmtree(tmp)
+        self.assertEqual(21, cnt)
+        rows = list(zip(*read_columns(self.out).values()))
+        self.assertEqual((truncated, -1, -1, -1, -1, 'ERROR'), rows[0][:6])
+        self.assertTrue(rows[0][-1].startswith('PdfParseError: no startxref'))
+        self.assertEqual((bad, 8, 0, 640, 109, 'ERROR'), rows[8][:6])
+        self.assertTrue(rows[8][-1].startswith('PdfParseError: '))
+        self.assertEqual([None]*19, [row[-1] for row in rows[1:8] + rows[9:]])
+        self.assertEqual([filepath]*10, [row[0] for row in rows[11:]])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
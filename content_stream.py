@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# content_stream.py - parse the operators and operands of a content stream
+
+# A content stream (PDF Spec, § 7.8.2 Content Streams) is a sequence of
+# operands followed by an operator, in postfix notation:
+#
+#     BT /F1 12 Tf 72 712 Td (Hello) Tj ET
+#
+# TokenStream doesn't know the operators, every one of them would come out as
+# an ERROR token. content_operations() parses the decoded bytes of a content
+# stream in one pass, with a single compiled regular expression built on the
+# TokenStream character classes (the numbers that precede an operator are
+# matched as a single run, and converted in one go; a token seen recently,
+# operator or operands, isn't parsed again), and yields (operator, operands)
+# tuples:
+#
+#     ('BT', [])
+#     ('Tf', [PdfObject(NAME, b'F1'), PdfObject(INTEGER, 12)])
+#     ...
+#
+# Operators are str, operands are PdfObjects, like the ones ObjectStream
+# returns. An inline image (BI ... ID ... EI) comes out as a single 'BI'
+# operation, whose operands are the image dictionary and the image data
+# (a STREAM object); the image data is skipped with a bulk search for EI.
+
+import re
+import sys
+from object_stream import EObject, PdfObject
+from token_stream import PdfParseError, TokenStream
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# Character classes, taken from TokenStream
+#-------------------------------------------------------------------------------
+
+_ws = re.escape(TokenStream.wspace + b'\r\n')
+_regular = b'[^' + _ws + re.escape(TokenStream.delims) + b']'
+_number = b'[+-]?(?:[0-9]+\\.?[0-9]*|\\.[0-9]+)'
+
+# One token, after any white space: a run of numbers, a run of regular
+# characters (an operator, true, false, null), a name, a literal string
+# without nested parentheses, '<<', '>>', a hex string, '[', ']', or a
+# comment. The only group is the token itself, and its first byte tells what
+# it is. A literal string with nested parentheses comes out as a lone '('.
+token_re = re.compile(
+    b'[' + _ws + b']*('
+    + _number + b'(?:[' + _ws + b']+' + _number + b')*(?!' + _regular + b')'
+    + b'|' + _regular + b'+'
+    + b'|/' + _regular + b'*'
+    + b'|\\([^()\\\\]*(?:\\\\.[^()\\\\]*)*\\)'
+    + b'|<<|>>|<[0-9a-fA-F' + _ws + b']*>'
+    + b'|%[^\r\n]*'
+    + b'|[^' + _ws + b'])', re.DOTALL)
+
+paren_re = re.compile(rb'[()\\]')
+escape_re = re.compile(rb'\\([0-7]{1,3}|\r\n|.)', re.DOTALL)
+name_escape_re = re.compile(rb'#([0-9a-fA-F]{2})')
+ws_re = re.compile(b'[' + _ws + b']+')
+delims = frozenset(TokenStream.delims)
+
+# The end of inline image data: EI, between white space (or the end)
+ei_re = re.compile(b'[' + _ws + b']EI(?!' + _regular + b')')
+
+# Escape sequences in literal strings, PDF spec § 7.3.4.2, table 3
+escapes = {
+    b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f',
+    b'(': b'(', b')': b')', b'\\': b'\\',
+    b'\r': b'', b'\n': b'', b'\r\n': b'',  # line continuation
+}
+
+def _unescape(m):
+    s = m.group(1)
+    v = escapes.get(s)
+    if v is not None:
+        return v
+    if s[0] in b'01234567':
+        return bytes([int(s, 8) & 0xff])
+    # PDF Spec: "If the character following the REVERSE SOLIDUS is not one of
+    # those shown in Table 3, the REVERSE SOLIDUS shall be ignored."
+    return s
+
+def literal_string(raw):
+    """Return the bytes of a literal string, raw is what's between the parens."""
+    return escape_re.sub(_unescape, raw) if b'\\' in raw else bytes(raw)
+
+def _string_end(buf, pos):
+    """Return the offset after the literal string whose '(' is at pos."""
+    depth = 0
+    k = pos
+    while True:
+        m = paren_re.search(buf, k)
+        if not m:
+            raise PdfParseError('unterminated literal string', pos)
+        c = buf[m.start()]
+        if c == 0x5c:  # '\', skip the escaped character
+            k = m.end() + 1
+            continue
+        depth += 1 if c == 0x28 else -1
+        k = m.end()
+        if depth == 0:
+            return k
+
+def _name(raw):
+    if b'#' in raw:
+        raw = name_escape_re.sub(lambda m: bytes.fromhex(m.group(1).decode()),
+                                 raw)
+    return bytes(raw)
+
+# Keywords that are operands, not operators
+keywords = {
+    b'true': PdfObject(EObject.BOOLEAN, True),
+    b'false': PdfObject(EObject.BOOLEAN, False),
+    b'null': PdfObject(EObject.NULL),
+}
+
+#-------------------------------------------------------------------------------
+# Inline images
+#-------------------------------------------------------------------------------
+
+def _image_dict(operands, offset, strict):
+    d = {}
+    for i in range(0, len(operands) - 1, 2):
+        k, v = operands[i], operands[i+1]
+        if k.type != EObject.NAME:
+            if strict:
+                raise PdfParseError('expecting a name in inline image', offset)
+            continue
+        d[k.data.decode('latin-1')] = v
+    return d
+
+def _image_end(buf, pos, d):
+    """Return (end of the data, offset after EI) for data starting at pos."""
+    # PDF 2.0 allows the length of the data in the dictionary, which is the
+    # only reliable way: binary image data may well contain ' EI '
+    length = d.get('L', d.get('Length'))
+    if length is not None and length.type == EObject.INTEGER:
+        end = pos + length.data
+        m = ws_re.match(buf, end)
+        k = m.end() if m else end
+        if buf[k:k + 2] == b'EI':
+            return end, k + 2
+    m = ei_re.search(buf, pos)
+    if m is None:
+        raise PdfParseError('inline image without EI', pos)
+    return m.start(), m.end()
+
+#-------------------------------------------------------------------------------
+# content_operations
+#-------------------------------------------------------------------------------
+
+def _pop(stack, operands):
+    """Close the innermost array, or dictionary, return the enclosing list."""
+    outer, kind, _ = stack.pop()
+    if kind == 0x5b:  # '['
+        outer.append(PdfObject(EObject.ARRAY, operands))
+    else:
+        d = {}
+        for i in range(0, len(operands) - 1, 2):
+            k = operands[i]
+            if k.type == EObject.NAME:
+                d[k.data.decode('latin-1')] = operands[i+1]
+        outer.append(PdfObject(EObject.DICTIONARY, d))
+    return outer
+
+# First bytes of the numbers
+number_start = frozenset(b'0123456789+-.')
+
+# The operands parsed from the most recent tokens are reused, the PdfObjects
+# are shared: they must not be modified
+memo_sz = 1024
+
+def content_operations(buf, strict=False):
+    """Yield (operator, operands) for each operation in a content stream.
+
+    buf is the decoded content, bytes or any buffer. In strict mode, a syntax
+    error raises PdfParseError; otherwise the offending token is skipped.
+    """
+    INTEGER, REAL, NAME, STRING = (EObject.INTEGER, EObject.REAL, EObject.NAME,
+                                   EObject.STRING)
+    operands = []
+    stack = []   # (list, '[' or '<', offset) of the enclosing arrays, dicts
+    memo = {}    # token -> the list of its operands, or the operator
+    pos = 0
+    n = len(buf)
+    while pos < n:
+        # The scan restarts only after a nested literal string and an inline
+        # image, everything else is done by the one finditer()
+        for m in token_re.finditer(buf, pos):
+            tok = m[1]
+            v = memo.get(tok)
+            if v is None:
+                c = tok[0]
+                if c in number_start:
+                    # Most operands are numbers, they come here in runs: all
+                    # the operands of 'cm', 're', 'Td' at once
+                    try:
+                        v = [PdfObject(REAL, float(x)) if b'.' in x
+                             else PdfObject(INTEGER, int(x))
+                             for x in (ws_re.split(tok) if b'\0' in tok
+                                       else tok.split())]
+                    except ValueError:
+                        # A run of regular characters that isn't a number
+                        if strict:
+                            raise PdfParseError(f'invalid number {tok}',
+                                                m.start(1))
+                        continue
+                elif c == 0x2f:  # '/'
+                    v = [PdfObject(NAME, _name(tok[1:]))]
+                elif c == 0x28 and len(tok) > 1:  # '(', no nested parens
+                    v = [PdfObject(STRING, literal_string(tok[1:-1]))]
+                elif c not in delims and c != 0x25:  # '%'
+                    # An operator, or true, false, null
+                    o = keywords.get(tok)
+                    v = [o] if o is not None else tok.decode('latin-1')
+                if v is not None:
+                    # The same tokens come back again and again: operators,
+                    # font names, sizes, matrices, the words of a kerned text
+                    if len(memo) >= memo_sz:
+                        memo.clear()
+                    memo[tok] = v
+            if v.__class__ is list:
+                operands += v
+            elif v is not None:
+                if stack:
+                    if strict:
+                        raise PdfParseError('operator inside an array or a'
+                                            ' dictionary', m.start(1))
+                    # Close the open arrays and dictionaries as they are
+                    while stack:
+                        operands = _pop(stack, operands)
+                if v == 'ID':
+                    d = _image_dict(operands, m.start(1), strict)
+                    # A single white space character follows ID
+                    start = m.end() + 1
+                    end, pos = _image_end(buf, start, d)
+                    yield 'BI', [PdfObject(EObject.DICTIONARY, d),
+                                 PdfObject(EObject.STREAM,
+                                           bytes(buf[start:end]))]
+                    operands = []
+                    break
+                if v != 'BI':
+                    yield v, operands
+                # The operands of BI are the ones between BI and ID
+                operands = []
+            elif c == 0x28:  # '('
+                # Nested parentheses
+                start = m.start(1)
+                pos = _string_end(buf, start)
+                operands.append(PdfObject(STRING,
+                                          literal_string(buf[start+1:pos-1])))
+                break
+            elif c == 0x5b or (c == 0x3c and tok == b'<<'):  # '[', '<<'
+                stack.append((operands, c, m.start(1)))
+                operands = []
+            elif c == 0x5d or (c == 0x3e and tok == b'>>'):  # ']', '>>'
+                if not stack or stack[-1][1] != (0x5b if c == 0x5d else 0x3c):
+                    if strict:
+                        raise PdfParseError(f'unexpected {tok.decode()}',
+                                            m.start(1))
+                    if not stack:
+                        continue
+                operands = _pop(stack, operands)
+            elif c == 0x3c:  # '<', hex string
+                s = ws_re.sub(b'', tok[1:-1])
+                if len(s) % 2 == 1:
+                    s += b'0'
+                operands.append(PdfObject(STRING, bytes.fromhex(s.decode())))
+            elif c != 0x25 and strict:  # not a comment
+                # A lone ')', '>', '{', '}'
+                raise PdfParseError(f'unexpected character {chr(c)}',
+                                    m.start(1))
+        else:
+            break
+
+    if strict and (operands or stack):
+        raise PdfParseError('operands without an operator at the end', n)
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(f'Usage: {sys.argv[0]} <filepath>')
+        exit(-1)
+    with open(sys.argv[1], 'rb') as f:
+        data = f.read()
+    for op, operands in content_operations(data):
+        print(op, ' '.join(str(o) for o in operands))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# content_stream_t.py
+
+import unittest
+from content_stream import content_operations
+from object_stream import EObject
+from token_stream import PdfParseError
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+def values(operands):
+    """The python values of a list of operands, arrays and dicts included."""
+    res = []
+    for o in operands:
+        if o.type == EObject.ARRAY:
+            res.append(values(o.data))
+        elif o.type == EObject.DICTIONARY:
+            res.append(dict(zip(o.data, values(o.data.values()))))
+        else:
+            res.append(o.data)
+    return res
+
+class ContentStreamTest(unittest.TestCase):
+    """Test the parsing of content stream operations."""
+
+    def ops(self, data, strict=True):
+        return [(op, values(operands))
+                for op, operands in content_operations(data, strict)]
+
+    def test01(self):
+        """Text and graphics operators, numbers in runs."""
+        data = (b'q 1 0 0 1 72 712.5 cm\nBT /F1 12 Tf -.5 3. Td (Hello) Tj'
+                b' ET %comment\r\nQ')
+        self.assertEqual([('q', []),
+                          ('cm', [1, 0, 0, 1, 72, 712.5]),
+                          ('BT', []),
+                          ('Tf', [b'F1', 12]),
+                          ('Td', [-0.5, 3.0]),
+                          ('Tj', [b'Hello']),
+                          ('ET', []),
+                          ('Q', [])], self.ops(data))
+
+    def test02(self):
+        """Strings, arrays, dictionaries, names and keywords."""
+        data = (b'[(A\\(b\\)\\101\\\nc) -120 (x(y(z))) <48 65 6c6c6f7>] TJ'
+                b' /P <</MCID 0 /K [true null]>> BDC /A#20B gs')
+        self.assertEqual([('TJ', [[b'A(b)Ac', -120, b'x(y(z))', b'Hellop']]),
+                          ('BDC', [b'P', {'MCID': 0, 'K': [True, None]}]),
+                          ('gs', [b'A B'])], self.ops(data))
+
+    def test03(self):
+        """Inline images, with and without a length."""
+        data = (b'q BI /W 4 /H 1 /BPC 8 /CS /G ID \x00EI\x01\xff\nEI Q'
+                b' BI /W 2 /H 2 /L 4 ID 1 EI EI 0 g')
+        ops = list(content_operations(data, strict=True))
+        self.assertEqual(['q', 'BI', 'Q', 'BI', 'g'], [op for op, _ in ops])
+        d, img = ops[1][1]
+        self.assertEqual(EObject.DICTIONARY, d.type)
+        self.assertEqual(['W', 'H', 'BPC', 'CS'], list(d.data))
+        self.assertEqual(b'\x00EI\x01\xff', img.data)
+        self.assertEqual(b'1 EI', ops[3][1][1].data)
+
+    def test04(self):
+        """Syntax errors, strict or not."""
+        data = b'1 2 m ) 3 4 l [5 6 S'
+        with self.assertRaises(PdfParseError):
+            self.ops(data)
+        self.assertEqual([('m', [1, 2]), ('l', [3, 4]), ('S', [[5, 6]])],
+                         self.ops(data, strict=False))
+
+    def test05(self):
+        """Repeated tokens are parsed once, each operation has its list."""
+        data = b'/F1 12 Tf 0 -14 Td (a) Tj 0 -14 Td (a) Tj /F1 12 Tf [(a)] TJ'
+        ops = list(content_operations(data, strict=True))
+        self.assertEqual(['Tf', 'Td', 'Tj', 'Td', 'Tj', 'Tf', 'TJ'],
+                         [op for op, _ in ops])
+        self.assertIs(ops[1][1][0], ops[3][1][0])
+        self.assertIs(ops[2][1][0], ops[6][1][0].data[0])
+        ops[0][1].clear()
+        self.assertEqual([b'F1', 12], values(ops[5][1]))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+# corpus_watch.py - keep the statistics of a directory of PDF files up to date
+
+# pdf_stats.stats_dir_to_csv() goes through every file of a directory, every
+# time. Here the statistics of each file (pdf_stats.file_stats()) are kept in
+# a local sqlite3 store, with the modification time and the size of the file
+# when they were computed. A refresh compares a snapshot of the directory
+# (os.scandir(), the mtime and size of each file) with the store:
+#
+#     - new files, and files whose mtime or size changed, are processed again,
+#       in a worker pool, largest first (see scheduler.SizeScheduler)
+#     - deleted files are removed from the store
+#
+# and the aggregate statistics are computed from the store, by SQL, in no
+# time. watch() refreshes in a loop: it waits for inotify events if the
+# inotify_simple package is installed (on Linux), and polls otherwise.
+#
+#     watcher = CorpusWatcher('/srv/pdf', 'pdf_stats.db')
+#     watcher.watch(callback=lambda changes, agg: print(changes, agg))
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from pdf_stats import file_stats
+from scheduler import SizeScheduler
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# scan_dir
+#-------------------------------------------------------------------------------
+
+def scan_dir(path):
+    """Return {filepath: (mtime_ns, size)} for the .pdf files in path."""
+    snapshot = {}
+    with os.scandir(path) as it:
+        for entry in it:
+            if not entry.name.endswith('.pdf'):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+            except OSError:
+                # Deleted since it was listed
+                continue
+            snapshot[entry.path] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
+#-------------------------------------------------------------------------------
+# class CorpusStore
+#-------------------------------------------------------------------------------
+
+schema = '''
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    version TEXT,
+    eol TEXT,
+    xref TEXT,
+    trailer INTEGER,
+    offset INTEGER,
+    subsections INTEGER,
+    tfollows INTEGER,
+    updates INTEGER,
+    eof_offsets TEXT,
+    startxref_offsets TEXT,
+    error TEXT
+);
+'''
+
+# In the order of schema, for the stores created before a column was added
+columns = ('path', 'mtime_ns', 'size', 'version', 'eol', 'xref', 'trailer',
+           'offset', 'subsections', 'tfollows', 'updates', 'eof_offsets',
+           'startxref_offsets', 'error')
+
+class CorpusStore:
+    """The statistics of each file, in a sqlite3 database."""
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(schema)
+        self._upgrade()
+
+    def _upgrade(self):
+        """Add the columns missing from an older store. Its files are marked
+        as changed, so that the next refresh fills the new columns in."""
+        have = {row[1] for row in self.db.execute('PRAGMA table_info(files)')}
+        missing = [c for c in columns if c not in have]
+        if not missing:
+            return
+        with self.db:
+            for c in missing:
+                self.db.execute(f'ALTER TABLE files ADD COLUMN {c}')
+            self.db.execute('UPDATE files SET mtime_ns = -1')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def snapshot(self):
+        """Return {filepath: (mtime_ns, size)} of the files in the store."""
+        return {path: (mtime_ns, size) for path, mtime_ns, size in
+                self.db.execute('SELECT path, mtime_ns, size FROM files')}
+
+    def put(self, rows):
+        """Store the (filepath, mtime_ns, size, stats, error) in rows, stats
+        being a dict returned by file_stats(), or None."""
+        with self.db:
+            self.db.executemany(
+                f'INSERT OR REPLACE INTO files ({",".join(columns)}) VALUES'
+                f' ({",".join("?"*len(columns))})',
+                [(path, mtime_ns, size) + _columns(st) + (error,)
+                 for path, mtime_ns, size, st, error in rows])
+
+    def delete(self, filepaths):
+        with self.db:
+            self.db.executemany('DELETE FROM files WHERE path = ?',
+                                [(fp,) for fp in filepaths])
+
+    def get(self, filepath):
+        """Return the stats of a file (a dict), None if it isn't stored."""
+        cur = self.db.execute('SELECT * FROM files WHERE path = ?',
+                              (filepath,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        st = dict(zip((c[0] for c in cur.description), row))
+        for key in ('eof_offsets', 'startxref_offsets'):
+            if st[key] is not None:
+                st[key] = json.loads(st[key])
+        return st
+
+    def aggregates(self):
+        """Return the statistics of all the files, a dict."""
+        db = self.db
+        files, size, errors, updated = db.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0), COUNT(error),'
+            ' COALESCE(SUM(updates > 1), 0) FROM files').fetchone()
+        return {
+            'files': files,
+            'bytes': size,
+            'errors': errors,
+            'updated': updated,  # with incremental updates
+            'versions': dict(db.execute(
+                'SELECT version, COUNT(*) FROM files WHERE error IS NULL'
+                ' GROUP BY version ORDER BY version')),
+            'eol': dict(db.execute(
+                'SELECT eol, COUNT(*) FROM files WHERE error IS NULL'
+                ' GROUP BY eol ORDER BY eol')),
+            'xref': dict(db.execute(
+                'SELECT xref, COUNT(*) FROM files WHERE error IS NULL'
+                ' GROUP BY xref ORDER BY xref')),
+        }
+
+def _columns(st):
+    if st is None:
+        return (None,)*10
+    return (st['version'], st['eol'], st['xref'], int(st['trailer']),
+            st['offset'], st['subsections'], int(st['tfollows']),
+            st['updates'], json.dumps(st['eof_offsets']),
+            json.dumps(st['startxref_offsets']))
+
+#-------------------------------------------------------------------------------
+# class CorpusWatcher
+#-------------------------------------------------------------------------------
+
+class Changes:
+    """What a refresh found, lists of filepaths."""
+
+    def __init__(self):
+        self.added = []
+        self.changed = []
+        self.deleted = []
+        self.errors = []
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.deleted)
+
+    def __str__(self):
+        return (f'{len(self.added)} added, {len(self.changed)} changed,'
+                f' {len(self.deleted)} deleted, {len(self.errors)} errors')
+
+def _quiet(*args, **kwargs):
+    pass
+
+def _quiet_stats(filepath):
+    # Runs in the pool, a module-level function so that it can be pickled
+    return file_stats(filepath, log=_quiet)
+
+class CorpusWatcher:
+    """Keep the CorpusStore of a directory up to date."""
+
+    def __init__(self, path, store_path, executor=None, workers=None):
+        self.path = path
+        self.store = CorpusStore(store_path)
+        self.executor = executor
+        self.workers = workers
+        self.report = None  # the BatchReport of the last refresh
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.store.close()
+
+    def refresh(self):
+        """Process the new and changed files, forget the deleted ones,
+        return the Changes."""
+        changes = Changes()
+        on_disk = scan_dir(self.path)
+        stored = self.store.snapshot()
+        for filepath, sig in on_disk.items():
+            old = stored.get(filepath)
+            if old is None:
+                changes.added.append(filepath)
+            elif old != sig:
+                changes.changed.append(filepath)
+        changes.deleted = sorted(set(stored) - set(on_disk))
+        changes.added.sort()
+        changes.changed.sort()
+
+        todo = changes.added + changes.changed
+        if todo:
+            sched = SizeScheduler(_quiet_stats, workers=self.workers,
+                                  executor=self.executor)
+            rows = []
+            for filepath, st, error in sched.run(
+                    todo, {fp: on_disk[fp][1] for fp in todo}):
+                # The signature taken before the file was read: if it
+                # changes in between, the next refresh sees it
+                rows.append((filepath,) + on_disk[filepath] + (st, error))
+                if error:
+                    changes.errors.append(filepath)
+            changes.errors.sort()
+            self.store.put(rows)
+            self.report = sched.report
+        if changes.deleted:
+            self.store.delete(changes.deleted)
+        return changes
+
+    def watch(self, interval=5.0, callback=None, stop=None):
+        """Refresh until stop (a threading.Event) is set.
+
+        callback(changes, aggregates) is called after every refresh that
+        found changes, and after the first one. Between refreshes, watch()
+        waits for inotify events (if inotify_simple is installed), or for
+        interval seconds.
+        """
+        stop = stop or threading.Event()
+        notify = None
+        if inotify_simple is not None:
+            flags = inotify_simple.flags
+            notify = inotify_simple.INotify()
+            notify.add_watch(self.path, flags.CLOSE_WRITE | flags.MOVED_TO
+                             | flags.MOVED_FROM | flags.DELETE)
+        try:
+            first = True
+            while not stop.is_set():
+                changes = self.refresh()
+                if callback and (changes or first):
+                    callback(changes, self.store.aggregates())
+                first = False
+                if notify is not None:
+                    # Wait for an event, then for the burst to end
+                    if notify.read(timeout=int(interval*1000)):
+                        while notify.read(timeout=200):
+                            pass
+                else:
+                    stop.wait(interval)
+        finally:
+            if notify is not None:
+                notify.close()
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print(f'Usage: {sys.argv[0]} <directory> <store> [--once]')
+        exit(-1)
+
+    def show(changes, aggregates):
+        print(f'{changes}: {aggregates}')
+
+    with CorpusWatcher(sys.argv[1], sys.argv[2]) as watcher:
+        if '--once' in sys.argv[3:]:
+            show(watcher.refresh(), watcher.store.aggregates())
+        else:
+            try:
+                watcher.watch(callback=show)
+            except KeyboardInterrupt:
+                pass
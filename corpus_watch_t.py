@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# corpus_watch_t.py
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+import corpus_watch
+from corpus_watch import CorpusWatcher, scan_dir
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class CorpusWatchTest(unittest.TestCase):
+    """Test the incremental refresh of the statistics of a directory."""
+
+    path = 't'
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.dir = os.path.join(self.tmp, 'pdf')
+        os.mkdir(self.dir)
+        self.store = os.path.join(self.tmp, 'stats.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def copy(self, name, as_name=None):
+        dst = os.path.join(self.dir, as_name or name)
+        shutil.copy(os.path.join(CorpusWatchTest.path, name), dst)
+        return dst
+
+    def test01(self):
+        """New, changed, deleted files."""
+        a = self.copy('doc01.pdf')
+        b = self.copy('doc06.pdf')
+        with open(os.path.join(self.dir, 'notes.txt'), 'w') as f:
+            f.write('not a pdf')
+        self.assertEqual({a, b}, set(scan_dir(self.dir)))
+
+        with CorpusWatcher(self.dir, self.store) as watcher:
+            changes = watcher.refresh()
+            self.assertEqual([a, b], changes.added)
+            agg = watcher.store.aggregates()
+            self.assertEqual(2, agg['files'])
+            self.assertEqual(os.path.getsize(a) + os.path.getsize(b),
+                             agg['bytes'])
+            # doc06.pdf has an incremental update
+            self.assertEqual(1, agg['updated'])
+            self.assertEqual({'table': 2}, agg['xref'])
+            st = watcher.store.get(b)
+            self.assertEqual('table', st['xref'])
+            self.assertEqual(2, st['updates'])
+            self.assertEqual(2, len(st['eof_offsets']))
+            self.assertFalse(watcher.refresh())
+
+        # The store outlives the watcher: only the differences are processed
+        c = self.copy('doc05.pdf')
+        os.remove(a)
+        with open(b, 'ab') as f:
+            f.write(b'\n')
+        with CorpusWatcher(self.dir, self.store) as watcher:
+            changes = watcher.refresh()
+            self.assertEqual(([c], [b], [a]), (changes.added,
+                                               changes.changed,
+                                               changes.deleted))
+            self.assertIsNone(watcher.store.get(a))
+            self.assertEqual(2, watcher.store.aggregates()['files'])
+
+    def test02(self):
+        """Bad files, and the watch loop."""
+        self.copy('doc04.pdf')
+        bad = os.path.join(self.dir, 'bad.pdf')
+        with open(bad, 'wb') as f:
+            f.write(b'%PDF-1.4\nstartxref\n5\n%%EOF\n')
+
+        stop = threading.Event()
+        seen = []
+
+        def callback(changes, aggregates):
+            seen.append((changes, aggregates))
+            stop.set()
+
+        with CorpusWatcher(self.dir, self.store) as watcher:
+            watcher.watch(interval=0.01, callback=callback, stop=stop)
+            changes, agg = seen[0]
+            self.assertEqual(2, len(changes.added))
+            self.assertEqual([bad], changes.errors)
+            self.assertEqual(1, agg['errors'])
+            self.assertEqual({'1.4': 1}, agg['versions'])
+            self.assertIsNotNone(watcher.store.get(bad)['error'])
+
+    def test03(self):
+        """A store from before the xref column is upgraded."""
+        a = self.copy('doc02.pdf')
+        db = sqlite3.connect(self.store)
+        db.executescript(corpus_watch.schema.replace('    xref TEXT,\n', ''))
+        db.execute('INSERT INTO files (path, mtime_ns, size) VALUES (?,?,?)',
+                   (a, os.stat(a).st_mtime_ns, os.path.getsize(a)))
+        db.commit()
+        db.close()
+        with CorpusWatcher(self.dir, self.store) as watcher:
+            self.assertEqual([a], watcher.refresh().changed)
+            self.assertEqual('stream', watcher.store.get(a)['xref'])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
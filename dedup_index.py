@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# dedup_index.py - find the streams that many files have in common
+
+# The same fonts, logos and ICC profiles are embedded in file after file. The
+# index records, for each stream of each file, a hash of its data as it is in
+# the file (and, optionally, of its decoded data):
+#
+#     file, objn, gen, hash, length, dhash, dlength
+#
+# The stream data is found with lazy_stream(), and hashed a chunk at a time,
+# straight from the mapped file: a stream is never copied whole in memory.
+# Only FlateDecode data without a predictor, the usual case, is decoded for
+# dhash (a chunk at a time too); for the other streams, dhash is NULL.
+#
+# The index is a sqlite3 database, so it can be added to one file at a time,
+# by as many runs as it takes, and queried with SQL. clusters() returns the
+# groups of identical streams, saved() the number of bytes that storing each
+# of them only once would save.
+#
+#     with DedupIndex('corpus.db') as index:
+#         for filepath in filepaths:
+#             index.add_file(filepath)
+#         print(index.saved())
+
+import hashlib
+import sqlite3
+import sys
+import zlib
+from document import DocumentCore
+from lazy_object import lazy_stream
+from object_stream import EObject, filter_chain
+from token_stream import PdfParseError
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# stream_hashes
+#-------------------------------------------------------------------------------
+
+# Bytes hashed (or decompressed) at a time
+chunk_sz = 1024*1024
+hash_sz = 16
+
+def _hash(mv, start, end):
+    """Return (hash, length) of mv[start:end]."""
+    h = hashlib.blake2b(digest_size=hash_sz)
+    for k in range(start, end, chunk_sz):
+        h.update(mv[k:min(k + chunk_sz, end)])
+    return h.digest(), end - start
+
+def _hash_inflated(mv, start, end):
+    """Return (hash, length) of the inflated mv[start:end], (None, -1) if it
+    isn't valid zlib data."""
+    h = hashlib.blake2b(digest_size=hash_sz)
+    d = zlib.decompressobj()
+    length = 0
+    try:
+        for k in range(start, end, chunk_sz):
+            data = d.decompress(mv[k:min(k + chunk_sz, end)])
+            h.update(data)
+            length += len(data)
+            if d.eof:
+                break
+        data = d.flush()
+    except zlib.error:
+        return None, -1
+    h.update(data)
+    return h.digest(), length + len(data)
+
+def stream_hashes(filepath, decoded=False):
+    """Yield (objn, gen, hash, length, dhash, dlength) for each stream of a
+    file. dhash is None (and dlength -1) when the data wasn't decoded."""
+    core = DocumentCore(filepath, lazy=True)
+    core.open()
+    try:
+        deref = core.cursor().deref
+        with memoryview(core.mm) as mv:
+            for objn, gen in core.object_numbers():
+                if core.xref.get_compressed(objn):
+                    # Streams are never stored in object streams
+                    continue
+                offset = core.xref.get_object(objn, gen)[0]
+                try:
+                    res = lazy_stream(core.mm, offset)
+                except PdfParseError:
+                    continue
+                if res is None:
+                    continue
+                _, _, sd, start = res
+                try:
+                    o = deref(sd.data.get('Length'))
+                except PdfParseError:
+                    # A broken indirect /Length: only this stream is skipped
+                    continue
+                if o is None or o.type != EObject.INTEGER \
+                   or start + o.data > len(core.mm):
+                    continue
+                end = start + o.data
+                h, length = _hash(mv, start, end)
+                dhash, dlength = None, -1
+                if decoded:
+                    try:
+                        chain = filter_chain(sd, deref)
+                    except PdfParseError:
+                        # A broken indirect /DecodeParms, not decoded
+                        chain = []
+                    if len(chain) == 1 \
+                       and chain[0][0] in (b'FlateDecode', b'Fl') \
+                       and chain[0][1].get('Predictor', 1) == 1:
+                        dhash, dlength = _hash_inflated(mv, start, end)
+                yield objn, gen, h, length, dhash, dlength
+    finally:
+        core.close()
+
+#-------------------------------------------------------------------------------
+# class DedupIndex
+#-------------------------------------------------------------------------------
+
+schema = '''
+CREATE TABLE IF NOT EXISTS streams (
+    file TEXT NOT NULL,
+    objn INTEGER NOT NULL,
+    gen INTEGER NOT NULL,
+    hash BLOB NOT NULL,
+    length INTEGER NOT NULL,
+    dhash BLOB,
+    dlength INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS streams_file ON streams (file);
+CREATE INDEX IF NOT EXISTS streams_hash ON streams (hash);
+CREATE INDEX IF NOT EXISTS streams_dhash ON streams (dhash);
+'''
+
+class DedupIndex:
+    """An on-disk index of the stream hashes of many files."""
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(schema)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def add_file(self, filepath, decoded=False):
+        """Index the streams of a file (again, if it already was), return
+        their number."""
+        rows = [(filepath,) + row
+                for row in stream_hashes(filepath, decoded)]
+        with self.db:
+            self.db.execute('DELETE FROM streams WHERE file = ?', (filepath,))
+            self.db.executemany('INSERT INTO streams VALUES (?,?,?,?,?,?,?)',
+                                rows)
+        return len(rows)
+
+    def clusters(self, decoded=False, min_count=2):
+        """Return [(hash, length, [(file, objn, gen)])] for the groups of at
+        least min_count identical streams, the biggest savings first.
+
+        With decoded=True, the streams are grouped by decoded data, and
+        length is the decoded length.
+        """
+        h, n = ('dhash', 'dlength') if decoded else ('hash', 'length')
+        groups = self.db.execute(
+            f'SELECT {h}, {n}, COUNT(*) AS cnt FROM streams'
+            f' WHERE {h} IS NOT NULL GROUP BY {h}, {n}'
+            f' HAVING cnt >= ? ORDER BY (cnt - 1)*{n} DESC', (min_count,))
+        res = []
+        for digest, length, _ in groups.fetchall():
+            members = self.db.execute(
+                f'SELECT file, objn, gen FROM streams WHERE {h} = ?'
+                f' AND {n} = ? ORDER BY file, objn, gen', (digest, length))
+            res.append((digest, length, members.fetchall()))
+        return res
+
+    def saved(self, decoded=False):
+        """Return the number of bytes that keeping a single copy of each
+        group of identical streams would save."""
+        h, n = ('dhash', 'dlength') if decoded else ('hash', 'length')
+        row = self.db.execute(
+            f'SELECT SUM((cnt - 1)*len) FROM (SELECT COUNT(*) AS cnt,'
+            f' {n} AS len FROM streams WHERE {h} IS NOT NULL'
+            f' GROUP BY {h}, {n})').fetchone()
+        return row[0] or 0
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print(f'Usage: {sys.argv[0]} <index> <filepath> ...')
+        exit(-1)
+    with DedupIndex(sys.argv[1]) as index:
+        for filepath in sys.argv[2:]:
+            try:
+                cnt = index.add_file(filepath)
+            except (PdfParseError, OSError) as e:
+                print(f'{filepath}: {type(e).__name__}: {e}')
+                continue
+            print(f'{filepath}: {cnt} streams')
+        for digest, length, members in index.clusters():
+            print(f'{digest.hex()}: {length} bytes x {len(members)}')
+            for filepath, objn, gen in members:
+                print(f'    {filepath} {objn} {gen}')
+        print(f'{index.saved()} bytes saved')
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# dedup_index_t.py
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from dedup_index import DedupIndex, stream_hashes
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+def blake2b(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+class DedupIndexTest(unittest.TestCase):
+    """Test the stream deduplication index."""
+
+    path = 't'
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test01(self):
+        """Hashes of the stream data, raw and decoded."""
+        filepath = os.path.join(DedupIndexTest.path, 'doc05.pdf')
+        hashes = list(stream_hashes(filepath, decoded=True))
+        self.assertEqual([4, 5, 6, 7, 8], [objn for objn, *_ in hashes])
+        with open(filepath, 'rb') as f:
+            data = f.read()
+
+        # The JPEG data, not decoded
+        _, _, h, length, dhash, dlength = hashes[0]
+        self.assertEqual(1037, length)
+        k = data.index(b'\xff\xd8')
+        self.assertEqual(blake2b(data[k:k + length]), h)
+        self.assertEqual((None, -1), (dhash, dlength))
+
+        # The gray image, a Flate stream without predictor
+        _, _, h, length, dhash, dlength = hashes[1]
+        self.assertEqual((blake2b(bytes(range(12))), 12), (dhash, dlength))
+
+        # With a predictor, not decoded
+        self.assertIsNone(hashes[2][4])
+
+    def test02(self):
+        """Clusters of identical streams across files."""
+        copy = os.path.join(self.tmp, 'copy.pdf')
+        shutil.copy(os.path.join(DedupIndexTest.path, 'doc05.pdf'), copy)
+        filepaths = [os.path.join(DedupIndexTest.path, 'doc05.pdf'), copy,
+                     os.path.join(DedupIndexTest.path, 'doc01.pdf')]
+        with DedupIndex(os.path.join(self.tmp, 'index.db')) as index:
+            for filepath in filepaths:
+                index.add_file(filepath, decoded=True)
+            # Adding a file again replaces its rows
+            index.add_file(copy, decoded=True)
+
+            clusters = index.clusters()
+            self.assertEqual(5, len(clusters))
+            hashes = list(stream_hashes(copy))
+            self.assertEqual(sum(length for *_, length, _, _ in hashes),
+                             index.saved())
+            # The biggest, the JPEG data, comes first
+            digest, length, members = clusters[0]
+            self.assertEqual(1037, length)
+            self.assertEqual(sorted([(filepaths[0], 4, 0), (copy, 4, 0)]),
+                             members)
+            self.assertEqual(12, index.saved(decoded=True))
+
+        # The index stays on disk
+        with DedupIndex(os.path.join(self.tmp, 'index.db')) as index:
+            self.assertEqual(5, len(index.clusters()))
+
+    def test03(self):
+        """A broken indirect /Length skips its stream, not the file."""
+        with open(os.path.join(DedupIndexTest.path, 'doc01.pdf'), 'rb') as f:
+            data = f.read()
+        filepath = os.path.join(self.tmp, 'bad.pdf')
+        with open(filepath, 'wb') as f:
+            # Object 9 is the /Length of object 6
+            f.write(data.replace(b'9 0 obj\n49', b'9 0 obj\n}}'))
+        hashes = list(stream_hashes(filepath, decoded=True))
+        self.assertEqual([7], [objn for objn, *_ in hashes])
+        self.assertEqual(42, hashes[0][3])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
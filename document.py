@@ -0,0 +1,595 @@
+#!/usr/bin/env python
+# document.py - open a PDF file through its trailer and cross-reference table
+
+# Parsing objects from the beginning of the file doesn't work in general (see
+# the WARNING in pdf.py): a PDF file must be read from the end. The trailer
+# gives the offset of the last cross-reference section, which in turn gives
+# the offset of every indirect object.
+
+import io
+import mmap
+import os
+import sys
+import threading
+from collections import OrderedDict
+from filters import decode_stream
+from object_stream import EObject, ObjectStream, read_startxref, tail_sz, \
+    xref_section_from_stream, xref_section_from_table, filter_chain
+from token_stream import PdfParseError
+from lazy_object import lazy_indirect_object, parse_value
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# walk_pages
+#-------------------------------------------------------------------------------
+
+def walk_pages(trailer, deref):
+    """Yield the page dictionaries, in order, resolving objects with deref."""
+    root = deref(trailer.data['Root'])
+    node = deref(root.data['Pages'])
+
+    # Depth-first walk, the stack holds the nodes still to be visited
+    stack = [node]
+    seen = set()
+    while stack:
+        node = stack.pop()
+        if node is None or node.type != EObject.DICTIONARY:
+            continue
+        d = node.data
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        typ = d.get('Type')
+        if 'Kids' in d and (typ is None or typ.data == b'Pages'):
+            kids = deref(d['Kids']).data
+            stack.extend(deref(k) for k in reversed(kids))
+        else:
+            yield node
+
+#-------------------------------------------------------------------------------
+# class MmapFile
+#-------------------------------------------------------------------------------
+
+class MmapFile:
+    """A read-only file object over a shared mmap, with its own position."""
+
+    def __init__(self, mm):
+        self.mm = mm
+        self.pos = 0
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.pos
+        elif whence == os.SEEK_END:
+            offset += len(self.mm)
+        self.pos = max(0, offset)
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def read(self, n=-1):
+        end = len(self.mm) if n < 0 else self.pos + n
+        data = self.mm[self.pos:end]
+        self.pos += len(data)
+        return data
+
+    def close(self):
+        # The mmap belongs to the DocumentCore
+        pass
+
+#-------------------------------------------------------------------------------
+# class Revision
+#-------------------------------------------------------------------------------
+
+# PDF Spec, § 7.5.6 Incremental Updates: the contents of a PDF file can be
+# updated incrementally, by appending the changed objects, a new xref section
+# and a new trailer at the end of the file. The trailer of each update has a
+# /Prev key, the offset of the previous cross-reference section. Each xref
+# section, with its trailer, is a revision of the file.
+
+class Revision:
+    """A cross-reference section and its trailer."""
+
+    def __init__(self, offset):
+        self.offset = offset  # of the xref section, as given by startxref
+        self.xref_sec = None
+        self.trailer = None   # the trailer dictionary, a PdfObject
+
+    def prev(self):
+        """Return the offset of the previous revision, None if first."""
+        p = self.trailer.data.get('Prev')
+        return p.data if p is not None and p.type == EObject.INTEGER else None
+
+    def load(self, ob, buf=None):
+        """Parse the xref section and the trailer with ObjectStream 'ob'.
+
+        If buf, the contents of the file, is given, the entries of a xref
+        table are only decoded when they're looked up.
+        """
+        res = xref_section_from_table(buf, self.offset) if buf else None
+        if res:
+            xref_sec, pos = res
+            ob.seek(pos)
+            o = ob.next_object()
+            if o.type != EObject.TRAILER:
+                raise PdfParseError(f'expecting a trailer, got {o.type}',
+                                    pos)
+            self.trailer = o.data
+            self.xref_sec = xref_sec
+            return
+
+        ob.seek(self.offset)
+        o = ob.get_cross_reference()
+        if o.type == EObject.XREF_SECTION:
+            # Traditional: the trailer immediately follows the xref section
+            xref_sec = o.data
+            o = ob.next_object()
+            if o.type != EObject.TRAILER:
+                raise PdfParseError(f'expecting a trailer, got {o.type}',
+                                    self.offset)
+            self.trailer = o.data
+        else:
+            # Cross-reference stream: the stream dictionary is the trailer
+            couple = o.data['obj']
+            xref_sec = xref_section_from_stream(couple)
+            self.trailer = couple.data[0]
+        self.xref_sec = xref_sec
+
+#-------------------------------------------------------------------------------
+# class XrefIndex
+#-------------------------------------------------------------------------------
+
+class XrefIndex:
+    """The revisions of a file, newest first, seen as a single xref section.
+
+    An object is looked up in the newest revision first: the older revisions
+    are only loaded when needed. The interface is the part of XrefSection's
+    that ObjectStream.deref_object() uses.
+    """
+
+    def __init__(self, ob, revisions, buf=None):
+        self.ob = ob  # used to load revisions, under the lock
+        self.buf = buf
+        self.revisions = revisions
+        self.lock = threading.Lock()
+
+    def _load_next(self):
+        """Load the revision before the oldest one loaded, False if none."""
+        with self.lock:
+            prev = self.revisions[-1].prev()
+            if prev is None or prev in (r.offset for r in self.revisions):
+                # No more revisions, or a loop in the /Prev chain
+                return False
+            rev = Revision(prev)
+            rev.load(self.ob, self.buf)
+            self.revisions.append(rev)
+            return True
+
+    def find(self, objn):
+        """Return the xref section of the newest revision with objn in it."""
+        k = 0
+        while True:
+            if k == len(self.revisions) and not self._load_next():
+                return None
+            xref_sec = self.revisions[k].xref_sec
+            if xref_sec.get_object(objn, 0):
+                return xref_sec
+            k += 1
+
+    def get_object(self, objn, gen):
+        """Return the entry (x, gen, in_use) for objn, None if not found."""
+        xref_sec = self.find(objn)
+        return xref_sec.get_object(objn, gen) if xref_sec else None
+
+    def get_compressed(self, objn):
+        """Return the (object stream objn, index) of objn, None if it isn't
+        stored in an object stream."""
+        xref_sec = self.find(objn)
+        return xref_sec.compressed.get(objn) if xref_sec else None
+
+    def all_revisions(self):
+        """Load all the revisions, return them, newest first."""
+        while self._load_next():
+            pass
+        return self.revisions
+
+#-------------------------------------------------------------------------------
+# The index cache
+#-------------------------------------------------------------------------------
+
+# When a file is opened again, and it has only grown since the last time (new
+# incremental updates were appended), the revisions that were already loaded
+# are reused, and only the appended bytes are parsed. The index cache maps the
+# real path of a file to (size, tail, revisions): the file size, and its last
+# bytes (to check that they haven't changed), when the revisions were loaded.
+
+index_cache = OrderedDict()
+index_cache_sz = 64
+# Files are opened from many threads (metadata_batch(), parallel_decode,
+# AsyncDocument's executor)
+index_cache_lock = threading.Lock()
+
+def _known_revisions(filepath, mm):
+    """Return the cached revisions of a file if it has only grown, or []."""
+    key = os.path.realpath(filepath)
+    with index_cache_lock:
+        entry = index_cache.get(key)
+        if entry is None:
+            return 0, []
+        sz, tail, revisions = entry
+        if len(mm) < sz or mm[sz - len(tail):sz] != tail:
+            # The file was rewritten
+            del index_cache[key]
+            return 0, []
+        index_cache.move_to_end(key)
+        return sz, revisions
+
+def _remember_revisions(filepath, mm, revisions):
+    key = os.path.realpath(filepath)
+    entry = (len(mm), mm[max(0, len(mm) - tail_sz):], revisions)
+    with index_cache_lock:
+        index_cache[key] = entry
+        index_cache.move_to_end(key)
+        while len(index_cache) > index_cache_sz:
+            index_cache.popitem(last=False)
+
+#-------------------------------------------------------------------------------
+# class DocumentCore
+#-------------------------------------------------------------------------------
+
+# ObjectStream keeps a single cursor (ByteStream.pos, TokenStream.cc,
+# ObjectStream.tok), so one ObjectStream can't be used by two threads at the
+# same time. The document is therefore split in two: the DocumentCore holds
+# what is shared, the file mapped in memory, the xref index and the trailer
+# (all set by open(), then only read), and the cache of resolved objects. Each
+# thread reads objects through its own DocumentCursor.
+
+class DocumentCore:
+    """The shareable part of an open PDF file."""
+
+    def __init__(self, filepath, lazy=False):
+        self.filepath = filepath
+        self.lazy = lazy      # dictionaries and arrays parsed on access
+        self.mm = None
+        self.xref = None      # XrefIndex, all the revisions
+        self.xref_sec = None  # the xref section of the newest revision
+        self.trailer = None   # the newest trailer dictionary, a PdfObject
+        self.cache = {}       # objn -> PdfObject
+        self.objstms = {}     # objn -> decoded object stream, (data, spans)
+        self.lock = threading.Lock()  # protects the caches
+
+    #---------------------------------------------------------------------------
+    # open, close
+    #---------------------------------------------------------------------------
+
+    def open(self):
+        """Map the file, read the trailer and the cross-reference section."""
+        with open(self.filepath, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Errors are raised as exceptions, not returned as ERROR objects
+        mf = MmapFile(self.mm)
+        ob = ObjectStream(self.filepath, mf, strict=True)
+
+        # Load the revisions that were appended since the file was last
+        # opened, if it was, or just the newest one
+        known_sz, known = _known_revisions(self.filepath, self.mm)
+        if known and len(self.mm) == known_sz:
+            revisions = list(known)
+        else:
+            revisions = []
+            offset, _, _ = read_startxref(mf)
+            while True:
+                rev = Revision(offset)
+                rev.load(ob, self.mm)
+                revisions.append(rev)
+                offset = rev.prev()
+                if not known or offset is None or offset < known_sz:
+                    break
+            if known and offset == known[0].offset:
+                revisions.extend(known)
+
+        self.xref = XrefIndex(ob, revisions, self.mm)
+        self.xref_sec = revisions[0].xref_sec
+        self.trailer = revisions[0].trailer
+        _remember_revisions(self.filepath, self.mm, list(revisions))
+
+    def close(self):
+        if self.mm:
+            # Revisions loaded since open() will be reused too
+            _remember_revisions(self.filepath, self.mm,
+                                list(self.xref.revisions))
+            self.mm.close()
+            self.mm = None
+
+    #---------------------------------------------------------------------------
+    # cache
+    #---------------------------------------------------------------------------
+
+    def cached(self, objn):
+        with self.lock:
+            return self.cache.get(objn)
+
+    def add_cached(self, objn, obj):
+        """Cache obj, unless another thread got there first, and return the
+        cached object."""
+        with self.lock:
+            return self.cache.setdefault(objn, obj)
+
+    def objstm_cached(self, stm):
+        with self.lock:
+            return self.objstms.get(stm)
+
+    def add_objstm(self, stm, objstm):
+        with self.lock:
+            return self.objstms.setdefault(stm, objstm)
+
+    #---------------------------------------------------------------------------
+    # object_numbers
+    #---------------------------------------------------------------------------
+
+    def object_numbers(self):
+        """Return the (objn, gen) of every object in use, sorted."""
+        # Newer revisions override the entries of older ones
+        entries = {}
+        for rev in reversed(self.xref.all_revisions()):
+            xref_sec = rev.xref_sec
+            for subs in xref_sec.sub_sections:
+                for i, (x, gen, in_use) in enumerate(subs.entries):
+                    objn = subs.first_objn + i
+                    if in_use:
+                        entries[objn] = gen
+                    elif objn in xref_sec.compressed:
+                        # The generation number is implicitly 0
+                        entries[objn] = 0
+                    else:
+                        entries.pop(objn, None)
+        return sorted(entries.items())
+
+    def cursor(self):
+        return DocumentCursor(self)
+
+#-------------------------------------------------------------------------------
+# class DocumentCursor
+#-------------------------------------------------------------------------------
+
+class DocumentCursor:
+    """Reads objects from a DocumentCore, for use by a single thread."""
+
+    def __init__(self, core):
+        self.core = core
+        self.ob = ObjectStream(core.filepath, MmapFile(core.mm), strict=True)
+        # Indirect /Length values are read like any other object, they may
+        # be in an object stream
+        self.ob.xref_sec = core.xref
+        self.ob.resolve = self.deref
+
+    #---------------------------------------------------------------------------
+    # get_object
+    #---------------------------------------------------------------------------
+
+    def get_object(self, objn, gen=0, cache=True):
+        """Return the object defined with number objn, None if not found.
+
+        With cache=False, a newly parsed object isn't kept in the cache.
+        """
+        obj = self.core.cached(objn)
+        if obj is not None:
+            return obj
+
+        xref = self.core.xref
+
+        loc = xref.get_compressed(objn)
+        if loc:
+            obj = self._get_compressed(objn, *loc)
+            if obj is None or not cache:
+                return obj
+            return self.core.add_cached(objn, obj)
+
+        entry = xref.get_object(objn, gen)
+        if not entry:
+            return None
+        offset, _, in_use = entry
+        if not in_use:
+            return None
+
+        if self.core.lazy:
+            # Streams, and objects that are neither dictionaries nor arrays,
+            # are left to the ObjectStream
+            _, _, obj = lazy_indirect_object(self.core.mm, offset)
+            if obj is not None:
+                return self.core.add_cached(objn, obj) if cache else obj
+
+        self.ob.seek(offset)
+        o = self.ob.next_object()
+        if o.type != EObject.IND_OBJ_DEF:
+            raise PdfParseError('expecting an indirect object definition,'
+                                + f' got {o.type}', offset)
+
+        # The indirect object definition surrounds the object we want
+        obj = o.data['obj']
+        return self.core.add_cached(objn, obj) if cache else obj
+
+    #---------------------------------------------------------------------------
+    # Objects in object streams
+    #---------------------------------------------------------------------------
+
+    # PDF Spec, § 7.5.7 Object Streams: the stream data begins with N pairs of
+    # integers, the number of an object and its offset relative to /First.
+    # The objects follow, without 'obj' and 'endobj' around them.
+
+    def _object_stream(self, stm):
+        """Return (data, spans) for object stream stm, spans being the list of
+        (objn, start, end) of the objects in data."""
+        objstm = self.core.objstm_cached(stm)
+        if objstm is not None:
+            return objstm
+
+        o = self.get_object(stm, cache=False)
+        if o is None or o.type != EObject.COUPLE:
+            raise PdfParseError(f'object stream {stm} not found', 0)
+        sd, s = o.data
+        data, rest = decode_stream(s.data, filter_chain(sd, self.deref))
+        if rest:
+            raise PdfParseError(f'object stream {stm} filter {rest[0]}'
+                                + ' not supported', 0)
+        n = self.deref(sd.data['N']).data
+        first = self.deref(sd.data['First']).data
+        nums = [int(x) for x in data[:first].split()[:2*n]]
+        starts = [first + off for off in nums[1::2]] + [len(data)]
+        spans = [(nums[2*k], starts[k], starts[k + 1]) for k in range(n)]
+        return self.core.add_objstm(stm, (data, spans))
+
+    def _get_compressed(self, objn, stm, idx):
+        """Return object objn, the idx'th object in object stream stm."""
+        data, spans = self._object_stream(stm)
+        if idx >= len(spans) or spans[idx][0] != objn:
+            # The index is wrong, look for the object number
+            idx = next((k for k, sp in enumerate(spans) if sp[0] == objn), None)
+            if idx is None:
+                return None
+        _, start, end = spans[idx]
+        if self.core.lazy:
+            return parse_value(data, start, end)
+        # The trailing space ends the object, see parse_value()
+        ob = ObjectStream(self.core.filepath,
+                          io.BytesIO(data[start:end] + b' '), strict=True)
+        return ob.next_object()
+
+    #---------------------------------------------------------------------------
+    # deref
+    #---------------------------------------------------------------------------
+
+    def deref(self, o):
+        """Return the object referenced by 'o', or 'o' itself if direct."""
+        if o is None or o.type != EObject.IND_OBJ_REF:
+            return o
+        return self.get_object(o.data['objn'], o.data['gen'])
+
+    #---------------------------------------------------------------------------
+    # objects
+    #---------------------------------------------------------------------------
+
+    def objects(self):
+        """Yield (objn, gen, PdfObject) for every object in use."""
+        for objn, gen in self.core.object_numbers():
+            yield objn, gen, self.get_object(objn, gen)
+
+    #---------------------------------------------------------------------------
+    # pages
+    #---------------------------------------------------------------------------
+
+    def pages(self):
+        """Yield the page dictionaries, in order, walking the page tree."""
+        return walk_pages(self.core.trailer, self.deref)
+
+#-------------------------------------------------------------------------------
+# class PdfDocument
+#-------------------------------------------------------------------------------
+
+class PdfDocument:
+    """A PDF file, with its trailer and cross-reference table.
+
+    A PdfDocument can be used by several threads at once: each one gets its
+    own cursor over the shared core. With lazy=True, the values in
+    dictionaries and arrays are only parsed when they're accessed.
+    """
+
+    def __init__(self, filepath, lazy=False):
+        self.filepath = filepath
+        self.lazy = lazy
+        self.core = DocumentCore(filepath, lazy)
+        self.local = threading.local()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def trailer(self):
+        return self.core.trailer
+
+    @property
+    def xref_sec(self):
+        return self.core.xref_sec
+
+    @property
+    def cache(self):
+        return self.core.cache
+
+    def cursor(self):
+        """Return the calling thread's cursor, creating it if needed."""
+        cur = getattr(self.local, 'cursor', None)
+        if cur is None or cur.core is not self.core:
+            cur = self.local.cursor = self.core.cursor()
+        return cur
+
+    #---------------------------------------------------------------------------
+    # open, close
+    #---------------------------------------------------------------------------
+
+    def open(self):
+        """Open the file, read the trailer and the cross-reference section."""
+        self.core = DocumentCore(self.filepath, self.lazy)
+        self.core.open()
+
+    def close(self):
+        # The cursors of all the threads become unusable
+        self.core.close()
+
+    #---------------------------------------------------------------------------
+    # Reading objects, through the calling thread's cursor
+    #---------------------------------------------------------------------------
+
+    def get_object(self, objn, gen=0):
+        """Return the object defined with number objn, None if not found."""
+        return self.cursor().get_object(objn, gen)
+
+    def deref(self, o):
+        """Return the object referenced by 'o', or 'o' itself if direct."""
+        return self.cursor().deref(o)
+
+    def object_numbers(self):
+        """Return the (objn, gen) of every object in use, sorted."""
+        return self.core.object_numbers()
+
+    def revisions(self):
+        """Return the revisions of the file, newest first."""
+        return self.core.xref.all_revisions()
+
+    def objects(self):
+        """Yield (objn, gen, PdfObject) for every object in use."""
+        for objn, gen in self.object_numbers():
+            yield objn, gen, self.get_object(objn, gen)
+
+    def pages(self):
+        """Yield the page dictionaries, in order, walking the page tree."""
+        # Each object is resolved by the cursor of the thread that advances the
+        # iterator, which needn't be the thread that created it
+        return walk_pages(self.trailer, self.deref)
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    print('This module is not meant to be executed directly.')
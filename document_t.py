@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# document_t.py
+
+import os
+import tempfile
+import unittest
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from object_stream import EObject
+import document
+from document import PdfDocument, index_cache
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# A file with an xref stream, and the /Length of a stream in an object stream
+#-------------------------------------------------------------------------------
+
+def objstm_pdf():
+    """Return the bytes of the file: 1, 2 and 4 are in object stream 5."""
+    objs = [b'<</Type/Catalog/Pages 2 0 R>>', b'<</Type/Pages/Kids[]/Count 0>>',
+            b'11']
+    heads, body = [], b''
+    for objn, o in zip((1, 2, 4), objs):
+        heads.append(b'%d %d' % (objn, len(body)))
+        body += o + b' '
+    head = b' '.join(heads) + b' '
+    objstm = (b'<</Type/ObjStm/N 3/First %d/Length %d>>\nstream\n%s\nendstream'
+              % (len(head), len(head + body), head + body))
+    out = bytearray(b'%PDF-1.5\n')
+    offsets = {}
+    for objn, o in ((3, b'<</Length 4 0 R>>\nstream\nHello world\nendstream'),
+                    (5, objstm)):
+        offsets[objn] = len(out)
+        out += b'%d 0 obj\n%s\nendobj\n' % (objn, o)
+    offsets[6] = len(out)
+    rows = [(0, 0, 0), (2, 5, 0), (2, 5, 1), (1, offsets[3], 0), (2, 5, 2),
+            (1, offsets[5], 0), (1, offsets[6], 0)]
+    xref = b''.join(bytes([t]) + x.to_bytes(4, 'big') + g.to_bytes(2, 'big')
+                    for t, x, g in rows)
+    out += (b'6 0 obj\n<</Type/XRef/Size 7/W[1 4 2]/Root 1 0 R/Length %d>>\n'
+            b'stream\n%s\nendstream\nendobj\nstartxref\n%d\n%%%%EOF\n'
+            % (len(xref), xref, offsets[6]))
+    return bytes(out)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class PdfDocumentTest(unittest.TestCase):
+    """Test opening PDF files through their trailer and xref table."""
+
+    path = 't'
+
+    def test01(self):
+        """Traditional xref table and trailer."""
+        filepath = os.path.join(PdfDocumentTest.path, 'doc01.pdf')
+        with PdfDocument(filepath) as doc:
+            d = doc.trailer.data
+            self.assertEqual(11, d['Size'].data)
+            self.assertEqual(EObject.IND_OBJ_REF, d['Root'].type)
+
+            root = doc.deref(d['Root'])
+            self.assertEqual(b'Catalog', root.data['Type'].data)
+
+            # Objects 1 to 10 are in use
+            objs = list(doc.objects())
+            self.assertEqual(list(range(1, 11)), [x[0] for x in objs])
+            self.assertEqual(49, doc.get_object(9).data)
+
+    def test02(self):
+        """Stream with an indirect /Length."""
+        filepath = os.path.join(PdfDocumentTest.path, 'doc01.pdf')
+        with PdfDocument(filepath) as doc:
+            o = doc.get_object(6)
+            self.assertEqual(EObject.COUPLE, o.type)
+            d, s = o.data
+            self.assertEqual(49, len(s.data))
+            self.assertTrue(zlib.decompress(s.data).startswith(b'BT\n/F1'))
+
+    def test03(self):
+        """Page tree with an intermediate Pages node."""
+        filepath = os.path.join(PdfDocumentTest.path, 'doc01.pdf')
+        with PdfDocument(filepath) as doc:
+            pages = list(doc.pages())
+            self.assertEqual(2, len(pages))
+            self.assertEqual(6, pages[0].data['Contents'].data['objn'])
+            self.assertEqual(7, pages[1].data['Contents'].data['objn'])
+
+    def test04(self):
+        """Cross-reference stream."""
+        filepath = os.path.join(PdfDocumentTest.path, 'doc02.pdf')
+        with PdfDocument(filepath) as doc:
+            self.assertEqual(b'XRef', doc.trailer.data['Type'].data)
+            self.assertEqual({1: (11, 0), 2: (11, 1), 8: (11, 2)},
+                             doc.xref_sec.compressed)
+            o = doc.get_object(3)
+            self.assertEqual(b'Page', o.data['Type'].data)
+            o = doc.get_object(11)
+            self.assertEqual(b'ObjStm', o.data[0].data['Type'].data)
+
+            # Objects stored in the object stream
+            o = doc.deref(doc.trailer.data['Root'])
+            self.assertEqual(b'Catalog', o.data['Type'].data)
+            self.assertEqual(b'Compressed objects',
+                             doc.get_object(8).data['Title'].data)
+            self.assertEqual([6, 7], [p.data['Contents'].data['objn']
+                                      for p in doc.pages()])
+
+    def test05(self):
+        """Objects resolved by several threads at the same time."""
+        filepath = os.path.join(PdfDocumentTest.path, 'doc01.pdf')
+        with PdfDocument(filepath) as doc:
+            expected = [str(o) for _, _, o in doc.objects()]
+            objns = [objn for objn, _ in doc.object_numbers()]
+
+        def resolve(doc, objn):
+            return str(doc.get_object(objn))
+
+        with PdfDocument(filepath) as doc:
+            with ThreadPoolExecutor(max_workers=4) as ex:
+                for _ in range(10):
+                    doc.cache.clear()
+                    got = list(ex.map(resolve, [doc]*len(objns), objns))
+                    self.assertEqual(expected, got)
+
+    def test06(self):
+        """Incremental updates: an object changed, one added then deleted."""
+        filepath = os.path.join(PdfDocumentTest.path, 'doc03.pdf')
+        # Forget the revisions loaded by other tests
+        index_cache.clear()
+        with PdfDocument(filepath) as doc:
+            # Only the newest revision is loaded when the file is opened
+            self.assertEqual(1, len(doc.core.xref.revisions))
+            o = doc.get_object(8)
+            self.assertEqual(b'Updated document', o.data['Title'].data)
+            self.assertIsNone(doc.get_object(11))
+            self.assertEqual(list(range(1, 11)),
+                             [objn for objn, _ in doc.object_numbers()])
+            revs = doc.revisions()
+            self.assertEqual([1384, 1233, 832], [r.offset for r in revs])
+            self.assertEqual(1233, revs[0].trailer.data['Prev'].data)
+            self.assertIsNone(revs[2].prev())
+
+    def test07(self):
+        """Opening again a file that has grown."""
+        with open(os.path.join(PdfDocumentTest.path, 'doc03.pdf'), 'rb') as f:
+            data = f.read()
+        with tempfile.TemporaryDirectory() as tmp:
+            filepath = os.path.join(tmp, 'grown.pdf')
+            with open(filepath, 'wb') as f:
+                f.write(data[:1384])  # doc01.pdf + first update
+            with PdfDocument(filepath) as doc:
+                first = doc.revisions()
+                self.assertEqual(2, len(first))
+                self.assertIsNotNone(doc.get_object(11))
+
+            with open(filepath, 'ab') as f:
+                f.write(data[1384:])
+            with PdfDocument(filepath) as doc:
+                # The revisions already known are reused, not parsed again
+                revs = doc.core.xref.revisions
+                self.assertEqual(3, len(revs))
+                self.assertIs(first[0], revs[1])
+                self.assertIs(first[1], revs[2])
+                self.assertIsNone(doc.get_object(11))
+
+            # Rewritten, not grown
+            with open(filepath, 'wb') as f:
+                f.write(data[:1384])
+            with PdfDocument(filepath) as doc:
+                self.assertEqual(1, len(doc.core.xref.revisions))
+                self.assertIsNot(first[0], doc.core.xref.revisions[0])
+
+    def test08(self):
+        """Files opened from many threads, the index cache evicting."""
+        filepaths = [os.path.join(PdfDocumentTest.path, name)
+                     for name in ('doc01.pdf', 'doc02.pdf', 'doc03.pdf',
+                                  'doc04.pdf', 'doc05.pdf', 'doc06.pdf')]
+
+        def catalog(filepath):
+            with PdfDocument(filepath) as doc:
+                root = doc.core.trailer.data['Root']
+                return str(doc.deref(root))
+
+        expected = [catalog(fp) for fp in filepaths]
+        sz = document.index_cache_sz
+        document.index_cache_sz = 2
+        try:
+            with ThreadPoolExecutor(max_workers=16) as ex:
+                got = list(ex.map(catalog, filepaths*50))
+        finally:
+            document.index_cache_sz = sz
+        self.assertEqual(expected*50, got)
+
+    def test09(self):
+        """A stream /Length stored in an object stream."""
+        with tempfile.TemporaryDirectory() as tmp:
+            filepath = os.path.join(tmp, 'objstm.pdf')
+            with open(filepath, 'wb') as f:
+                f.write(objstm_pdf())
+            for lazy in (False, True):
+                with PdfDocument(filepath, lazy=lazy) as doc:
+                    self.assertEqual({1: (5, 0), 2: (5, 1), 4: (5, 2)},
+                                     doc.xref_sec.compressed)
+                    sd, s = doc.get_object(3).data
+                    self.assertEqual(b'Hello world', bytes(s.data))
+                    self.assertEqual(11, doc.get_object(4).data)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# filters.py - decode the data of PDF streams
+
+import base64
+import binascii
+import sys
+import zlib
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# class FilterError
+#-------------------------------------------------------------------------------
+
+class FilterError(Exception):
+    """The stream data could not be decoded."""
+    pass
+
+#-------------------------------------------------------------------------------
+# png_unpredict
+#-------------------------------------------------------------------------------
+
+# PDF Spec, § 7.4.4.4 LZW and Flate Predictor Functions: with Predictor >= 10,
+# each row of data is preceded by a byte giving the PNG filter type (0 None,
+# 1 Sub, 2 Up, 3 Average, 4 Paeth) that was used for that particular row.
+
+def png_unpredict(data, columns=1, colors=1, bpc=8):
+    """Undo the PNG predictors applied to the rows of 'data'."""
+    bpp = max(1, colors*bpc//8)  # bytes per pixel, at least one
+    rowlen = (columns*colors*bpc + 7)//8
+    out = bytearray()
+    prev = bytearray(rowlen)
+    for start in range(0, len(data), rowlen + 1):
+        ftype = data[start]
+        row = bytearray(data[start + 1:start + 1 + rowlen])
+        if len(row) < rowlen:
+            # Truncated last row
+            row += bytes(rowlen - len(row))
+        if ftype == 0:
+            pass
+        elif ftype == 1:
+            for i in range(bpp, rowlen):
+                row[i] = (row[i] + row[i - bpp]) & 0xff
+        elif ftype == 2:
+            for i in range(rowlen):
+                row[i] = (row[i] + prev[i]) & 0xff
+        elif ftype == 3:
+            for i in range(rowlen):
+                left = row[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + ((left + prev[i]) >> 1)) & 0xff
+        elif ftype == 4:
+            for i in range(rowlen):
+                a = row[i - bpp] if i >= bpp else 0
+                b = prev[i]
+                c = prev[i - bpp] if i >= bpp else 0
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                if pa <= pb and pa <= pc:
+                    pred = a
+                elif pb <= pc:
+                    pred = b
+                else:
+                    pred = c
+                row[i] = (row[i] + pred) & 0xff
+        else:
+            raise FilterError(f'Unknown PNG predictor type {ftype}')
+        out += row
+        prev = row
+    return bytes(out)
+
+#-------------------------------------------------------------------------------
+# tiff_unpredict
+#-------------------------------------------------------------------------------
+
+def tiff_unpredict(data, columns=1, colors=1, bpc=8):
+    """Undo TIFF predictor 2 (only 8 bits per component is supported)."""
+    if bpc != 8:
+        raise FilterError(f'TIFF predictor with {bpc} bits per component'
+                          + ' not supported')
+    rowlen = columns*colors
+    out = bytearray(data)
+    for start in range(0, len(out), rowlen):
+        for i in range(start + colors, min(start + rowlen, len(out))):
+            out[i] = (out[i] + out[i - colors]) & 0xff
+    return bytes(out)
+
+#-------------------------------------------------------------------------------
+# flate_decode
+#-------------------------------------------------------------------------------
+
+def flate_decode(data, predictor=1, columns=1, colors=1, bpc=8):
+    """Decompress zlib/deflate data, then undo the predictor, if any."""
+    try:
+        zd = zlib.decompress(data)
+    except zlib.error:
+        # Many files have truncated or slightly corrupt streams, keep whatever
+        # could be decompressed
+        d = zlib.decompressobj()
+        try:
+            zd = d.decompress(data)
+        except zlib.error as e:
+            raise FilterError(f'FlateDecode: {e}')
+    if predictor >= 10:
+        return png_unpredict(zd, columns, colors, bpc)
+    if predictor == 2:
+        return tiff_unpredict(zd, columns, colors, bpc)
+    return zd
+
+#-------------------------------------------------------------------------------
+# ascii_hex_decode, ascii85_decode
+#-------------------------------------------------------------------------------
+
+def ascii_hex_decode(data):
+    """Decode ASCIIHexDecode data, white space is ignored, '>' ends it."""
+    k = data.find(b'>')
+    if k != -1:
+        data = data[:k]
+    data = b''.join(data.split())
+    if len(data) % 2 == 1:
+        # A missing final digit is taken to be 0
+        data += b'0'
+    try:
+        return binascii.unhexlify(data)
+    except binascii.Error as e:
+        raise FilterError(f'ASCIIHexDecode: {e}')
+
+def ascii85_decode(data):
+    """Decode ASCII85Decode data, white space is ignored, '~>' ends it."""
+    k = data.find(b'~>')
+    if k != -1:
+        data = data[:k]
+    data = b''.join(data.split())
+    try:
+        return base64.a85decode(data)
+    except ValueError as e:
+        raise FilterError(f'ASCII85Decode: {e}')
+
+#-------------------------------------------------------------------------------
+# run_length_decode
+#-------------------------------------------------------------------------------
+
+def run_length_decode(data):
+    """Decode RunLengthDecode data."""
+    out = bytearray()
+    i = 0
+    while i < len(data):
+        n = data[i]
+        if n == 128:
+            # EOD
+            break
+        if n < 128:
+            # Copy the next n + 1 bytes literally
+            out += data[i + 1:i + 2 + n]
+            i += 2 + n
+        else:
+            # Repeat the next byte 257 - n times
+            if i + 1 < len(data):
+                out += data[i + 1:i + 2]*(257 - n)
+            i += 2
+    return bytes(out)
+
+#-------------------------------------------------------------------------------
+# lzw_decode
+#-------------------------------------------------------------------------------
+
+def lzw_decode(data, early_change=1):
+    """Decode LZWDecode data (variable code length, 9 to 12 bits)."""
+    out = bytearray()
+    table = [bytes([i]) for i in range(256)] + [None, None]
+    code_len = 9
+    prev = None
+    acc = 0  # bit accumulator
+    nbits = 0
+    for byte in data:
+        acc = (acc << 8) | byte
+        nbits += 8
+        while nbits >= code_len:
+            nbits -= code_len
+            code = (acc >> nbits) & ((1 << code_len) - 1)
+            if code == 256:
+                # Clear table
+                del table[258:]
+                code_len = 9
+                prev = None
+                continue
+            if code == 257:
+                # EOD
+                return bytes(out)
+            if code < len(table):
+                entry = table[code]
+                if prev is not None:
+                    table.append(prev + entry[:1])
+            elif code == len(table) and prev is not None:
+                entry = prev + prev[:1]
+                table.append(entry)
+            else:
+                raise FilterError(f'LZWDecode: invalid code {code}')
+            out += entry
+            prev = entry
+            if len(table) + early_change >= (1 << code_len) and code_len < 12:
+                code_len += 1
+    return bytes(out)
+
+#-------------------------------------------------------------------------------
+# decode_stream
+#-------------------------------------------------------------------------------
+
+# Image filters: the data is left encoded, it's meant for an image decoder
+image_filters = {b'DCTDecode', b'JPXDecode', b'JBIG2Decode', b'CCITTFaxDecode'}
+
+def _unpredict(data, parms):
+    predictor = parms.get('Predictor', 1)
+    columns = parms.get('Columns', 1)
+    colors = parms.get('Colors', 1)
+    bpc = parms.get('BitsPerComponent', 8)
+    if predictor >= 10:
+        return png_unpredict(data, columns, colors, bpc)
+    if predictor == 2:
+        return tiff_unpredict(data, columns, colors, bpc)
+    return data
+
+def decode_stream(data, chain):
+    """Apply the filters in 'chain' to data, until an image filter is found.
+
+    'chain' is a list of (filter name, parms) tuples, as returned by
+    object_stream.filter_chain(). Return a tuple (data, rest), with 'rest' the
+    list of the filter names that were not applied.
+    """
+    for k, (name, parms) in enumerate(chain):
+        if name in (b'FlateDecode', b'Fl'):
+            data = flate_decode(data)
+            data = _unpredict(data, parms)
+        elif name in (b'LZWDecode', b'LZW'):
+            data = lzw_decode(data, parms.get('EarlyChange', 1))
+            data = _unpredict(data, parms)
+        elif name in (b'ASCIIHexDecode', b'AHx'):
+            data = ascii_hex_decode(data)
+        elif name in (b'ASCII85Decode', b'A85'):
+            data = ascii85_decode(data)
+        elif name in (b'RunLengthDecode', b'RL'):
+            data = run_length_decode(data)
+        elif name in image_filters or name in (b'DCT', b'CCF'):
+            return data, [n for n, _ in chain[k:]]
+        else:
+            raise FilterError(f'Unsupported filter {name.decode()}')
+    return data, []
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    print('This module is not meant to be executed directly.')
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# filters_t.py
+
+import unittest
+import zlib
+from filters import FilterError, ascii_hex_decode, ascii85_decode, \
+    run_length_decode, lzw_decode, decode_stream
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class FiltersTest(unittest.TestCase):
+    """Test the stream filters."""
+
+    def test01(self):
+        """ASCIIHexDecode, ASCII85Decode, RunLengthDecode."""
+        self.assertEqual(b'\x01\xab\x50', ascii_hex_decode(b'01 aB\r\n5>'))
+        self.assertEqual(b'Man ', ascii85_decode(b'9jqo\n^~>'))
+        self.assertEqual(b'abcxxxxd',
+                         run_length_decode(b'\x02abc\xfdx\x00d\x80zz'))
+
+    def test02(self):
+        """LZWDecode, the example in the PDF Spec, § 7.4.4.2."""
+        data = bytes.fromhex('800b6050220c0c8501')
+        self.assertEqual(b'-----A---B', lzw_decode(data))
+
+        # Codes past the end of the table, first and after another code
+        for data in [b'\xff\xff\xff\xff', bytes.fromhex('800bffff')]:
+            with self.assertRaises(FilterError):
+                lzw_decode(data)
+
+    def test03(self):
+        """A chain of filters, stopped by an image filter."""
+        data = zlib.compress(b'some data').hex().encode() + b'>'
+        chain = [(b'ASCIIHexDecode', {}), (b'FlateDecode', {})]
+        self.assertEqual((b'some data', []), decode_stream(data, chain))
+
+        chain.append((b'DCTDecode', {}))
+        self.assertEqual((b'some data', [b'DCTDecode']),
+                         decode_stream(data, chain))
+
+        with self.assertRaises(FilterError):
+            decode_stream(b'', [(b'Crypt', {})])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
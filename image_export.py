@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+# image_export.py - write the images of PDF files to disk
+
+# Image XObjects (PDF Spec, § 8.9.5) are streams with /Subtype /Image. Their
+# data is found with lazy_stream(), straight in the mapped file, without the
+# stream going through the parser (which copies it into a bytearray):
+#
+#     - DCTDecode and JPXDecode data is a complete JPEG or JPEG 2000 file. It
+#       is written from the file to the disk with os.sendfile(), or from a
+#       memoryview of the mmap: the bytes aren't copied in python.
+#
+#     - FlateDecode data with a PNG predictor is already what a PNG file
+#       holds in its IDAT chunks: it's written as is, behind a PNG header.
+#
+#     - Other FlateDecode data is decompressed a chunk at a time, and written
+#       as PNG (gray or RGB) or as raw samples.
+#
+# Other images (CCITT, JBIG2, ...) are skipped, with the reason. Batches of
+# files are exported in a thread pool: the work is mostly waiting on the
+# disk, and sendfile() and zlib release the GIL.
+#
+#     for img in export_images(filepath, outdir):
+#         print(img)
+
+import os
+import struct
+import sys
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from document import DocumentCore
+from filters import FilterError, decode_stream
+from lazy_object import lazy_stream
+from object_stream import EObject, PdfObject, filter_chain
+from token_stream import PdfParseError
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# class ExportedImage
+#-------------------------------------------------------------------------------
+
+class ExportedImage:
+    """An image stream, and where it was written."""
+
+    def __init__(self, objn, gen):
+        self.objn = objn
+        self.gen = gen
+        self.width = None
+        self.height = None
+        self.format = None  # 'jpg', 'jp2', 'png', 'raw'
+        self.path = None    # the file written, None if it wasn't
+        self.size = 0       # bytes written
+        self.error = None   # str, why the image wasn't written
+
+    def __str__(self):
+        s = f'{self.objn} {self.gen}: {self.width}x{self.height}'
+        if self.error:
+            return s + f', {self.error}'
+        return s + f', {self.format}, {self.size} bytes -> {self.path}'
+
+#-------------------------------------------------------------------------------
+# Writing
+#-------------------------------------------------------------------------------
+
+# Bytes per os.sendfile() call, per IDAT chunk, per decompression step
+chunk_sz = 1024*1024
+
+# zlib level of the rows that have to be compressed again: the images are
+# written for looking at, not for keeping, speed matters more than size
+png_level = 1
+
+def _copy(mm, fd, out, start, length):
+    """Write mm[start:start+length] to file out, without copying in python."""
+    if fd is not None and hasattr(os, 'sendfile'):
+        out.flush()
+        end = start + length
+        while start < end:
+            n = os.sendfile(out.fileno(), fd, start, end - start)
+            if n == 0:
+                break
+            start += n
+        return
+    with memoryview(mm) as mv:
+        out.write(mv[start:start + length])
+
+def _png_chunk(out, typ, data):
+    out.write(struct.pack('>I', len(data)))
+    out.write(typ)
+    out.write(data)
+    out.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(typ))))
+
+def _png_header(out, width, height, bpc, colors):
+    out.write(b'\x89PNG\r\n\x1a\n')
+    color_type = 0 if colors == 1 else 2
+    _png_chunk(out, b'IHDR', struct.pack('>IIBBBBB', width, height, bpc,
+                                         color_type, 0, 0, 0))
+
+def _inflate(mm, start, length):
+    """Yield the decompressed data of mm[start:start+length], by chunks."""
+    d = zlib.decompressobj()
+    with memoryview(mm) as mv:
+        for k in range(start, start + length, chunk_sz):
+            data = d.decompress(mv[k:min(k + chunk_sz, start + length)])
+            if data:
+                yield data
+            if d.eof:
+                break
+    data = d.flush()
+    if data:
+        yield data
+
+def _write_png_rows(out, rows, row_sz):
+    """Write the IDAT chunks of unfiltered rows, coming in chunks of bytes."""
+    z = zlib.compressobj(png_level)
+    buf = bytearray()
+    for data in rows:
+        buf += data
+        k = len(buf) - len(buf) % row_sz
+        if k == 0:
+            continue
+        # A filter type byte (0, none) in front of every row
+        filtered = bytearray()
+        for i in range(0, k, row_sz):
+            filtered += b'\x00'
+            filtered += buf[i:i + row_sz]
+        del buf[:k]
+        comp = z.compress(filtered)
+        if comp:
+            _png_chunk(out, b'IDAT', comp)
+    _png_chunk(out, b'IDAT', z.flush())
+
+#-------------------------------------------------------------------------------
+# export_image
+#-------------------------------------------------------------------------------
+
+def _name(o):
+    return bytes(o.data) if o is not None and o.type == EObject.NAME else None
+
+def _int(o):
+    return o.data if o is not None and o.type == EObject.INTEGER else None
+
+def _colors(d, deref):
+    """Return the number of color components of an image, None if it can't
+    be written as PNG."""
+    if d.get('ImageMask') is not None and deref(d['ImageMask']).data is True:
+        return 1
+    cs = deref(d.get('ColorSpace'))
+    name = _name(cs)
+    if name in (b'DeviceGray', b'CalGray', b'G'):
+        return 1
+    if name in (b'DeviceRGB', b'CalRGB', b'RGB'):
+        return 3
+    if cs is not None and cs.type == EObject.ARRAY and len(cs.data) == 2 \
+       and _name(deref(cs.data[0])) == b'ICCBased':
+        icc = deref(cs.data[1])
+        if icc is not None and icc.type == EObject.COUPLE:
+            n = _int(deref(icc.data[0].data.get('N')))
+            return n if n in (1, 3) else None
+    return None
+
+def export_image(core, fd, objn, gen, d, start, outdir, prefix, png=True):
+    """Write one image stream, return its ExportedImage.
+
+    d is the stream dictionary (a python dict), start the offset of the
+    stream data in core.mm.
+    """
+    deref = core.cursor().deref
+    img = ExportedImage(objn, gen)
+    img.width = _int(deref(d.get('Width')))
+    img.height = _int(deref(d.get('Height')))
+    length = _int(deref(d.get('Length')))
+    if length is None or start + length > len(core.mm):
+        img.error = 'no valid /Length'
+        return img
+    chain = filter_chain(PdfObject(EObject.DICTIONARY, d), deref)
+    names = [name for name, _ in chain]
+    base = os.path.join(outdir, f'{prefix}-{objn}-{gen}')
+
+    if names and names[-1] in (b'DCTDecode', b'DCT', b'JPXDecode'):
+        img.format = 'jp2' if names[-1] == b'JPXDecode' else 'jpg'
+        img.path = f'{base}.{img.format}'
+        if len(names) == 1:
+            with open(img.path, 'wb') as out:
+                _copy(core.mm, fd, out, start, length)
+        else:
+            # Something like [/FlateDecode /DCTDecode], decode the first ones
+            try:
+                data, _ = decode_stream(core.mm[start:start + length], chain)
+            except FilterError as e:
+                img.path = None
+                img.error = str(e)
+                return img
+            with open(img.path, 'wb') as out:
+                out.write(data)
+        img.size = os.path.getsize(img.path)
+        return img
+
+    if names not in ([b'FlateDecode'], [b'Fl'], []):
+        img.error = 'unsupported filters ' + ' '.join(n.decode() for n in names)
+        return img
+
+    bpc = _int(deref(d.get('BitsPerComponent'))) or 1
+    colors = _colors(d, deref)
+    parms = chain[0][1] if chain else {}
+    predictor = parms.get('Predictor', 1)
+    if png and colors and img.width and img.height \
+       and (bpc in (1, 2, 4, 8, 16) if colors == 1 else bpc in (8, 16)):
+        img.format = 'png'
+        img.path = f'{base}.png'
+        with open(img.path, 'wb') as out:
+            _png_header(out, img.width, img.height, bpc, colors)
+            if names and predictor >= 10 \
+               and parms.get('Colors', 1) == colors \
+               and parms.get('BitsPerComponent', 8) == bpc \
+               and parms.get('Columns', 1) == img.width:
+                # The rows are already PNG filtered and compressed
+                with memoryview(core.mm) as mv:
+                    for k in range(start, start + length, chunk_sz):
+                        _png_chunk(out, b'IDAT',
+                                   mv[k:min(k + chunk_sz, start + length)])
+            elif names and predictor == 1:
+                row_sz = (img.width*colors*bpc + 7) // 8
+                _write_png_rows(out, _inflate(core.mm, start, length), row_sz)
+            elif not names:
+                row_sz = (img.width*colors*bpc + 7) // 8
+                with memoryview(core.mm) as mv:
+                    _write_png_rows(out, [mv[start:start + length]], row_sz)
+            else:
+                out.close()
+                os.remove(img.path)
+                img.path = None
+                return _export_raw(core, img, start, length, chain, base)
+            _png_chunk(out, b'IEND', b'')
+        img.size = os.path.getsize(img.path)
+        return img
+    return _export_raw(core, img, start, length, chain, base)
+
+def _export_raw(core, img, start, length, chain, base):
+    """Write the decoded samples, as they are."""
+    img.format = 'raw'
+    img.path = f'{base}.raw'
+    with open(img.path, 'wb') as out:
+        if chain and chain[0][1].get('Predictor', 1) == 1:
+            for data in _inflate(core.mm, start, length):
+                out.write(data)
+        elif chain:
+            try:
+                data, _ = decode_stream(core.mm[start:start + length], chain)
+            except (FilterError, zlib.error) as e:
+                img.error = str(e)
+                data = b''
+            out.write(data)
+        else:
+            _copy(core.mm, None, out, start, length)
+    img.size = os.path.getsize(img.path)
+    return img
+
+#-------------------------------------------------------------------------------
+# export_images
+#-------------------------------------------------------------------------------
+
+def export_images(filepath, outdir, png=True):
+    """Write the images of a PDF file to outdir, return their ExportedImage.
+
+    The files are named <file name>-<objn>-<gen>.<format>. With png=False,
+    Flate images are written as raw samples.
+    """
+    os.makedirs(outdir, exist_ok=True)
+    prefix = os.path.splitext(os.path.basename(filepath))[0]
+    images = []
+    core = DocumentCore(filepath, lazy=True)
+    core.open()
+    fd = os.open(filepath, os.O_RDONLY)
+    try:
+        for objn, gen in core.object_numbers():
+            if core.xref.get_compressed(objn):
+                # Streams are never stored in object streams
+                continue
+            offset = core.xref.get_object(objn, gen)[0]
+            try:
+                res = lazy_stream(core.mm, offset)
+            except PdfParseError:
+                continue
+            if res is None:
+                continue
+            _, _, sd, start = res
+            d = sd.data
+            sub = d.get('Subtype')
+            if sub is None or sub.type != EObject.NAME \
+               or bytes(sub.data) != b'Image':
+                continue
+            try:
+                images.append(export_image(core, fd, objn, gen, d, start,
+                                           outdir, prefix, png))
+            except (PdfParseError, zlib.error, OSError) as e:
+                img = ExportedImage(objn, gen)
+                img.error = f'{type(e).__name__}: {e}'
+                images.append(img)
+    finally:
+        os.close(fd)
+        core.close()
+    return images
+
+#-------------------------------------------------------------------------------
+# export_images_batch
+#-------------------------------------------------------------------------------
+
+io_workers = 8
+
+def _safe_export(args):
+    filepath, outdir, png = args
+    try:
+        return filepath, export_images(filepath, outdir, png)
+    except Exception as e:
+        # One bad file mustn't stop the batch
+        img = ExportedImage(0, 0)
+        img.error = f'{type(e).__name__}: {e}'
+        return filepath, [img]
+
+def _subdirs(filepaths):
+    """Return a distinct subdirectory name for each file: the name of the
+    file, without its extension, and -2, -3, ... for the files that have the
+    same name as a previous one (a/doc.pdf and b/doc.pdf)."""
+    stems = [os.path.splitext(os.path.basename(fp))[0] for fp in filepaths]
+    used = set(stems)
+    names = []
+    seen = set()
+    for stem in stems:
+        name = stem
+        k = 2
+        while name in seen or (name != stem and name in used):
+            name = f'{stem}-{k}'
+            k += 1
+        seen.add(name)
+        used.add(name)
+        names.append(name)
+    return names
+
+def export_images_batch(filepaths, outdir, png=True, workers=io_workers):
+    """Yield (filepath, [ExportedImage]) for each file, in order.
+
+    The images of each file go to a subdirectory of outdir, named after the
+    file (see _subdirs()).
+    """
+    filepaths = list(filepaths)
+    args = ((fp, os.path.join(outdir, name), png)
+            for fp, name in zip(filepaths, _subdirs(filepaths)))
+    with ThreadPoolExecutor(max_workers=workers,
+                            thread_name_prefix='pdf-img') as ex:
+        yield from ex.map(_safe_export, args)
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print(f'Usage: {sys.argv[0]} <outdir> <filepath> ...')
+        exit(-1)
+    for filepath, images in export_images_batch(sys.argv[2:], sys.argv[1]):
+        for img in images:
+            print(f'{filepath}: {img}')
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# image_export_t.py
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import zlib
+from image_export import export_images, export_images_batch
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+def read_png(path):
+    """Return (width, height, color type, rows) of a PNG whose rows are not
+    filtered (filter type 0 or 1)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    pos = 8
+    idat = b''
+    while pos < len(data):
+        n, typ = struct.unpack('>I4s', data[pos:pos+8])
+        body = data[pos+8:pos+8+n]
+        crc, = struct.unpack('>I', data[pos+8+n:pos+12+n])
+        assert crc == zlib.crc32(body, zlib.crc32(typ))
+        if typ == b'IHDR':
+            w, h, bpc, ct = struct.unpack('>IIBB', body[:10])
+        elif typ == b'IDAT':
+            idat += body
+        pos += 12 + n
+    raw = zlib.decompress(idat)
+    row_sz = len(raw) // h
+    return w, h, ct, [raw[k:k+row_sz] for k in range(0, len(raw), row_sz)]
+
+class ImageExportTest(unittest.TestCase):
+    """Test the export of image streams."""
+
+    path = 't'
+
+    def setUp(self):
+        self.out = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.out)
+
+    def test01(self):
+        """JPEG as is, Flate to PNG, with and without a predictor."""
+        filepath = os.path.join(ImageExportTest.path, 'doc05.pdf')
+        images = export_images(filepath, self.out)
+        self.assertEqual([4, 5, 6, 7], [img.objn for img in images])
+        jpg, gray, rgb, ccitt = images
+
+        self.assertEqual('jpg', jpg.format)
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        with open(jpg.path, 'rb') as f:
+            img = f.read()
+        self.assertEqual(1037, len(img))
+        self.assertTrue(img.startswith(b'\xff\xd8'))
+        self.assertTrue(img.endswith(b'\xff\xd9'))
+        self.assertIn(img, data)
+
+        self.assertEqual('png', gray.format)
+        w, h, ct, rows = read_png(gray.path)
+        self.assertEqual((4, 3, 0), (w, h, ct))
+        self.assertEqual([b'\x00' + bytes(range(k, k+4)) for k in (0, 4, 8)],
+                         rows)
+
+        # The predictor rows are kept as they were
+        w, h, ct, rows = read_png(rgb.path)
+        self.assertEqual((4, 3, 2), (w, h, ct))
+        self.assertEqual(bytes((i*7) % 256 for i in range(12, 24)),
+                         rows[1][1:])
+
+        self.assertIsNone(ccitt.path)
+        self.assertIn('CCITTFaxDecode', ccitt.error)
+
+    def test02(self):
+        """Raw samples, batch of files."""
+        filepaths = [os.path.join(ImageExportTest.path, name)
+                     for name in ['doc05.pdf', 'doc01.pdf']]
+        res = list(export_images_batch(filepaths, self.out, png=False))
+        self.assertEqual(filepaths, [fp for fp, _ in res])
+        self.assertEqual([], res[1][1])
+        gray = res[0][1][1]
+        self.assertEqual('raw', gray.format)
+        self.assertEqual(os.path.join(self.out, 'doc05', 'doc05-5-0.raw'),
+                         gray.path)
+        with open(gray.path, 'rb') as f:
+            self.assertEqual(bytes(range(12)), f.read())
+
+    def test03(self):
+        """Files of the same name, in different directories."""
+        filepath = os.path.join(ImageExportTest.path, 'doc05.pdf')
+        copy = os.path.join(self.out, 'in', 'doc05.pdf')
+        os.mkdir(os.path.dirname(copy))
+        shutil.copy(filepath, copy)
+        out = os.path.join(self.out, 'out')
+        res = list(export_images_batch([filepath, copy], out))
+        paths = [img.path for _, images in res for img in images if img.path]
+        self.assertEqual(6, len(paths))
+        self.assertEqual(6, len(set(paths)))
+        self.assertEqual(['doc05', 'doc05-2'], sorted(os.listdir(out)))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
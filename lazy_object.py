@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# lazy_object.py - dictionaries and arrays that parse their values on access
+
+# ObjectStream.get_dictionary() and get_array() build a PdfObject for every
+# value, recursively, even when the caller only wants /Root or /Size out of
+# the whole thing. Here a dictionary or an array is only scanned: the byte
+# span of each value is recorded, and the value is parsed the first time it
+# is accessed. The scanner works on an in-memory buffer with compiled regular
+# expressions, so it doesn't go through TokenStream one byte at a time.
+#
+# A LazyDict (or LazyArray) is the data of a PdfObject of type DICTIONARY (or
+# ARRAY), and it's used the same way as a python dict (or list) of PdfObjects.
+
+import io
+import re
+import sys
+from collections.abc import Mapping, Sequence
+from object_stream import EObject, ObjectStream, PdfObject
+from token_stream import PdfParseError, PdfEOFError
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# The scanner
+#-------------------------------------------------------------------------------
+
+# PDF Spec, § 7.2.2 Character Set: white-space and delimiter characters
+_ws = rb'\x00\t\n\x0c\r '
+_delims = rb'()<>\[\]{}/%'
+
+ws_re = re.compile(rb'(?:[' + _ws + rb']+|%[^\r\n]*)*')
+regular_re = re.compile(rb'[^' + _ws + _delims + rb']+')
+name_re = re.compile(rb'/([^' + _ws + _delims + rb']*)')
+ref_re = re.compile(rb'\d+[' + _ws + rb']+\d+[' + _ws + rb']+R(?![^'
+                    + _ws + _delims + rb'])')
+paren_re = re.compile(rb'[()\\]')
+hex_escape_re = re.compile(rb'#([0-9a-fA-F]{2})')
+
+def _skip_ws(buf, pos):
+    return ws_re.match(buf, pos).end()
+
+def _skip_string(buf, pos):
+    """Return the offset after the literal string that starts at pos."""
+    depth = 0
+    k = pos
+    while True:
+        m = paren_re.search(buf, k)
+        if not m:
+            raise PdfEOFError(pos)
+        c = buf[m.start()]
+        if c == 0x5c:  # '\', skip the escaped character
+            k = m.end() + 1
+            continue
+        depth += 1 if c == 0x28 else -1
+        k = m.end()
+        if depth == 0:
+            return k
+
+# Inside an array or a dictionary, only these characters change the nesting
+# depth, or start something (a string, a comment) where they don't count, so
+# everything else is skipped in one go
+inner_re = re.compile(rb'[^()<>\[\]%]*')
+comment_re = re.compile(rb'%[^\r\n]*')
+
+def skip_value(buf, pos):
+    """Return the offset after the object that starts at pos."""
+    depth = 0
+    while True:
+        if depth > 0:
+            pos = inner_re.match(buf, pos).end()
+        else:
+            pos = _skip_ws(buf, pos)
+        if pos >= len(buf):
+            raise PdfEOFError(pos)
+        c = buf[pos]
+        if c == 0x25:  # '%'
+            pos = comment_re.match(buf, pos).end()
+            continue
+        if c == 0x28:  # '('
+            pos = _skip_string(buf, pos)
+        elif c == 0x3c:  # '<'
+            if buf[pos + 1:pos + 2] == b'<':
+                depth += 1
+                pos += 2
+            else:
+                k = buf.find(b'>', pos)
+                if k == -1:
+                    raise PdfEOFError(pos)
+                pos = k + 1
+        elif c == 0x3e:  # '>'
+            if buf[pos + 1:pos + 2] != b'>':
+                raise PdfParseError('unexpected >', pos)
+            depth -= 1
+            pos += 2
+        elif c == 0x5b:  # '['
+            depth += 1
+            pos += 1
+        elif c == 0x5d:  # ']'
+            depth -= 1
+            pos += 1
+        elif c == 0x2f:  # '/'
+            pos = name_re.match(buf, pos).end()
+        else:
+            m = ref_re.match(buf, pos) or regular_re.match(buf, pos)
+            if not m:
+                raise PdfParseError(f'unexpected character {chr(c)}', pos)
+            pos = m.end()
+        if depth == 0:
+            return pos
+        if depth < 0:
+            raise PdfParseError('unbalanced delimiters', pos)
+
+def name_key(raw):
+    """Decode a name into a dictionary key, as get_dictionary() does."""
+    raw = hex_escape_re.sub(lambda m: bytes.fromhex(m.group(1).decode()), raw)
+    return raw.decode('unicode_escape')
+
+#-------------------------------------------------------------------------------
+# parse_value
+#-------------------------------------------------------------------------------
+
+def parse_value(buf, start, end):
+    """Return the PdfObject in buf[start:end], arrays and dicts are lazy."""
+    start = _skip_ws(buf, start)
+    if buf[start:start + 2] == b'<<':
+        return PdfObject(EObject.DICTIONARY, LazyDict(buf, start))
+    if buf[start:start + 1] == b'[':
+        return PdfObject(EObject.ARRAY, LazyArray(buf, start))
+    # Anything else is parsed by the ObjectStream. The trailing space ends
+    # the object, so an integer isn't taken for the start of a reference.
+    ob = ObjectStream('<lazy>', io.BytesIO(bytes(buf[start:end]) + b' '),
+                      strict=True)
+    return ob.next_object()
+
+#-------------------------------------------------------------------------------
+# class LazyDict
+#-------------------------------------------------------------------------------
+
+class LazyDict(Mapping):
+    """A dictionary whose values are parsed on access."""
+
+    def __init__(self, buf, pos):
+        # pos is the offset of '<<' in buf
+        self.buf = buf
+        self.spans = {}   # key -> (start, end) of the value in buf
+        self.parsed = {}  # key -> PdfObject, the values parsed so far
+
+        pos += 2
+        while True:
+            pos = _skip_ws(buf, pos)
+            if buf[pos:pos + 2] == b'>>':
+                break
+            m = name_re.match(buf, pos)
+            if not m:
+                if pos >= len(buf):
+                    raise PdfEOFError(pos)
+                raise PdfParseError('expecting a name or >>', pos)
+            start = m.end()
+            pos = skip_value(buf, start)
+            self.spans[name_key(m.group(1))] = (start, pos)
+        self.end = pos + 2
+
+    def __getitem__(self, key):
+        v = self.parsed.get(key)
+        if v is None:
+            start, end = self.spans[key]
+            v = self.parsed.setdefault(key, parse_value(self.buf, start, end))
+        return v
+
+    def __iter__(self):
+        return iter(self.spans)
+
+    def __len__(self):
+        return len(self.spans)
+
+    def __contains__(self, key):
+        return key in self.spans
+
+#-------------------------------------------------------------------------------
+# class LazyArray
+#-------------------------------------------------------------------------------
+
+class LazyArray(Sequence):
+    """An array whose elements are parsed on access."""
+
+    def __init__(self, buf, pos):
+        # pos is the offset of '[' in buf
+        self.buf = buf
+        self.spans = []   # (start, end) of each element in buf
+        self.parsed = {}  # index -> PdfObject, the elements parsed so far
+
+        pos += 1
+        while True:
+            pos = _skip_ws(buf, pos)
+            if buf[pos:pos + 1] == b']':
+                break
+            start = pos
+            pos = skip_value(buf, start)
+            self.spans.append((start, pos))
+        self.end = pos + 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self.spans)))]
+        if i < 0:
+            i += len(self.spans)
+        v = self.parsed.get(i)
+        if v is None:
+            start, end = self.spans[i]
+            v = self.parsed.setdefault(i, parse_value(self.buf, start, end))
+        return v
+
+    def __len__(self):
+        return len(self.spans)
+
+#-------------------------------------------------------------------------------
+# lazy_indirect_object
+#-------------------------------------------------------------------------------
+
+obj_re = re.compile(rb'(\d+)[' + _ws + rb']+(\d+)[' + _ws + rb']+obj')
+stream_re = re.compile(rb'stream(?![^' + _ws + _delims + rb'])')
+
+def lazy_indirect_object(buf, offset):
+    """Return the object defined at offset as (objn, gen, PdfObject).
+
+    The PdfObject is None if it isn't a dictionary or an array, or if it's a
+    stream: the caller should parse it with an ObjectStream.
+    """
+    m = obj_re.match(buf, _skip_ws(buf, offset))
+    if not m:
+        raise PdfParseError('expecting an indirect object definition', offset)
+    objn, gen = int(m.group(1)), int(m.group(2))
+    start = _skip_ws(buf, m.end())
+    if buf[start:start + 1] not in (b'<', b'['):
+        return objn, gen, None
+    end = skip_value(buf, start)
+    if stream_re.match(buf, _skip_ws(buf, end)):
+        return objn, gen, None
+
+    # A copy of the object's bytes, so that the lazy object doesn't depend on
+    # buf (a mmap can be closed while the object is still in use)
+    data = bytes(buf[start:end])
+    return objn, gen, parse_value(data, 0, len(data))
+
+#-------------------------------------------------------------------------------
+# lazy_stream
+#-------------------------------------------------------------------------------
+
+eol_re = re.compile(rb'\r?\n')
+
+def lazy_stream(buf, offset):
+    """Return (objn, gen, PdfObject, data offset) for the stream defined at
+    offset, None if the object there isn't a stream.
+
+    The PdfObject is the stream dictionary. The stream data isn't read: it
+    starts at 'data offset' in buf, and /Length (in the dictionary) says how
+    long it is.
+    """
+    m = obj_re.match(buf, _skip_ws(buf, offset))
+    if not m:
+        raise PdfParseError('expecting an indirect object definition', offset)
+    objn, gen = int(m.group(1)), int(m.group(2))
+    start = _skip_ws(buf, m.end())
+    if buf[start:start + 2] != b'<<':
+        return None
+    end = skip_value(buf, start)
+    m = stream_re.match(buf, _skip_ws(buf, end))
+    if not m:
+        return None
+    # PDF Spec, § 7.3.8.1: 'stream' is followed by CRLF or LF
+    e = eol_re.match(buf, m.end())
+    pos = e.end() if e else m.end()
+    data = bytes(buf[start:end])
+    return objn, gen, parse_value(data, 0, len(data)), pos
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    print('This module is not meant to be executed directly.')
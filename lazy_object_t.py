@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# lazy_object_t.py
+
+import io
+import os
+import unittest
+from object_stream import EObject, ObjectStream
+from lazy_object import LazyDict, LazyArray, parse_value, lazy_indirect_object
+from lazy_object import lazy_stream
+from document import PdfDocument
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class LazyObjectTest(unittest.TestCase):
+    """Test dictionaries and arrays parsed on access."""
+
+    path = 't'
+
+    def test01(self):
+        """Same values as the ObjectStream, and only parsed on access."""
+        data = (b'<</Type/Page/Title(a (nested) \\) string)/ID<0a1B>'
+                b'/Kids[1 0 R 2 0 R]% a comment\r\n/Box[0 0 595.5 -8]'
+                b'/A#20B/x#2Fy/Res<</Font<</F1 5 0 R>>>>/Ref 12 0 R/N null'
+                b'/B true/Empty[]/D<<>>>>')
+        o = parse_value(data, 0, len(data))
+        self.assertEqual(EObject.DICTIONARY, o.type)
+        self.assertIsInstance(o.data, LazyDict)
+        self.assertEqual(0, len(o.data.parsed))
+
+        ob = ObjectStream('<test>', io.BytesIO(data))
+        eager = ob.next_object()
+        self.assertEqual(list(eager.data), list(o.data))
+        self.assertEqual(eager.show(), o.show())
+
+        kids = o.data['Kids']
+        self.assertIsInstance(kids.data, LazyArray)
+        self.assertEqual(2, kids.data[-1].data['objn'])
+        self.assertEqual(eager.data['Title'].data, o.data['Title'].data)
+
+    def test02(self):
+        """Indirect objects read from a document."""
+        filepath = os.path.join(LazyObjectTest.path, 'doc01.pdf')
+        eager = PdfDocument(filepath)
+        lazy = PdfDocument(filepath, lazy=True)
+        with eager, lazy:
+            for (_, _, o), (_, _, p) in zip(eager.objects(), lazy.objects()):
+                self.assertEqual(o.type, p.type)
+                self.assertEqual(o.show(), p.show())
+            pages = list(lazy.pages())
+            self.assertEqual(2, len(pages))
+            self.assertIsInstance(pages[0].data, LazyDict)
+
+            # Streams are not lazy
+            with open(filepath, 'rb') as f:
+                data = f.read()
+            offset = lazy.xref_sec.get_object(6, 0)[0]
+            self.assertEqual((6, 0, None), lazy_indirect_object(data, offset))
+
+    def test03(self):
+        """Where the data of a stream starts, without reading it."""
+        filepath = os.path.join(LazyObjectTest.path, 'doc01.pdf')
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        objn, gen, sd, start = lazy_stream(data, data.find(b'6 0 obj'))
+        self.assertEqual((6, 0), (objn, gen))
+        self.assertEqual(b'FlateDecode', sd.data['Filter'].data)
+        self.assertEqual(b'x\x9c', data[start:start+2])
+        self.assertIsNone(lazy_stream(data, data.find(b'1 0 obj')))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
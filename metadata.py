@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# metadata.py - extract the document information and page count, quickly
+
+# Most questions asked about a PDF file are answered by the document
+# information dictionary (/Info in the trailer), the catalog (/Root) and the
+# page count (/Count in the root of the page tree). metadata() gets them
+# while reading as little of the file as possible: the end of the file, the
+# last xref section, and the handful of objects involved. The document is
+# opened in lazy mode, so only the values that are used get parsed.
+#
+#     md = metadata(filepath)
+#     print(md.title, md.page_count)
+#
+#     for md in metadata_batch(filepaths):
+#         ...
+
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from document import PdfDocument
+from object_stream import EObject
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# decode_text, decode_date
+#-------------------------------------------------------------------------------
+
+def decode_text(b):
+    """Decode a PDF text string (PDF Spec, § 7.9.2.2 Text String Type)."""
+    b = bytes(b)
+    if b.startswith(b'\xfe\xff'):
+        return b[2:].decode('utf-16-be', errors='replace')
+    if b.startswith(b'\xef\xbb\xbf'):
+        # PDF 2.0
+        return b[3:].decode('utf-8', errors='replace')
+    # PDFDocEncoding, which is latin-1 for the printable characters
+    return b.decode('latin-1')
+
+date_re = re.compile(r"D:(\d{4})(\d\d)?(\d\d)?(\d\d)?(\d\d)?(\d\d)?"
+                     r"(?:([Z+-])(?:(\d\d)'?(\d\d)?'?)?)?")
+
+def decode_date(s):
+    """Return the datetime of a PDF date string, None if it isn't one."""
+    # PDF Spec, § 7.9.4 Dates: D:YYYYMMDDHHmmSSOHH'mm
+    m = date_re.match(s.strip())
+    if not m:
+        return None
+    year, month, day, hour, minute, second = [
+        int(x) if x else d for x, d in zip(m.groups()[:6], (0, 1, 1, 0, 0, 0))]
+    try:
+        tz = None
+        if m.group(7):
+            offset = timedelta(hours=int(m.group(8) or 0),
+                               minutes=int(m.group(9) or 0))
+            # An offset of 24 hours or more is a ValueError too
+            tz = timezone(-offset if m.group(7) == '-' else offset)
+        return datetime(year, month, day, hour, minute, second, tzinfo=tz)
+    except ValueError:
+        return None
+
+#-------------------------------------------------------------------------------
+# class Metadata
+#-------------------------------------------------------------------------------
+
+class Metadata:
+    """The document information and page count of a PDF file."""
+
+    # Text entries of the document information dictionary, and the names of
+    # the attributes that hold them
+    info_keys = [('Title', 'title'), ('Author', 'author'),
+                 ('Subject', 'subject'), ('Keywords', 'keywords'),
+                 ('Creator', 'creator'), ('Producer', 'producer')]
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.version = None        # from the header, a string like '1.7'
+        self.title = None          # the text entries are str
+        self.author = None
+        self.subject = None
+        self.keywords = None
+        self.creator = None
+        self.producer = None
+        self.creation_date = None  # datetime
+        self.mod_date = None       # datetime
+        self.page_count = None     # int
+        self.root_keys = []        # the keys of the catalog dictionary
+        self.error = None          # str, why the file couldn't be read
+
+    def __str__(self):
+        if self.error:
+            return f'{self.filepath}: {self.error}'
+        return (f'{self.filepath}: PDF-{self.version}, {self.page_count}'
+                + f' pages, title={self.title!r}, producer={self.producer!r}')
+
+#-------------------------------------------------------------------------------
+# metadata
+#-------------------------------------------------------------------------------
+
+def _read_version(mm):
+    m = re.match(rb'%PDF-(\d+\.\d+)', mm[:16])
+    return m.group(1).decode() if m else None
+
+def metadata(filepath):
+    """Return the Metadata of a PDF file."""
+    md = Metadata(filepath)
+    with PdfDocument(filepath, lazy=True) as doc:
+        md.version = _read_version(doc.core.mm)
+
+        info = doc.deref(doc.trailer.data.get('Info'))
+        if info is not None and info.type == EObject.DICTIONARY:
+            for key, attr in Metadata.info_keys:
+                o = doc.deref(info.data.get(key))
+                if o is not None and o.type == EObject.STRING:
+                    setattr(md, attr, decode_text(o.data))
+            for key, attr in [('CreationDate', 'creation_date'),
+                              ('ModDate', 'mod_date')]:
+                o = doc.deref(info.data.get(key))
+                if o is not None and o.type == EObject.STRING:
+                    setattr(md, attr, decode_date(decode_text(o.data)))
+
+        root = doc.deref(doc.trailer.data.get('Root'))
+        if root is not None and root.type == EObject.DICTIONARY:
+            md.root_keys = list(root.data)
+            pages = doc.deref(root.data.get('Pages'))
+            if pages is not None and pages.type == EObject.DICTIONARY:
+                cnt = doc.deref(pages.data.get('Count'))
+                if cnt is not None and cnt.type == EObject.INTEGER:
+                    md.page_count = cnt.data
+    return md
+
+#-------------------------------------------------------------------------------
+# metadata_batch
+#-------------------------------------------------------------------------------
+
+# Mostly waiting on the disk, so more threads than CPUs
+io_workers = 16
+
+def _safe_metadata(filepath):
+    try:
+        return metadata(filepath)
+    except Exception as e:
+        # One bad file mustn't stop the batch
+        md = Metadata(filepath)
+        md.error = f'{type(e).__name__}: {e}'
+        return md
+
+def metadata_batch(filepaths, workers=io_workers):
+    """Yield the Metadata of each file, in order, read in a thread pool.
+
+    Files that can't be read yield a Metadata with its error set.
+    """
+    with ThreadPoolExecutor(max_workers=workers,
+                            thread_name_prefix='pdf-md') as ex:
+        yield from ex.map(_safe_metadata, filepaths)
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(f'Usage: {sys.argv[0]} <filepath> ...')
+        exit(-1)
+    for md in metadata_batch(sys.argv[1:]):
+        print(md)
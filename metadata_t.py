@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# metadata_t.py
+
+import os
+import unittest
+from datetime import datetime, timedelta, timezone
+from metadata import metadata, metadata_batch, decode_text, decode_date
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class MetadataTest(unittest.TestCase):
+    """Test the extraction of the document information."""
+
+    path = 't'
+
+    def test01(self):
+        """Traditional xref table."""
+        md = metadata(os.path.join(MetadataTest.path, 'doc01.pdf'))
+        self.assertIsNone(md.error)
+        self.assertEqual('1.4', md.version)
+        self.assertEqual('Test document', md.title)
+        self.assertEqual('inside_pdf', md.author)
+        self.assertIsNone(md.subject)
+        self.assertEqual(datetime(2020, 4, 1, 12, tzinfo=timezone.utc),
+                         md.creation_date)
+        self.assertEqual(2, md.page_count)
+        self.assertEqual(['Type', 'Pages'], md.root_keys)
+
+    def test02(self):
+        """Info and Root in an object stream, a file with updates, errors."""
+        names = ['doc02.pdf', 'doc03.pdf', 'errors.dat', 'missing.pdf']
+        res = list(metadata_batch([os.path.join(MetadataTest.path, name)
+                                   for name in names]))
+        self.assertEqual('Compressed objects', res[0].title)
+        self.assertEqual(2, res[0].page_count)
+        self.assertEqual('Updated document', res[1].title)
+        self.assertTrue(res[2].error.startswith('PdfParseError'))
+        self.assertTrue(res[3].error.startswith('FileNotFoundError'))
+
+    def test03(self):
+        """Text strings and dates."""
+        self.assertEqual('Été', decode_text(b'\xfe\xff\x00\xc9\x00t\x00\xe9'))
+        self.assertEqual('Été', decode_text(b'\xc9t\xe9'))
+        tz = timezone(-timedelta(hours=5, minutes=30))
+        self.assertEqual(datetime(1998, 12, 23, 19, 52, tzinfo=tz),
+                         decode_date("D:199812231952-05'30'"))
+        self.assertEqual(datetime(2001, 1, 1), decode_date('D:2001'))
+        self.assertIsNone(decode_date('yesterday'))
+        self.assertIsNone(decode_date("D:20200101120000+99'00'"))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
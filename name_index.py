@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+# name_index.py - which files of a corpus use which names
+
+# For every file, the index records the set of names it uses:
+#
+#     /OpenAction       a dictionary key
+#     Type=Catalog      a /Type value
+#     Subtype=Image     a /Subtype value
+#     Filter=DCTDecode  a filter
+#
+# and stores it inverted: for each name (a term), the sorted ids of the files
+# that use it (the postings). The ids are delta-encoded, as varints, so that
+# the postings of a name used by every file take about one byte per file.
+#
+# The index file is laid out like a columnar export:
+#
+#     magic
+#     postings segments, one after the other
+#     footer, JSON: the files (id = position in the list), and for each term
+#         its number of files, its last file id, and its segments
+#     footer offset (8 bytes, little-endian), magic
+#
+# New files get new ids, greater than all the others, so adding them only
+# appends a segment to the postings of their terms. A term whose postings
+# have too many segments gets them merged into one. The index is never
+# written in place: the segments still in use are copied to a temporary file
+# (those merged away are left behind, the copy compacts the index), the new
+# segments and a new footer follow, and the temporary file replaces the
+# index. A crash leaves the old index or the new one, never one that can't be
+# read.
+#
+# A file that can't be parsed isn't indexed, the next add_files() tries it
+# again.
+#
+#     with NameIndex('corpus.idx') as index:
+#         index.add_files(filepaths)
+#         print(index.files_with_any(['/JavaScript', '/OpenAction']))
+
+import json
+import os
+import struct
+import sys
+from document import DocumentCore
+from object_stream import EObject
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# file_names
+#-------------------------------------------------------------------------------
+
+def _names(o, names):
+    """Add the terms of PdfObject o to set names."""
+    if o.type == EObject.COUPLE:
+        sd = o.data[0]
+        f = sd.data.get('Filter')
+        if f is not None:
+            for x in (f.data if f.type == EObject.ARRAY else [f]):
+                if x.type == EObject.NAME:
+                    names.add('Filter=' + x.data.decode('latin-1'))
+        _names(sd, names)
+    elif o.type == EObject.DICTIONARY:
+        d = o.data
+        for key, v in d.items():
+            names.add('/' + key)
+            if key in ('Type', 'Subtype') and v.type == EObject.NAME:
+                names.add(key + '=' + v.data.decode('latin-1'))
+            elif v.type in (EObject.DICTIONARY, EObject.ARRAY):
+                _names(v, names)
+    elif o.type == EObject.ARRAY:
+        for v in o.data:
+            if v.type in (EObject.DICTIONARY, EObject.ARRAY):
+                _names(v, names)
+
+def file_names(filepath):
+    """Return the set of the terms of a file."""
+    names = set()
+    core = DocumentCore(filepath)
+    core.open()
+    try:
+        cur = core.cursor()
+        _names(core.trailer, names)
+        for objn, gen in core.object_numbers():
+            o = cur.get_object(objn, gen, cache=False)
+            if o is not None:
+                _names(o, names)
+    finally:
+        core.close()
+    return names
+
+#-------------------------------------------------------------------------------
+# Postings
+#-------------------------------------------------------------------------------
+
+def encode_postings(ids, last=-1):
+    """Return the varint deltas of sorted ids, the first one from last."""
+    out = bytearray()
+    for i in ids:
+        d = i - last
+        last = i
+        while d >= 0x80:
+            out.append(d & 0x7f | 0x80)
+            d >>= 7
+        out.append(d)
+    return bytes(out)
+
+def decode_postings(data):
+    """Return the list of ids of varint deltas data, from -1."""
+    ids = []
+    last = -1
+    d = shift = 0
+    for b in data:
+        d |= (b & 0x7f) << shift
+        if b & 0x80:
+            shift += 7
+            continue
+        last += d
+        ids.append(last)
+        d = shift = 0
+    return ids
+
+#-------------------------------------------------------------------------------
+# class NameIndex
+#-------------------------------------------------------------------------------
+
+magic = b'PDFIDX1\n'
+max_segments = 8
+
+class NameIndex:
+    """An on-disk inverted index of the names used by many files."""
+
+    def __init__(self, path):
+        self.path = path
+        self.files = []
+        self.ids = {}    # filepath -> id
+        self.terms = {}  # term -> [count, last id, [[offset, length], ...]]
+        self.f = None
+        if not os.path.exists(path):
+            with open(self._tmp_path(), 'wb') as f:
+                f.write(magic)
+                self._write_footer(f)
+            os.replace(self._tmp_path(), path)
+        self.f = open(path, 'rb')
+        self._read_footer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self.f:
+            self.f.close()
+            self.f = None
+
+    def _tmp_path(self):
+        # In the same directory, os.replace() can't move a file across file
+        # systems
+        return self.path + '.tmp'
+
+    def _write_footer(self, f):
+        offset = f.tell()
+        f.write(json.dumps({'files': self.files,
+                            'terms': self.terms}).encode())
+        f.write(struct.pack('<Q', offset))
+        f.write(magic)
+        f.truncate()
+
+    def _read_footer(self):
+        f = self.f
+        f.seek(-len(magic) - 8, os.SEEK_END)
+        end = f.tell()
+        offset, = struct.unpack('<Q', f.read(8))
+        if f.read() != magic:
+            raise ValueError(f'{self.path} is not a name index')
+        f.seek(offset)
+        footer = json.loads(f.read(end - offset))
+        self.footer_offset = offset
+        self.files = footer['files']
+        self.ids = {fp: i for i, fp in enumerate(self.files)}
+        self.terms = footer['terms']
+
+    #---------------------------------------------------------------------------
+    # add_files
+    #---------------------------------------------------------------------------
+
+    def add_files(self, filepaths, executor=None):
+        """Index the files that aren't yet, return how many were added.
+
+        The files are parsed by executor.map() if an executor is given.
+        Files that can't be parsed are left out, to be tried again.
+        """
+        filepaths = [fp for fp in dict.fromkeys(filepaths)
+                     if fp not in self.ids]
+        mapper = executor.map if executor else map
+        return self.add_names(zip(filepaths,
+                                  mapper(_safe_file_names, filepaths)))
+
+    def add_names(self, entries):
+        """Index the (filepath, set of terms) in entries, return how many
+        files were added. Files already in the index, and those with names
+        None, are skipped."""
+        new = {}  # term -> [ids]
+        cnt = 0
+        for filepath, names in entries:
+            if filepath in self.ids or names is None:
+                continue
+            i = self.ids[filepath] = len(self.files)
+            self.files.append(filepath)
+            for term in names:
+                new.setdefault(term, []).append(i)
+            cnt += 1
+        if not cnt:
+            return 0
+
+        tmp_path = self._tmp_path()
+        try:
+            # The new segments, read from the old file before it's copied
+            pending = []
+            for term, ids in new.items():
+                entry = self.terms.get(term)
+                if entry is None:
+                    entry = self.terms[term] = [0, -1, []]
+                if len(entry[2]) >= max_segments:
+                    # Merge the old segments and the new one, the old ones
+                    # won't be copied
+                    data = encode_postings(self._postings(entry) + ids)
+                    entry[2].clear()
+                else:
+                    data = encode_postings(ids, entry[1])
+                pending.append((entry, data))
+                entry[0] += len(ids)
+                entry[1] = ids[-1]
+
+            with open(tmp_path, 'wb') as f:
+                f.write(magic)
+                self._copy_segments(f)
+                for entry, data in pending:
+                    entry[2].append([f.tell(), len(data)])
+                    f.write(data)
+                self.footer_offset = f.tell()
+                self._write_footer(f)
+                f.flush()
+                os.fsync(f.fileno())
+            # An open file can't be replaced on Windows
+            self.close()
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            # Back to the index as it is on disk
+            if self.f is None:
+                self.f = open(self.path, 'rb')
+            self._read_footer()
+            raise
+        self.f = open(self.path, 'rb')
+        return cnt
+
+    def _copy_segments(self, f):
+        """Copy the segments in use to f, and update their offsets."""
+        segments = sorted((seg for entry in self.terms.values()
+                           for seg in entry[2]), key=lambda seg: seg[0])
+        k = 0
+        while k < len(segments):
+            # A run of contiguous segments is copied at once
+            j = k + 1
+            while j < len(segments) and \
+                  segments[j][0] == segments[j - 1][0] + segments[j - 1][1]:
+                j += 1
+            start = segments[k][0]
+            left = segments[j - 1][0] + segments[j - 1][1] - start
+            delta = f.tell() - start
+            self.f.seek(start)
+            while left:
+                data = self.f.read(min(left, 1024*1024))
+                if not data:
+                    raise ValueError(f'{self.path}: truncated segment')
+                f.write(data)
+                left -= len(data)
+            for seg in segments[k:j]:
+                seg[0] += delta
+            k = j
+
+    #---------------------------------------------------------------------------
+    # Queries
+    #---------------------------------------------------------------------------
+
+    def _postings(self, entry):
+        data = bytearray()
+        for offset, length in entry[2]:
+            self.f.seek(offset)
+            data += self.f.read(length)
+        return decode_postings(data)
+
+    def postings(self, term):
+        """Return the sorted ids of the files that use term."""
+        entry = self.terms.get(term)
+        return self._postings(entry) if entry else []
+
+    def files_with(self, term):
+        """Return the files that use term, in the order they were added."""
+        return [self.files[i] for i in self.postings(term)]
+
+    def files_with_all(self, terms):
+        """Return the files that use all the terms."""
+        # The rarest term first, the intersection only gets smaller
+        ids = None
+        for term in sorted(terms, key=lambda t: self.terms.get(t, [0])[0]):
+            p = self.postings(term)
+            ids = set(p) if ids is None else ids.intersection(p)
+            if not ids:
+                return []
+        return [self.files[i] for i in sorted(ids or ())]
+
+    def files_with_any(self, terms):
+        """Return the files that use any of the terms."""
+        ids = set()
+        for term in terms:
+            ids.update(self.postings(term))
+        return [self.files[i] for i in sorted(ids)]
+
+    def counts(self):
+        """Return {term: number of files that use it}."""
+        return {term: entry[0] for term, entry in self.terms.items()}
+
+def _safe_file_names(filepath):
+    # Runs in the executor, a module-level function so that it can be pickled
+    try:
+        return file_names(filepath)
+    except Exception:
+        # One bad file mustn't stop the batch, it's tried again next time
+        return None
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print(f'Usage: {sys.argv[0]} <index> add <filepath> ...')
+        print(f'       {sys.argv[0]} <index> any|all <name> ...')
+        exit(-1)
+    with NameIndex(sys.argv[1]) as index:
+        cmd, args = sys.argv[2], sys.argv[3:]
+        if cmd == 'add':
+            cnt = index.add_files(args)
+            print(f'{cnt} files added, {len(index.files)} in the index')
+        elif cmd in ('any', 'all'):
+            query = index.files_with_any if cmd == 'any' \
+                else index.files_with_all
+            for filepath in query(args):
+                print(filepath)
+        else:
+            print(f'Unknown command "{cmd}"')
+            exit(-1)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# name_index_t.py
+
+import os
+import shutil
+import tempfile
+import unittest
+import name_index
+from name_index import (NameIndex, decode_postings, encode_postings,
+                        file_names)
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class NameIndexTest(unittest.TestCase):
+    """Test the inverted index of names."""
+
+    path = 't'
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.filepaths = [os.path.join(NameIndexTest.path, f'doc0{k}.pdf')
+                          for k in range(1, 8)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test01(self):
+        """Delta-encoded postings."""
+        ids = [0, 1, 2, 127, 128, 300, 20000, 2**31]
+        data = encode_postings(ids)
+        self.assertEqual(b'\x01\x01\x01\x7d\x01', data[:5])
+        self.assertEqual(ids, decode_postings(data))
+        # A segment that follows another one
+        self.assertEqual(ids + [2**31 + 5, 2**40],
+                         decode_postings(data + encode_postings(
+                             [2**31 + 5, 2**40], 2**31)))
+
+    def test02(self):
+        """The names of a file."""
+        names = file_names(os.path.join(NameIndexTest.path, 'doc05.pdf'))
+        for term in ('/Root', '/Size', '/DecodeParms', '/Predictor',
+                     'Type=Catalog', 'Subtype=Image',
+                     'Filter=DCTDecode', 'Filter=CCITTFaxDecode'):
+            self.assertIn(term, names)
+        self.assertNotIn('Subtype=DeviceRGB', names)
+
+    def test03(self):
+        """Queries, incremental updates."""
+        path = os.path.join(self.tmp, 'corpus.idx')
+        with NameIndex(path) as index:
+            self.assertEqual(4, index.add_files(self.filepaths[:4]))
+            self.assertEqual(0, index.add_files(self.filepaths[:2]))
+        # The index is reopened, and the other files are added one at a time,
+        # enough to merge segments
+        saved = name_index.max_segments
+        name_index.max_segments = 2
+        try:
+            with NameIndex(path) as index:
+                for filepath in self.filepaths[4:]:
+                    self.assertEqual(1, index.add_files([filepath]))
+        finally:
+            name_index.max_segments = saved
+
+        with NameIndex(path) as index:
+            self.assertEqual(self.filepaths, index.files)
+            self.assertEqual(self.filepaths, index.files_with('/Root'))
+            self.assertLessEqual(len(index.terms['/Root'][2]), 2)
+            self.assertEqual([self.filepaths[4]],
+                             index.files_with('Filter=DCTDecode'))
+            self.assertEqual(self.filepaths[4:],
+                             index.files_with_any(['Filter=DCTDecode',
+                                                   '/Annots']))
+            self.assertEqual([self.filepaths[5], self.filepaths[6]],
+                             index.files_with_all(['/Annots', '/MediaBox']))
+            self.assertEqual([], index.files_with_all(['/Annots', '/Nope']))
+            self.assertEqual([], index.files_with('/Nope'))
+            self.assertEqual(7, index.counts()['Type=Catalog'])
+
+    def test04(self):
+        """A failed update leaves the index as it was, on disk and in memory."""
+        path = os.path.join(self.tmp, 'corpus.idx')
+        with NameIndex(path) as index:
+            self.assertEqual(2, index.add_files(self.filepaths[:2]))
+            with open(path, 'rb') as f:
+                data = f.read()
+            # A term that can't be written in the footer
+            with self.assertRaises(TypeError):
+                index.add_names([(self.filepaths[2], {'/Root', b'bad'})])
+            with open(path, 'rb') as f:
+                self.assertEqual(data, f.read())
+            self.assertEqual(['corpus.idx'], os.listdir(self.tmp))
+            self.assertEqual(self.filepaths[:2], index.files)
+            self.assertEqual(self.filepaths[:2], index.files_with('/Root'))
+            self.assertEqual(1, index.add_files(self.filepaths[2:3]))
+        with NameIndex(path) as index:
+            self.assertEqual(self.filepaths[:3], index.files_with('/Root'))
+
+    def test05(self):
+        """Merged segments don't leave dead bytes behind."""
+        path = os.path.join(self.tmp, 'corpus.idx')
+        saved = name_index.max_segments
+        name_index.max_segments = 2
+        try:
+            with NameIndex(path) as index:
+                for filepath in self.filepaths:
+                    self.assertEqual(1, index.add_files([filepath]))
+                live = sum(length for entry in index.terms.values()
+                           for _, length in entry[2])
+                self.assertEqual(len(name_index.magic) + live,
+                                 index.footer_offset)
+        finally:
+            name_index.max_segments = saved
+        with NameIndex(path) as index:
+            self.assertEqual(self.filepaths, index.files_with('/Root'))
+            self.assertEqual([self.filepaths[4]],
+                             index.files_with('Filter=DCTDecode'))
+
+    def test06(self):
+        """A file that can't be parsed is tried again."""
+        filepath = os.path.join(self.tmp, 'doc.pdf')
+        with open(self.filepaths[0], 'rb') as f:
+            data = f.read()
+        with open(filepath, 'wb') as f:
+            f.write(data[:600])
+        path = os.path.join(self.tmp, 'corpus.idx')
+        with NameIndex(path) as index:
+            self.assertEqual(1, index.add_files([self.filepaths[1],
+                                                 filepath]))
+            self.assertNotIn(filepath, index.files)
+            with open(filepath, 'wb') as f:
+                f.write(data)
+            self.assertEqual(1, index.add_files([self.filepaths[1],
+                                                 filepath]))
+            self.assertEqual([self.filepaths[1], filepath],
+                             index.files_with('/Root'))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# ndjson_export.py - export the indirect objects of a PDF file as NDJSON
+
+# One line per indirect object, in the order of the object numbers:
+#
+#     {"objn":1,"gen":0,"offset":15,"type":"DICTIONARY","value":{...}}
+#
+# Values are mapped to JSON without losing what they are:
+#
+#     integer, real, boolean, null    number, true/false, null
+#     name                            "/Name"
+#     string                          {"str": "text"}, or {"hex": "0a1b"} if
+#                                     it has non-printable bytes
+#     array, dictionary               [...], {"key": value, ...}
+#     indirect reference              {"ref": [objn, gen]}
+#     stream                          {"dict": {...}, "length": n,
+#                                      "sha256": "...", "data": "base64..."}
+#
+# Objects stored in object streams have an offset of null, and "stm": [stream
+# objn, index]. Only one object is in memory at any time: objects are parsed
+# without being cached, and each record is written as soon as it's built.
+#
+# An object that can't be parsed or decoded doesn't stop the export, it gets a
+# record of type "ERROR", with the reason instead of the value:
+#
+#     {"objn":8,"gen":0,"offset":null,"stm":[11,2],"type":"ERROR",
+#      "error":"FilterError: ..."}
+
+import base64
+import hashlib
+import json
+import sys
+from document import DocumentCore
+from filters import FilterError
+from object_stream import EObject
+from token_stream import PdfParseError
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# to_json
+#-------------------------------------------------------------------------------
+
+# Printable ASCII, and the usual white space
+printable = frozenset(range(32, 127)) | frozenset(b'\t\r\n')
+
+def to_json(o, stream_data=False):
+    """Return the JSON-ready python value of PdfObject o."""
+    t = o.type
+    if t in (EObject.INTEGER, EObject.REAL, EObject.BOOLEAN):
+        return o.data
+    if t == EObject.NULL:
+        return None
+    if t == EObject.NAME:
+        return '/' + bytes(o.data).decode('latin-1')
+    if t == EObject.STRING:
+        b = bytes(o.data)
+        if printable.issuperset(b):
+            return {'str': b.decode('ascii')}
+        return {'hex': b.hex()}
+    if t == EObject.ARRAY:
+        return [to_json(x, stream_data) for x in o.data]
+    if t == EObject.DICTIONARY:
+        return {k: to_json(v, stream_data) for k, v in o.data.items()}
+    if t == EObject.IND_OBJ_REF:
+        return {'ref': [o.data['objn'], o.data['gen']]}
+    if t == EObject.COUPLE:
+        sd, s = o.data
+        data = bytes(s.data)
+        v = {'dict': to_json(sd, stream_data), 'length': len(data),
+             'sha256': hashlib.sha256(data).hexdigest()}
+        if stream_data:
+            v['data'] = base64.b64encode(data).decode('ascii')
+        return v
+    raise ValueError(f'{t} object can not be exported')
+
+def json_type(o):
+    # A (dict, stream) couple is a stream, as far as the reader is concerned
+    return 'STREAM' if o.type == EObject.COUPLE else str(o.type)
+
+#-------------------------------------------------------------------------------
+# export_ndjson
+#-------------------------------------------------------------------------------
+
+def records(filepath, stream_data=False):
+    """Yield the record of each indirect object, a python dict."""
+    core = DocumentCore(filepath)
+    core.open()
+    try:
+        cur = core.cursor()
+        for objn, gen in core.object_numbers():
+            rec = {'objn': objn, 'gen': gen}
+            loc = core.xref.get_compressed(objn)
+            if loc:
+                rec['offset'] = None
+                rec['stm'] = list(loc)
+            else:
+                rec['offset'] = core.xref.get_object(objn, gen)[0]
+            try:
+                o = cur.get_object(objn, gen, cache=False)
+                if o is None:
+                    continue
+                rec['type'] = json_type(o)
+                rec['value'] = to_json(o, stream_data)
+            except (PdfParseError, FilterError) as e:
+                # One bad object mustn't stop the export
+                rec['type'] = 'ERROR'
+                rec['error'] = f'{type(e).__name__}: {e}'
+            yield rec
+    finally:
+        core.close()
+
+def export_ndjson(filepath, out, stream_data=False):
+    """Write one JSON line per indirect object to text file out.
+
+    Return the number of objects written. With stream_data, the stream bodies
+    are included, base64-encoded.
+    """
+    encoder = json.JSONEncoder(separators=(',', ':'))
+    cnt = 0
+    for rec in records(filepath, stream_data):
+        out.write(encoder.encode(rec))
+        out.write('\n')
+        cnt += 1
+    return cnt
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(f'Usage: {sys.argv[0]} <filepath> [--data]')
+        exit(-1)
+    export_ndjson(sys.argv[1], sys.stdout, '--data' in sys.argv[2:])
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# ndjson_export_t.py
+
+import base64
+import hashlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from ndjson_export import export_ndjson
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class NdjsonExportTest(unittest.TestCase):
+    """Test the NDJSON export of indirect objects."""
+
+    path = 't'
+
+    def export(self, name, stream_data=False):
+        out = io.StringIO()
+        cnt = export_ndjson(os.path.join(NdjsonExportTest.path, name), out,
+                            stream_data)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(cnt, len(lines))
+        return {rec['objn']: rec for rec in map(json.loads, lines)}
+
+    def test01(self):
+        """Traditional xref table, with the stream data."""
+        recs = self.export('doc01.pdf', stream_data=True)
+        self.assertEqual(list(range(1, 11)), list(recs))
+
+        rec = recs[2]
+        self.assertEqual('DICTIONARY', rec['type'])
+        self.assertEqual({'Type': '/Pages', 'Kids': [{'ref': [3, 0]},
+                                                     {'ref': [10, 0]}],
+                          'Count': 2}, rec['value'])
+        self.assertEqual({'str': 'Test document'}, recs[8]['value']['Title'])
+
+        rec = recs[6]
+        self.assertEqual('STREAM', rec['type'])
+        self.assertEqual({'ref': [9, 0]}, rec['value']['dict']['Length'])
+        data = base64.b64decode(rec['value']['data'])
+        self.assertEqual(49, rec['value']['length'])
+        self.assertEqual(hashlib.sha256(data).hexdigest(),
+                         rec['value']['sha256'])
+
+        with open(os.path.join(NdjsonExportTest.path, 'doc01.pdf'), 'rb') as f:
+            f.seek(rec['offset'])
+            self.assertTrue(f.read(7) == b'6 0 obj')
+
+    def test02(self):
+        """Objects in an object stream."""
+        recs = self.export('doc02.pdf')
+        self.assertEqual([11, 2], recs[8]['stm'])
+        self.assertIsNone(recs[8]['offset'])
+        self.assertNotIn('data', recs[6]['value'])
+
+    def test03(self):
+        """An object that can't be decoded gets an error record."""
+        with open(os.path.join(NdjsonExportTest.path, 'doc02.pdf'), 'rb') as f:
+            data = bytearray(f.read())
+        # Garble the data of object stream 11
+        i = data.index(b'stream', data.index(b'11 0 obj')) + 12
+        data[i:i + 18] = bytes(18)
+        with tempfile.TemporaryDirectory() as tmp:
+            filepath = os.path.join(tmp, 'bad.pdf')
+            with open(filepath, 'wb') as f:
+                f.write(data)
+            out = io.StringIO()
+            self.assertEqual(10, export_ndjson(filepath, out))
+        recs = {rec['objn']: rec for rec in map(json.loads,
+                                                out.getvalue().splitlines())}
+        for objn in [1, 2, 8]:
+            self.assertEqual('ERROR', recs[objn]['type'])
+            self.assertTrue(recs[objn]['error'].startswith('FilterError: '))
+            self.assertNotIn('value', recs[objn])
+        self.assertEqual([11, 2], recs[8]['stm'])
+        self.assertEqual('DICTIONARY', recs[3]['type'])
+        self.assertEqual('STREAM', recs[11]['type'])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# object_graph.py - the indirect references between the objects of a file
+
+# The objects of a file, and the indirect references between them, make a
+# graph. The objects that can't be reached from the trailer (/Root, /Info,
+# /Encrypt) are dead: left behind by incremental updates, or by careless
+# writers, they only take up space.
+#
+# The edges of an object are found without parsing it: its bytes (in the
+# mapped file, or in the decoded object stream) are scanned for 'objn gen R'
+# with a regular expression, skipping over literal strings and comments,
+# which could contain something that looks like a reference. The data of a
+# stream isn't scanned, only its dictionary. So no PdfObject is built, and
+# the walk doesn't keep any object in memory.
+#
+# The objects visited are marked in a bytearray of /Size bytes, and the walk
+# uses an explicit stack, so that it scales to files with millions of objects.
+#
+#     graph = ObjectGraph(core)
+#     report = graph.reachability()
+#     for objn, gen, size in report.unreachable:
+#         ...
+
+import re
+import sys
+from array import array
+from bisect import bisect_right
+from document import DocumentCore
+from lazy_object import _skip_string, _skip_ws, obj_re
+from object_stream import EObject
+from token_stream import PdfParseError, PdfEOFError
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# scan_refs
+#-------------------------------------------------------------------------------
+
+# PDF Spec, § 7.2.2 Character Set: white-space and delimiter characters
+_ws = rb'\x00\t\n\x0c\r '
+_delims = rb'()<>\[\]{}/%'
+
+# A reference (not the end of a name or of a number), a literal string
+# without nested parentheses, the start of one with them, a comment, or the
+# keyword that ends the object
+scan_re = re.compile(rb'(?<![^' + _ws + _delims + rb'])(\d+)[' + _ws
+                     + rb']+(\d+)[' + _ws + rb']+R(?![^' + _ws + _delims
+                     + rb'])|\([^()\\]*(?:\\.[^()\\]*)*\)|(\()|%[^\r\n]*'
+                     + rb'|(?<=[' + _ws + rb')\]>])(stream|endobj)(?![^' + _ws
+                     + _delims + rb'])')
+
+def scan_refs(buf, start, end):
+    """Return the (objn, gen) of the references in buf[start:end], up to the
+    'stream' or 'endobj' keyword if there's one."""
+    refs = []
+    pos = start
+    while True:
+        for m in scan_re.finditer(buf, pos, end):
+            k = m.lastindex
+            if k == 2:
+                refs.append((int(m[1]), int(m[2])))
+            elif k == 3:
+                # Nested parentheses
+                pos = _skip_string(buf, m.start())
+                break
+            elif k == 4:
+                return refs
+        else:
+            return refs
+
+#-------------------------------------------------------------------------------
+# class Reachability
+#-------------------------------------------------------------------------------
+
+class Reachability:
+    """What can be reached from the trailer, and what can't."""
+
+    def __init__(self):
+        self.objects = 0       # objects in use
+        self.reachable = 0     # of them, reachable from the trailer
+        self.unreachable = []  # (objn, gen, size), sorted
+        self.unreachable_sz = 0
+        self.missing = []      # objn referenced, but not in use, sorted
+        self.errors = []       # (objn, str), objects that couldn't be read
+
+    def __str__(self):
+        return (f'{self.objects} objects, {self.reachable} reachable,'
+                f' {len(self.unreachable)} unreachable'
+                f' ({self.unreachable_sz} bytes),'
+                f' {len(self.missing)} missing')
+
+#-------------------------------------------------------------------------------
+# class ObjectGraph
+#-------------------------------------------------------------------------------
+
+class ObjectGraph:
+    """The edges of the objects of an open DocumentCore."""
+
+    def __init__(self, core):
+        self.core = core
+        self.cursor = core.cursor()
+        revisions = core.xref.all_revisions()
+        size = core.trailer.data.get('Size')
+        size = size.data if size is not None \
+            and size.type == EObject.INTEGER else 0
+        for rev in revisions:
+            for subs in rev.xref_sec.sub_sections:
+                size = max(size, subs.first_objn + subs.entry_cnt)
+            if rev.xref_sec.compressed:
+                size = max(size, max(rev.xref_sec.compressed) + 1)
+        self.size = size
+
+        # Where each object is, by objn, looked up once and for all: its
+        # offset in the file, -1 if it isn't in use, or -2 - the objn of its
+        # object stream, with its index in self.idx
+        self.loc = array('q', [-1])*size
+        self.idx = array('l', [0])*size
+        self.gen = array('l', [0])*size
+        # Newer revisions override the entries of older ones, as in
+        # DocumentCore.object_numbers()
+        for rev in reversed(revisions):
+            xref_sec = rev.xref_sec
+            for subs in xref_sec.sub_sections:
+                for i, (x, gen, in_use) in enumerate(subs.entries):
+                    objn = subs.first_objn + i
+                    if in_use:
+                        self.loc[objn] = x
+                        self.gen[objn] = gen
+                    elif objn in xref_sec.compressed:
+                        stm, idx = xref_sec.compressed[objn]
+                        self.loc[objn] = -2 - stm
+                        self.idx[objn] = idx
+                        self.gen[objn] = 0
+                    else:
+                        self.loc[objn] = -1
+
+        # Offsets of the objects in the file, and of the xref sections, to
+        # find where each object ends
+        self.xref_streams = {rev.offset for rev in revisions}
+        self.obj_stms = {-2 - x for x in self.loc if x < -1}
+        self.offsets = array('q', sorted({x for x in self.loc if x >= 0}
+                                         | self.xref_streams
+                                         | {len(core.mm)}))
+
+    def objects(self):
+        """Return the objn of the objects in use, sorted."""
+        return [objn for objn in range(self.size) if self.loc[objn] != -1]
+
+    def _span(self, objn):
+        """Return (buf, start, end) of the bytes of object objn, or None if
+        objn isn't in use. end may be past the end of the object."""
+        x = self.loc[objn] if objn < self.size else -1
+        if x == -1:
+            return None
+        if x < -1:
+            data, spans = self.cursor._object_stream(-2 - x)
+            idx = self.idx[objn]
+            if idx >= len(spans) or spans[idx][0] != objn:
+                idx = next((k for k, sp in enumerate(spans)
+                            if sp[0] == objn), None)
+                if idx is None:
+                    return None
+            return data, spans[idx][1], spans[idx][2]
+        mm = self.core.mm
+        m = obj_re.match(mm, _skip_ws(mm, x))
+        if not m:
+            raise PdfParseError('expecting an indirect object definition', x)
+        # The scan stops at 'stream' or 'endobj', or else at the next thing
+        # in the file
+        k = bisect_right(self.offsets, x)
+        end = self.offsets[k] if k < len(self.offsets) else len(mm)
+        return mm, m.end(), end
+
+    def refs(self, objn):
+        """Return the (objn, gen) referenced by object objn, None if objn
+        isn't in use."""
+        span = self._span(objn)
+        return scan_refs(*span) if span else None
+
+    def object_size(self, objn):
+        """Return the number of bytes of object objn: the distance to the
+        next object in the file, or its length in its object stream."""
+        x = self.loc[objn] if objn < self.size else -1
+        if x == -1:
+            return 0
+        if x < -1:
+            span = self._span(objn)
+            return span[2] - span[1] if span else 0
+        k = bisect_right(self.offsets, x)
+        return self.offsets[k] - x if k < len(self.offsets) else 0
+
+    def roots(self):
+        """Return the objn of /Root, /Info and /Encrypt."""
+        res = []
+        for key in ('Root', 'Info', 'Encrypt'):
+            o = self.core.trailer.data.get(key)
+            if o is not None and o.type == EObject.IND_OBJ_REF:
+                res.append(o.data['objn'])
+        return res
+
+    def walk(self, roots):
+        """Mark the objects reachable from roots (object numbers), return
+        (visited, missing): a bytearray of self.size bytes, 1 for each object
+        reached, and the set of the objn referenced but not in use."""
+        visited = bytearray(self.size)
+        missing = set()
+        self.errors = []
+        stack = list(roots)
+        while stack:
+            objn = stack.pop()
+            if objn >= len(visited):
+                visited.extend(bytes(objn + 1 - len(visited)))
+            if visited[objn]:
+                continue
+            visited[objn] = 1
+            try:
+                refs = self.refs(objn)
+            except (PdfParseError, PdfEOFError) as e:
+                self.errors.append((objn, str(e)))
+                continue
+            if refs is None:
+                missing.add(objn)
+                continue
+            for ref in refs:
+                k = ref[0]
+                if k >= len(visited) or not visited[k]:
+                    stack.append(k)
+        return visited, missing
+
+    def reachability(self):
+        """Walk the graph from the trailer, return a Reachability."""
+        visited, missing = self.walk(self.roots())
+        res = Reachability()
+        res.missing = sorted(missing)
+        res.errors = self.errors
+        for objn in self.objects():
+            res.objects += 1
+            if visited[objn]:
+                res.reachable += 1
+                continue
+            if self.loc[objn] in self.xref_streams or objn in self.obj_stms:
+                # Part of the file structure, not of the object graph
+                continue
+            size = self.object_size(objn)
+            res.unreachable.append((objn, self.gen[objn], size))
+            res.unreachable_sz += size
+        return res
+
+#-------------------------------------------------------------------------------
+# reachability
+#-------------------------------------------------------------------------------
+
+def reachability(filepath):
+    """Return the Reachability of the objects of a file."""
+    core = DocumentCore(filepath, lazy=True)
+    core.open()
+    try:
+        return ObjectGraph(core).reachability()
+    finally:
+        core.close()
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(f'Usage: {sys.argv[0]} <filepath> ...')
+        exit(-1)
+    for filepath in sys.argv[1:]:
+        res = reachability(filepath)
+        print(f'{filepath}: {res}')
+        for objn, gen, size in res.unreachable:
+            print(f'    {objn} {gen}: {size} bytes')
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# object_graph_t.py
+
+import os
+import unittest
+from document import DocumentCore
+from object_graph import ObjectGraph, reachability, scan_refs
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class ObjectGraphTest(unittest.TestCase):
+    """Test the reachability of objects."""
+
+    path = 't'
+
+    def test01(self):
+        """References, and things that look like them."""
+        buf = (b'<</A 1 0 R/B[2 0 R 3 1 R]/C(4 0 R (5 0 R))/D 12 6 0 R'
+               b'/E12 0 R %7 0 R\n/F<</G 8 0 R>>/H 1.5 9 0 R>>')
+        self.assertEqual([(1, 0), (2, 0), (3, 1), (6, 0), (8, 0), (9, 0)],
+                         scan_refs(buf, 0, len(buf)))
+        self.assertEqual([(2, 0)], scan_refs(buf, 7, 18))
+
+    def test02(self):
+        """Objects left behind by an incremental update."""
+        filepath = os.path.join(ObjectGraphTest.path, 'doc06.pdf')
+        res = reachability(filepath)
+        self.assertEqual(8, res.objects)
+        self.assertEqual(6, res.reachable)
+        # The old page contents, and an object that nothing references
+        self.assertEqual([4, 8], [objn for objn, _, _ in res.unreachable])
+        self.assertEqual(sum(size for _, _, size in res.unreachable),
+                         res.unreachable_sz)
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        k = data.index(b'4 0 obj')
+        self.assertEqual(data.index(b'5 0 obj') - k, res.unreachable[0][2])
+        self.assertEqual([20], res.missing)
+
+    def test03(self):
+        """Objects in object streams."""
+        filepath = os.path.join(ObjectGraphTest.path, 'doc02.pdf')
+        core = DocumentCore(filepath)
+        core.open()
+        try:
+            graph = ObjectGraph(core)
+            res = graph.reachability()
+            self.assertEqual([], res.unreachable)
+            self.assertEqual([], res.missing)
+            visited, _ = graph.walk(graph.roots())
+            reached = {objn for objn in range(len(visited)) if visited[objn]}
+            cur = core.cursor()
+            for objn, gen, o in cur.objects():
+                if objn in reached:
+                    self.assertIsNotNone(o)
+            self.assertEqual(res.reachable, len(reached))
+        finally:
+            core.close()
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,357 +1,474 @@
-#!/usr/bin/env python
-# object_stream_t.py
-
-import os
-import unittest
-from object_stream import EObject, ObjectStream
-
-#-------------------------------------------------------------------------------
-# I want stdout to be unbuffered, always
-#-------------------------------------------------------------------------------
-
-class Unbuffered(object):
-    def __init__(self, stream):
-        self.stream = stream
-    def write(self, data):
-        self.stream.write(data)
-        self.stream.flush()
-    def __getattr__(self, attr):
-        return getattr(self.stream, attr)
-
-import sys
-sys.stdout = Unbuffered(sys.stdout)
-
-# -----------------------------------------------------------------------------
-# Tests
-# -----------------------------------------------------------------------------
-
-class ObjectStreamTest(unittest.TestCase):
-    """Test the parsing of pdf objects in pdf files."""
-
-    path = 't'
-
-    def test01(self):
-        """Test simplest array."""
-        filepath = os.path.join(ObjectStreamTest.path, 'obj_stream00.dat')
-        with open(filepath, 'rb') as f:
-            ob = ObjectStream(filepath, f)
-
-            # Retrieve a few tokens
-            obj = ob.next_object()
-            self.assertEqual(EObject.ARRAY, obj.type)
-            arr = obj.data
-            self.assertEqual(3, len(arr))
-            o = arr[0]
-            self.assertEqual(EObject.INTEGER, o.type)
-            self.assertEqual(17, o.data)
-            o = arr[1]
-            self.assertEqual(EObject.ARRAY, o.type)
-            a2 = o.data
-            self.assertEqual(1, len(a2))
-            o = a2[0]
-            self.assertEqual(EObject.INTEGER, o.type)
-            self.assertEqual(1, o.data)
-
-    def test02(self):
-        """Test simplest array."""
-        filepath = os.path.join(ObjectStreamTest.path, 'obj_stream0.dat')
-        with open(filepath, 'rb') as f:
-            ob = ObjectStream(filepath, f)
-
-            # Retrieve a few tokens
-            obj = ob.next_object()
-            self.assertEqual(EObject.ARRAY, obj.type)
-            arr = obj.data
-            self.assertEqual(3, len(arr))
-            o = arr[0]
-            self.assertEqual(EObject.INTEGER, o.type)
-            self.assertEqual(17, o.data)
-            o = arr[1]
-            self.assertEqual(EObject.STRING, o.type)
-            self.assertEqual(b'a', o.data)
-            o = arr[2]
-            self.assertEqual(EObject.REAL, o.type)
-            self.assertEqual(841.89, o.data)
-
-            # Retrieve a few tokens
-            obj = ob.next_object()
-            self.assertEqual(EObject.ARRAY, obj.type)
-            arr = obj.data
-            self.assertEqual(3, len(arr))
-            o = arr[0]
-            self.assertEqual(EObject.INTEGER, o.type)
-            self.assertEqual(3, o.data)
-            o = arr[1]
-            self.assertEqual(EObject.INTEGER, o.type)
-            self.assertEqual(25, o.data)
-            o = arr[2]
-            self.assertEqual(EObject.ARRAY, o.type)
-            a2 = o.data
-            self.assertEqual(1, len(a2))
-            o = a2[0]
-            self.assertEqual(EObject.INTEGER, o.type)
-            self.assertEqual(1, o.data)
-
-    def test03(self):
-        """Test simple next_object() calls."""
-        filepath = os.path.join(ObjectStreamTest.path, 'obj_stream1.dat')
-        with open(filepath, 'rb') as f:
-            ob = ObjectStream(filepath, f)
-
-            # Retrieve a few tokens
-            obj = ob.next_object()
-            self.assertEqual(EObject.NAME, obj.type)
-            self.assertEqual(b'CropBox', obj.data)
-            obj = ob.next_object()
-            self.assertEqual(EObject.INTEGER, obj.type)
-            self.assertEqual(4301, obj.data)
-            obj = ob.next_object()
-            self.assertEqual(EObject.INTEGER, obj.type)
-            self.assertEqual(0, obj.data)
-            obj = ob.next_object()
-            self.assertEqual(EObject.ARRAY, obj.type)
-            obj = ob.next_object()
-            self.assertEqual(EObject.STRING, obj.type)
-            self.assertEqual(b'Hello', obj.data)
-
-    def test04(self):
-        """Test nested arrays."""
-        filepath = os.path.join(ObjectStreamTest.path, 'obj_stream1.dat')
-        with open(filepath, 'rb') as f:
-            ob = ObjectStream(filepath, f)
-
-            # Retrieve a few tokens
-            obj = ob.next_object()
-            self.assertEqual(EObject.NAME, obj.type)
-            self.assertEqual(b'CropBox', obj.data)
-            obj = ob.next_object()
-            self.assertEqual(EObject.INTEGER, obj.type)
-            self.assertEqual(4301, obj.data)
-            obj = ob.next_object()
-            self.assertEqual(EObject.INTEGER, obj.type)
-            self.assertEqual(0, obj.data)
-
-            # Array
-            obj = ob.next_object()
-            self.assertEqual(EObject.ARRAY, obj.type)
-
-            # arr is a python array, but the items are PdfObjects
-            arr = obj.data
-            self.assertEqual(5, len(arr))
-
-            # Second item is a 4-item array
-            o2 = arr[2]
-            self.assertEqual(EObject.ARRAY, o2.type)
-            self.assertEqual(4, len(o2.data))
-            x = o2.data[0]
-            self.assertEqual(EObject.STRING, x.type)
-            self.assertEqual(b'a', x.data)
-            x = o2.data[3]
-            self.assertEqual(EObject.INTEGER, x.type)
-            self.assertEqual(91, x.data)
-
-            obj = ob.next_object()
-            self.assertEqual(EObject.STRING, obj.type)
-            self.assertEqual(b'Hello', obj.data)
-
-    def test05(self):
-        """Test nested dictionaries."""
-        filepath = os.path.join(ObjectStreamTest.path, 'obj_stream2.dat')
-        with open(filepath, 'rb') as f:
-            ob = ObjectStream(filepath, f)
-
-            # Retrieve a few tokens
-            obj = ob.next_object()
-            self.assertEqual(EObject.INTEGER, obj.type)
-            self.assertEqual(13, obj.data)
-            obj = ob.next_object()
-            self.assertEqual(EObject.NAME, obj.type)
-            self.assertEqual(b'byebye', obj.data)
-
-            # Third item is a dictionary
-            obj = ob.next_object()
-            self.assertEqual(EObject.DICTIONARY, obj.type)
-
-            # d is a python dictionary, but the items are PdfObjects
-            d = obj.data
-            self.assertEqual(6, len(d))
-
-            x = d['Second']
-            self.assertEqual(EObject.REAL, x.type)
-            self.assertEqual(841.89, x.data)
-
-            x = d['Goodbye']
-            self.assertEqual(EObject.STRING, x.type)
-            self.assertEqual(b'goodnight', x.data)
-
-            # The Sub key holds a dictionary value
-            x = d['Sub']
-            self.assertEqual(EObject.DICTIONARY, x.type)
-            self.assertEqual(4, len(x.data))
-
-            y = x.data['lower']
-            self.assertEqual(EObject.DICTIONARY, y.type)
-            self.assertEqual(2, len(y.data))
-
-            z = y.data['Black']
-            self.assertEqual(EObject.INTEGER, z.type)
-            self.assertEqual(1, z.data)
-
-            y = x.data['nice']
-            self.assertEqual(EObject.REAL, y.type)
-            self.assertEqual(1.0, y.data)
-
-    def test06(self):
-        """Test indirect object references."""
-        filepath = os.path.join(ObjectStreamTest.path, 'obj_stream3.dat')
-        with open(filepath, 'rb') as f:
-            ob = ObjectStream(filepath, f)
-
-            # First object is an indirect object ref (ior)
-            obj = ob.next_object()
-            self.assertEqual(EObject.IND_OBJ_REF, obj.type)
-            self.assertEqual(125, obj.data['objn'])
-            self.assertEqual(0, obj.data['gen'])
-
-            # Second object is an array
-            obj = ob.next_object()
-            self.assertEqual(EObject.ARRAY, obj.type)
-            arr = obj.data
-            self.assertEqual(3, len(arr))
-
-            o = arr[0]
-            self.assertEqual(EObject.IND_OBJ_REF, o.type)
-            self.assertEqual(13, o.data['objn'])
-            self.assertEqual(2, o.data['gen'])
-
-            o = arr[1]
-            self.assertEqual(EObject.INTEGER, o.type)
-            self.assertEqual(51, o.data)
-
-            o = arr[2]
-            self.assertEqual(EObject.IND_OBJ_REF, o.type)
-            self.assertEqual(42, o.data['objn'])
-            self.assertEqual(0, o.data['gen'])
-
-    def test07(self):
-        """Test dictionary objects in dict1.dat."""
-        filepath = r't\dict1.dat'
-        with open(filepath, 'rb') as f:
-            ob = ObjectStream(filepath, f)
-
-            # Retrieve a dictionary
-            obj = ob.next_object()
-            self.assertEqual(EObject.DICTIONARY, obj.type)
-            # Contains 2 keys 
-            d = obj.data
-            self.assertEqual(2, len(d))
-            self.assertEqual(15, d['aaa'].data)
-            self.assertEqual(9, d['bb'].data)
-
-            # Retrieve a dictionary
-            obj = ob.next_object()
-            self.assertEqual(EObject.DICTIONARY, obj.type)
-            # Contains 3 keys 
-            d = obj.data
-            self.assertEqual(3, len(d))
-            self.assertEqual(b'peter', d['cc'].data)
-            self.assertEqual(b'paul', d['dd'].data)
-            arr = d['ee'].data
-            self.assertEqual(2, len(arr))
-            self.assertEqual(1, arr[0].data)
-            self.assertEqual(2, arr[1].data)
-
-            # Retrieve a dictionary
-            obj = ob.next_object()
-            self.assertEqual(EObject.DICTIONARY, obj.type)
-            # Contains 4 keys 
-            d = obj.data
-            self.assertEqual(4, len(d))
-            d2 = d['dd'].data
-            self.assertEqual(3, len(d2))
-            o2 = d2['a1']
-            self.assertEqual(EObject.ARRAY, o2.type)
-            arr = o2.data
-            self.assertEqual(3, len(arr))
-            self.assertEqual(5, arr[0].data)
-            self.assertEqual(7, arr[1].data)
-            self.assertEqual(9, arr[2].data)
-
-            # Retrieve a dictionary
-            obj = ob.next_object()
-            self.assertEqual(EObject.DICTIONARY, obj.type)
-            # Contains 1 key 'a'
-            d = obj.data
-            self.assertEqual(1, len(d))
-            # a's value is a dictionary 'x'
-            x = d['a']
-            self.assertEqual(EObject.DICTIONARY, x.type)
-            y = x.data
-            self.assertEqual(1, len(y))
-            # b's value is a name
-            x3 = y['b']
-            self.assertEqual(EObject.NAME, x3.type)
-            self.assertEqual(b'x', x3.data)
-
-            # Retrieve a dictionary
-            obj = ob.next_object()
-            self.assertEqual(EObject.DICTIONARY, obj.type)
-            # Contains 1 key 'a'
-            d = obj.data
-            self.assertEqual(1, len(d))
-            # a's value is a dictionary 'x'
-            x = d['a']
-            self.assertEqual(EObject.DICTIONARY, x.type)
-            y = x.data
-            self.assertEqual(1, len(y))
-            # b's value is a dictionary x2
-            x2 = y['b']
-            self.assertEqual(EObject.DICTIONARY, x2.type)
-            y2 = x2.data
-            self.assertEqual(1, len(y2))
-            # v's value is a name
-            x3 = y2['v']
-            self.assertEqual(EObject.NAME, x3.type)
-            self.assertEqual(b'z', x3.data)
-
-    def test08(self):
-        """Test dictionary objects in dict2.dat"""
-        filepath = r't\dict2.dat'
-        with open(filepath, 'rb') as f:
-            ob = ObjectStream(filepath, f)
-
-            # Retrieve a dictionary
-            obj = ob.next_object()
-            self.assertEqual(EObject.DICTIONARY, obj.type)
-            # Contains 8 keys 
-            d = obj.data
-            self.assertEqual(8, len(d))
-
-            val = d['Type']
-            self.assertEqual(EObject.NAME, val.type)
-            self.assertEqual(b'Page', val.data)
-
-            val = d['MediaBox']
-            self.assertEqual(EObject.ARRAY, val.type)
-            arr = val.data
-            self.assertEqual(4, len(arr))
-            self.assertEqual(595, arr[2].data)
-
-            val = d['Resources']
-            self.assertEqual(EObject.DICTIONARY, val.type)
-            d2 = val.data
-            self.assertEqual(3, len(d2))
-
-            val = d2['Font']
-            self.assertEqual(EObject.DICTIONARY, val.type)
-            d3 = val.data
-            self.assertEqual(3, len(d3))
-
-            val = d3['Z_F17']
-            self.assertEqual(EObject.IND_OBJ_REF, val.type)
-            self.assertEqual(6114, val.data['objn'])
-            self.assertEqual(0, val.data['gen'])
-
-if __name__ == '__main__':
-    unittest.main(verbosity=2)
-
+#!/usr/bin/env python
+# object_stream_t.py
+
+import io
+import os
+import unittest
+from object_stream import EObject, ObjectStream, TableXrefSubSection, \
+    read_startxref, xref_section_from_table
+from token_stream import PdfParseError, PdfEOFError
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class ObjectStreamTest(unittest.TestCase):
+    """Test the parsing of pdf objects in pdf files."""
+
+    path = 't'
+
+    def test01(self):
+        """Test simplest array."""
+        filepath = os.path.join(ObjectStreamTest.path, 'obj_stream00.dat')
+        with open(filepath, 'rb') as f:
+            ob = ObjectStream(filepath, f)
+
+            # Retrieve a few tokens
+            obj = ob.next_object()
+            self.assertEqual(EObject.ARRAY, obj.type)
+            arr = obj.data
+            self.assertEqual(3, len(arr))
+            o = arr[0]
+            self.assertEqual(EObject.INTEGER, o.type)
+            self.assertEqual(17, o.data)
+            o = arr[1]
+            self.assertEqual(EObject.ARRAY, o.type)
+            a2 = o.data
+            self.assertEqual(1, len(a2))
+            o = a2[0]
+            self.assertEqual(EObject.INTEGER, o.type)
+            self.assertEqual(1, o.data)
+
+    def test02(self):
+        """Test simplest array."""
+        filepath = os.path.join(ObjectStreamTest.path, 'obj_stream0.dat')
+        with open(filepath, 'rb') as f:
+            ob = ObjectStream(filepath, f)
+
+            # Retrieve a few tokens
+            obj = ob.next_object()
+            self.assertEqual(EObject.ARRAY, obj.type)
+            arr = obj.data
+            self.assertEqual(3, len(arr))
+            o = arr[0]
+            self.assertEqual(EObject.INTEGER, o.type)
+            self.assertEqual(17, o.data)
+            o = arr[1]
+            self.assertEqual(EObject.STRING, o.type)
+            self.assertEqual(b'a', o.data)
+            o = arr[2]
+            self.assertEqual(EObject.REAL, o.type)
+            self.assertEqual(841.89, o.data)
+
+            # Retrieve a few tokens
+            obj = ob.next_object()
+            self.assertEqual(EObject.ARRAY, obj.type)
+            arr = obj.data
+            self.assertEqual(3, len(arr))
+            o = arr[0]
+            self.assertEqual(EObject.INTEGER, o.type)
+            self.assertEqual(3, o.data)
+            o = arr[1]
+            self.assertEqual(EObject.INTEGER, o.type)
+            self.assertEqual(25, o.data)
+            o = arr[2]
+            self.assertEqual(EObject.ARRAY, o.type)
+            a2 = o.data
+            self.assertEqual(1, len(a2))
+            o = a2[0]
+            self.assertEqual(EObject.INTEGER, o.type)
+            self.assertEqual(1, o.data)
+
+    def test03(self):
+        """Test simple next_object() calls."""
+        filepath = os.path.join(ObjectStreamTest.path, 'obj_stream1.dat')
+        with open(filepath, 'rb') as f:
+            ob = ObjectStream(filepath, f)
+
+            # Retrieve a few tokens
+            obj = ob.next_object()
+            self.assertEqual(EObject.NAME, obj.type)
+            self.assertEqual(b'CropBox', obj.data)
+            obj = ob.next_object()
+            self.assertEqual(EObject.INTEGER, obj.type)
+            self.assertEqual(4301, obj.data)
+            obj = ob.next_object()
+            self.assertEqual(EObject.INTEGER, obj.type)
+            self.assertEqual(0, obj.data)
+            obj = ob.next_object()
+            self.assertEqual(EObject.ARRAY, obj.type)
+            obj = ob.next_object()
+            self.assertEqual(EObject.STRING, obj.type)
+            self.assertEqual(b'Hello', obj.data)
+
+    def test04(self):
+        """Test nested arrays."""
+        filepath = os.path.join(ObjectStreamTest.path, 'obj_stream1.dat')
+        with open(filepath, 'rb') as f:
+            ob = ObjectStream(filepath, f)
+
+            # Retrieve a few tokens
+            obj = ob.next_object()
+            self.assertEqual(EObject.NAME, obj.type)
+            self.assertEqual(b'CropBox', obj.data)
+            obj = ob.next_object()
+            self.assertEqual(EObject.INTEGER, obj.type)
+            self.assertEqual(4301, obj.data)
+            obj = ob.next_object()
+            self.assertEqual(EObject.INTEGER, obj.type)
+            self.assertEqual(0, obj.data)
+
+            # Array
+            obj = ob.next_object()
+            self.assertEqual(EObject.ARRAY, obj.type)
+
+            # arr is a python array, but the items are PdfObjects
+            arr = obj.data
+            self.assertEqual(5, len(arr))
+
+            # Second item is a 4-item array
+            o2 = arr[2]
+            self.assertEqual(EObject.ARRAY, o2.type)
+            self.assertEqual(4, len(o2.data))
+            x = o2.data[0]
+            self.assertEqual(EObject.STRING, x.type)
+            self.assertEqual(b'a', x.data)
+            x = o2.data[3]
+            self.assertEqual(EObject.INTEGER, x.type)
+            self.assertEqual(91, x.data)
+
+            obj = ob.next_object()
+            self.assertEqual(EObject.STRING, obj.type)
+            self.assertEqual(b'Hello', obj.data)
+
+    def test05(self):
+        """Test nested dictionaries."""
+        filepath = os.path.join(ObjectStreamTest.path, 'obj_stream2.dat')
+        with open(filepath, 'rb') as f:
+            ob = ObjectStream(filepath, f)
+
+            # Retrieve a few tokens
+            obj = ob.next_object()
+            self.assertEqual(EObject.INTEGER, obj.type)
+            self.assertEqual(13, obj.data)
+            obj = ob.next_object()
+            self.assertEqual(EObject.NAME, obj.type)
+            self.assertEqual(b'byebye', obj.data)
+
+            # Third item is a dictionary
+            obj = ob.next_object()
+            self.assertEqual(EObject.DICTIONARY, obj.type)
+
+            # d is a python dictionary, but the items are PdfObjects
+            d = obj.data
+            self.assertEqual(6, len(d))
+
+            x = d['Second']
+            self.assertEqual(EObject.REAL, x.type)
+            self.assertEqual(841.89, x.data)
+
+            x = d['Goodbye']
+            self.assertEqual(EObject.STRING, x.type)
+            self.assertEqual(b'goodnight', x.data)
+
+            # The Sub key holds a dictionary value
+            x = d['Sub']
+            self.assertEqual(EObject.DICTIONARY, x.type)
+            self.assertEqual(4, len(x.data))
+
+            y = x.data['lower']
+            self.assertEqual(EObject.DICTIONARY, y.type)
+            self.assertEqual(2, len(y.data))
+
+            z = y.data['Black']
+            self.assertEqual(EObject.INTEGER, z.type)
+            self.assertEqual(1, z.data)
+
+            y = x.data['nice']
+            self.assertEqual(EObject.REAL, y.type)
+            self.assertEqual(1.0, y.data)
+
+    def test06(self):
+        """Test indirect object references."""
+        filepath = os.path.join(ObjectStreamTest.path, 'obj_stream3.dat')
+        with open(filepath, 'rb') as f:
+            ob = ObjectStream(filepath, f)
+
+            # First object is an indirect object ref (ior)
+            obj = ob.next_object()
+            self.assertEqual(EObject.IND_OBJ_REF, obj.type)
+            self.assertEqual(125, obj.data['objn'])
+            self.assertEqual(0, obj.data['gen'])
+
+            # Second object is an array
+            obj = ob.next_object()
+            self.assertEqual(EObject.ARRAY, obj.type)
+            arr = obj.data
+            self.assertEqual(3, len(arr))
+
+            o = arr[0]
+            self.assertEqual(EObject.IND_OBJ_REF, o.type)
+            self.assertEqual(13, o.data['objn'])
+            self.assertEqual(2, o.data['gen'])
+
+            o = arr[1]
+            self.assertEqual(EObject.INTEGER, o.type)
+            self.assertEqual(51, o.data)
+
+            o = arr[2]
+            self.assertEqual(EObject.IND_OBJ_REF, o.type)
+            self.assertEqual(42, o.data['objn'])
+            self.assertEqual(0, o.data['gen'])
+
+    def test07(self):
+        """Test dictionary objects in dict1.dat."""
+        filepath = r't\dict1.dat'
+        with open(filepath, 'rb') as f:
+            ob = ObjectStream(filepath, f)
+
+            # Retrieve a dictionary
+            obj = ob.next_object()
+            self.assertEqual(EObject.DICTIONARY, obj.type)
+            # Contains 2 keys 
+            d = obj.data
+            self.assertEqual(2, len(d))
+            self.assertEqual(15, d['aaa'].data)
+            self.assertEqual(9, d['bb'].data)
+
+            # Retrieve a dictionary
+            obj = ob.next_object()
+            self.assertEqual(EObject.DICTIONARY, obj.type)
+            # Contains 3 keys 
+            d = obj.data
+            self.assertEqual(3, len(d))
+            self.assertEqual(b'peter', d['cc'].data)
+            self.assertEqual(b'paul', d['dd'].data)
+            arr = d['ee'].data
+            self.assertEqual(2, len(arr))
+            self.assertEqual(1, arr[0].data)
+            self.assertEqual(2, arr[1].data)
+
+            # Retrieve a dictionary
+            obj = ob.next_object()
+            self.assertEqual(EObject.DICTIONARY, obj.type)
+            # Contains 4 keys 
+            d = obj.data
+            self.assertEqual(4, len(d))
+            d2 = d['dd'].data
+            self.assertEqual(3, len(d2))
+            o2 = d2['a1']
+            self.assertEqual(EObject.ARRAY, o2.type)
+            arr = o2.data
+            self.assertEqual(3, len(arr))
+            self.assertEqual(5, arr[0].data)
+            self.assertEqual(7, arr[1].data)
+            self.assertEqual(9, arr[2].data)
+
+            # Retrieve a dictionary
+            obj = ob.next_object()
+            self.assertEqual(EObject.DICTIONARY, obj.type)
+            # Contains 1 key 'a'
+            d = obj.data
+            self.assertEqual(1, len(d))
+            # a's value is a dictionary 'x'
+            x = d['a']
+            self.assertEqual(EObject.DICTIONARY, x.type)
+            y = x.data
+            self.assertEqual(1, len(y))
+            # b's value is a name
+            x3 = y['b']
+            self.assertEqual(EObject.NAME, x3.type)
+            self.assertEqual(b'x', x3.data)
+
+            # Retrieve a dictionary
+            obj = ob.next_object()
+            self.assertEqual(EObject.DICTIONARY, obj.type)
+            # Contains 1 key 'a'
+            d = obj.data
+            self.assertEqual(1, len(d))
+            # a's value is a dictionary 'x'
+            x = d['a']
+            self.assertEqual(EObject.DICTIONARY, x.type)
+            y = x.data
+            self.assertEqual(1, len(y))
+            # b's value is a dictionary x2
+            x2 = y['b']
+            self.assertEqual(EObject.DICTIONARY, x2.type)
+            y2 = x2.data
+            self.assertEqual(1, len(y2))
+            # v's value is a name
+            x3 = y2['v']
+            self.assertEqual(EObject.NAME, x3.type)
+            self.assertEqual(b'z', x3.data)
+
+    def test08(self):
+        """Test dictionary objects in dict2.dat"""
+        filepath = r't\dict2.dat'
+        with open(filepath, 'rb') as f:
+            ob = ObjectStream(filepath, f)
+
+            # Retrieve a dictionary
+            obj = ob.next_object()
+            self.assertEqual(EObject.DICTIONARY, obj.type)
+            # Contains 8 keys 
+            d = obj.data
+            self.assertEqual(8, len(d))
+
+            val = d['Type']
+            self.assertEqual(EObject.NAME, val.type)
+            self.assertEqual(b'Page', val.data)
+
+            val = d['MediaBox']
+            self.assertEqual(EObject.ARRAY, val.type)
+            arr = val.data
+            self.assertEqual(4, len(arr))
+            self.assertEqual(595, arr[2].data)
+
+            val = d['Resources']
+            self.assertEqual(EObject.DICTIONARY, val.type)
+            d2 = val.data
+            self.assertEqual(3, len(d2))
+
+            val = d2['Font']
+            self.assertEqual(EObject.DICTIONARY, val.type)
+            d3 = val.data
+            self.assertEqual(3, len(d3))
+
+            val = d3['Z_F17']
+            self.assertEqual(EObject.IND_OBJ_REF, val.type)
+            self.assertEqual(6114, val.data['objn'])
+            self.assertEqual(0, val.data['gen'])
+
+    def test09(self):
+        """Test errors and EOF in the default mode, as pseudo-objects."""
+        filepath = os.path.join(ObjectStreamTest.path, 'errors.dat')
+        with open(filepath, 'rb') as f:
+            ob = ObjectStream(filepath, f)
+
+            obj = ob.next_object()
+            self.assertEqual(EObject.ARRAY, obj.type)
+
+            # The dictionary has a ']' where a key is expected
+            obj = ob.next_object()
+            self.assertEqual(EObject.ERROR, obj.type)
+            self.assertEqual(17, obj.data.offset)
+
+    def test10(self):
+        """Test errors and EOF in strict mode, as exceptions."""
+        filepath = os.path.join(ObjectStreamTest.path, 'errors.dat')
+        with open(filepath, 'rb') as f:
+            ob = ObjectStream(filepath, f, strict=True)
+
+            obj = ob.next_object()
+            self.assertEqual(EObject.ARRAY, obj.type)
+
+            # The dictionary has a ']' where a key is expected
+            with self.assertRaises(PdfParseError) as cm:
+                ob.next_object()
+            self.assertEqual(17, cm.exception.offset)
+
+        filepath = os.path.join(ObjectStreamTest.path, 'obj_stream00.dat')
+        with open(filepath, 'rb') as f:
+            ob = ObjectStream(filepath, f, strict=True)
+
+            obj = ob.next_object()
+            self.assertEqual(EObject.ARRAY, obj.type)
+            with self.assertRaises(PdfEOFError):
+                ob.next_object()
+
+    def test11(self):
+        """Trailer and startxref offset from the end of the file."""
+        filepath = os.path.join(ObjectStreamTest.path, 'doc03.pdf')
+        with open(filepath, 'rb') as f:
+            ob = ObjectStream(filepath, f)
+            # The xref section is in the tail, the 'trailer' keyword only, or
+            # neither of them
+            for n in [4096, 100, 30]:
+                trailer, offset = ob.get_tail(n)
+                self.assertEqual(1384, offset)
+                self.assertEqual(1233, trailer.data['Prev'].data)
+
+        # Cross-reference stream
+        filepath = os.path.join(ObjectStreamTest.path, 'doc02.pdf')
+        with open(filepath, 'rb') as f:
+            ob = ObjectStream(filepath, f)
+            trailer, offset = ob.get_tail()
+            self.assertEqual(765, offset)
+            self.assertEqual(b'XRef', trailer.data['Type'].data)
+
+        filepath = os.path.join(ObjectStreamTest.path, 'errors.dat')
+        with open(filepath, 'rb') as f:
+            ob = ObjectStream(filepath, f)
+            self.assertEqual((None, -1), ob.get_tail())
+            ob = ObjectStream(filepath, f, strict=True)
+            with self.assertRaises(PdfParseError):
+                ob.get_tail()
+            with self.assertRaises(PdfParseError):
+                read_startxref(f)
+
+        # The same helper opens documents
+        filepath = os.path.join(ObjectStreamTest.path, 'doc03.pdf')
+        with open(filepath, 'rb') as f:
+            offset, tail, start = read_startxref(f, 100)
+            self.assertEqual(1384, offset)
+            f.seek(start)
+            self.assertEqual(tail, f.read())
+
+    def test12(self):
+        """Xref table entries decoded on access."""
+        filepath = os.path.join(ObjectStreamTest.path, 'doc01.pdf')
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        xref_sec, pos = xref_section_from_table(data, 832)
+        self.assertEqual(data.find(b'trailer'), pos)
+        subs = xref_sec.sub_sections[0]
+        self.assertIsInstance(subs, TableXrefSubSection)
+        self.assertEqual((data.find(b'1 0 obj'), 0, True),
+                         xref_sec.get_object(1, 0))
+        self.assertEqual((0, 65535, False), xref_sec.get_object(0, 0))
+        self.assertIsNone(xref_sec.get_object(11, 0))
+
+        # Same entries as the ObjectStream
+        with open(filepath, 'rb') as f:
+            ob = ObjectStream(filepath, f)
+            ob.seek(832)
+            o = ob.get_cross_reference()
+        self.assertEqual(o.data.sub_sections[0].entries, subs.entries)
+
+        # 19-byte entries
+        self.assertIsNone(xref_section_from_table(
+            b'xref\n0 2\n0000000000 65535 f\n0000000009 00000 n\n', 0))
+
+    def test13(self):
+        """In strict mode, a token error is raised where it is found."""
+        data = b'1 0 obj\n<< /A 12v /LongName 2 >>\nendobj\n'
+        ob = ObjectStream('<bytes>', io.BytesIO(data), strict=True)
+        with self.assertRaises(PdfParseError) as cm:
+            ob.next_object()
+        self.assertLessEqual(cm.exception.offset, data.index(b'/LongName'))
+
+        # The end of the data after the last object isn't an error
+        ob = ObjectStream('<bytes>', io.BytesIO(b'[1 2] '), strict=True)
+        self.assertEqual(EObject.ARRAY, ob.next_object().type)
+        with self.assertRaises(PdfEOFError):
+            ob.next_object()
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
+
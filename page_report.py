@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# page_report.py - which pages make a file big
+
+# The closure of a page is the set of the objects it references, directly or
+# not: its contents, its resources (inherited ones too), the fonts and images
+# these reference, its annotations, ... The page tree itself isn't part of
+# it: the /Parent of a page, the /P of an annotation, the page that a link
+# points to, are other pages' business, and following them would put the
+# whole document in every closure.
+#
+# The bytes of each object (see ObjectGraph.object_size()) are attributed to
+# the pages whose closure holds it. An object used by k pages counts for 1/k
+# of its size in each of them, so the attributed bytes of all the pages add up
+# to the bytes of the objects they use. Streams are also accounted for by the
+# length of their data, and optionally by their decoded length.
+#
+# The closures are computed with ObjectGraph.refs(), which scans the bytes of
+# the objects, without parsing them. The closure of each object that a page
+# (or a page tree node) references directly is memoized: the /Resources, the
+# fonts, the images that many pages share are walked only once, and the
+# closure of a page is the union of a few memoized sets.
+
+import sys
+from array import array
+from document import DocumentCore
+from filters import FilterError, decode_stream
+from lazy_object import lazy_stream
+from object_graph import ObjectGraph
+from object_stream import EObject, filter_chain
+from token_stream import PdfParseError, PdfEOFError
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# class PageCost, class PageReport
+#-------------------------------------------------------------------------------
+
+class PageCost:
+    """The objects a page depends on, and what they weigh."""
+
+    def __init__(self, number, objn):
+        self.number = number    # 1 for the first page
+        self.objn = objn
+        self.closure = None     # frozenset of objn
+        self.bytes = 0          # of the objects in the closure
+        self.stream_bytes = 0   # stream data, as it is in the file
+        self.decoded_bytes = 0  # stream data, decoded (-1 if not computed)
+        self.own_bytes = 0      # of the objects only this page uses
+        self.attributed = 0.0   # bytes, shared objects split between pages
+
+    def __str__(self):
+        return (f'page {self.number} ({self.objn} 0 R):'
+                f' {len(self.closure)} objects, {self.bytes} bytes,'
+                f' {self.own_bytes} own, {self.attributed:.0f} attributed,'
+                f' streams {self.stream_bytes} -> {self.decoded_bytes}')
+
+class PageReport:
+    """The PageCost of every page, and the totals."""
+
+    def __init__(self):
+        self.pages = []
+        self.objects = 0  # used by at least one page, counted once
+        self.bytes = 0    # of these objects
+        self.sharing = 0.0  # sum of the page bytes / bytes, 1 if no sharing
+
+    def __str__(self):
+        return (f'{len(self.pages)} pages, {self.objects} objects,'
+                f' {self.bytes} bytes, sharing factor {self.sharing:.2f}')
+
+#-------------------------------------------------------------------------------
+# class PageClosures
+#-------------------------------------------------------------------------------
+
+# PDF Spec, § 7.7.3.4 Inheritance of Page Attributes
+inheritable = ('Resources', 'MediaBox', 'CropBox', 'Rotate')
+
+def _object_refs(o, refs):
+    """Append the objn of the references in PdfObject o to refs."""
+    if o.type == EObject.IND_OBJ_REF:
+        refs.append(o.data['objn'])
+    elif o.type == EObject.DICTIONARY:
+        for v in o.data.values():
+            _object_refs(v, refs)
+    elif o.type == EObject.ARRAY:
+        for v in o.data:
+            _object_refs(v, refs)
+
+class PageClosures:
+    """The closures of the pages of an open DocumentCore."""
+
+    def __init__(self, core, graph=None):
+        self.core = core
+        self.graph = graph or ObjectGraph(core)
+        self.cursor = core.cursor()
+        self.memo = {}  # objn -> frozenset, the closure of objn
+        self.tree = set()  # objn of the page tree nodes and of the pages
+        self.pages = []  # (objn of the page, [objn it inherits])
+        self._walk_tree()
+
+    def _walk_tree(self):
+        """Find the pages, in order, and what they inherit."""
+        root = self.core.trailer.data.get('Root')
+        try:
+            catalog = self.cursor.deref(root)
+        except (PdfParseError, PdfEOFError):
+            return
+        if catalog is None or catalog.type != EObject.DICTIONARY:
+            return
+        ref = catalog.data.get('Pages')
+        if ref is None or ref.type != EObject.IND_OBJ_REF:
+            return
+        # (objn, inheritable key -> value in the nearest ancestor)
+        stack = [(ref.data['objn'], {})]
+        while stack:
+            objn, inherited = stack.pop()
+            if objn in self.tree:
+                continue
+            self.tree.add(objn)
+            try:
+                node = self.cursor.get_object(objn, cache=False)
+                if node is None or node.type != EObject.DICTIONARY:
+                    continue
+                d = node.data
+                typ = d.get('Type')
+                is_pages = 'Kids' in d and (typ is None
+                                            or typ.data == b'Pages')
+                if is_pages:
+                    kids = self.cursor.deref(d['Kids'])
+            except (PdfParseError, PdfEOFError):
+                # An unreadable node is skipped, as in ObjectGraph.walk()
+                continue
+            if is_pages:
+                if kids is None or kids.type != EObject.ARRAY:
+                    continue
+                inherited = dict(inherited)
+                for key in inheritable:
+                    if key in d:
+                        inherited[key] = d[key]
+                for k in reversed(kids.data):
+                    if k.type == EObject.IND_OBJ_REF:
+                        stack.append((k.data['objn'], inherited))
+            else:
+                refs = []
+                for key, o in inherited.items():
+                    if key not in d:
+                        _object_refs(o, refs)
+                self.pages.append((objn, refs))
+
+    def _refs(self, objn):
+        """The objn referenced by objn, outside of the page tree."""
+        try:
+            refs = self.graph.refs(objn)
+        except (PdfParseError, PdfEOFError):
+            return []
+        return [k for k, _ in refs or () if k not in self.tree]
+
+    def closure(self, objn):
+        """Return the closure of objn (not in the page tree), memoized."""
+        fs = self.memo.get(objn)
+        if fs is not None:
+            return fs
+        loc = self.graph.loc
+        seen = set()
+        stack = [objn]
+        while stack:
+            k = stack.pop()
+            if k in seen:
+                continue
+            m = self.memo.get(k)
+            if m is not None:
+                # Already walked, from another page
+                seen |= m
+                continue
+            if k >= self.graph.size or loc[k] == -1:
+                # Not in use
+                continue
+            seen.add(k)
+            stack.extend(self._refs(k))
+        fs = self.memo[objn] = frozenset(seen)
+        return fs
+
+    def page_closure(self, objn, inherited):
+        """Return the closure of page objn, inherited being the objn it
+        inherits from its ancestors."""
+        seen = {objn}
+        for k in self._refs(objn) + inherited:
+            if k not in self.tree:
+                seen |= self.closure(k)
+        return frozenset(seen)
+
+#-------------------------------------------------------------------------------
+# page_report
+#-------------------------------------------------------------------------------
+
+def _stream_bytes(core, cursor, graph, objn, decode):
+    """Return (length, decoded length) of the data of stream objn, (0, 0) if
+    it isn't a stream. The decoded length is -1 if it's not computed."""
+    x = graph.loc[objn]
+    if x < 0:
+        # Streams are never stored in object streams
+        return 0, 0
+    try:
+        res = lazy_stream(core.mm, x)
+    except PdfParseError:
+        return 0, 0
+    if res is None:
+        return 0, 0
+    o = cursor.deref(res[2].data.get('Length'))
+    if o is None or o.type != EObject.INTEGER:
+        return 0, 0
+    length = o.data
+    if not decode:
+        return length, -1
+    try:
+        start = res[3]
+        chain = filter_chain(res[2], cursor.deref)
+        data, rest = decode_stream(core.mm[start:start + length], chain)
+    except (FilterError, PdfParseError):
+        return length, -1
+    return length, -1 if rest else len(data)
+
+def page_report(core, decode=False):
+    """Return the PageReport of an open DocumentCore.
+
+    With decode=True, the data of the streams is decoded, to account for
+    their decoded length.
+    """
+    pc = PageClosures(core)
+    graph = pc.graph
+    report = PageReport()
+
+    # How many pages use each object
+    users = array('l', [0])*graph.size
+    for number, (objn, inherited) in enumerate(pc.pages, 1):
+        page = PageCost(number, objn)
+        page.closure = pc.page_closure(objn, inherited)
+        for k in page.closure:
+            users[k] += 1
+        report.pages.append(page)
+
+    # What each object weighs, computed once
+    sizes = {}
+    cursor = core.cursor()
+    for page in report.pages:
+        if decode is False:
+            page.decoded_bytes = -1
+        for k in page.closure:
+            sz = sizes.get(k)
+            if sz is None:
+                sz = sizes[k] = ((graph.object_size(k),)
+                                 + _stream_bytes(core, cursor, graph, k,
+                                                 decode))
+            page.bytes += sz[0]
+            page.stream_bytes += sz[1]
+            if decode and sz[2] > 0:
+                page.decoded_bytes += sz[2]
+            if users[k] == 1:
+                page.own_bytes += sz[0]
+            page.attributed += sz[0] / users[k]
+
+    report.objects = len(sizes)
+    report.bytes = sum(sz[0] for sz in sizes.values())
+    if report.bytes:
+        report.sharing = sum(p.bytes for p in report.pages) / report.bytes
+    return report
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(f'Usage: {sys.argv[0]} <filepath>')
+        exit(-1)
+    core = DocumentCore(sys.argv[1], lazy=True)
+    core.open()
+    try:
+        report = page_report(core, decode=True)
+    finally:
+        core.close()
+    print(report)
+    for page in sorted(report.pages, key=lambda p: -p.attributed):
+        print(f'    {page}')
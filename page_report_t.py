@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# page_report_t.py
+
+import os
+import tempfile
+import unittest
+from document import DocumentCore
+from page_report import PageClosures, page_report
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class PageReportTest(unittest.TestCase):
+    """Test the per-page dependency report."""
+
+    path = 't'
+
+    def setUp(self):
+        filepath = os.path.join(PageReportTest.path, 'doc07.pdf')
+        self.core = DocumentCore(filepath, lazy=True)
+        self.core.open()
+
+    def tearDown(self):
+        self.core.close()
+
+    def test01(self):
+        """Closures, with inherited resources, without the page tree."""
+        pc = PageClosures(self.core)
+        self.assertEqual([3, 4, 5], [objn for objn, _ in pc.pages])
+        closures = [sorted(pc.page_closure(*p)) for p in pc.pages]
+        # Page 2 inherits its /Resources, page 3 has its own, and the /P and
+        # /Dest of its link annotation point back into the page tree
+        self.assertEqual([[3, 6, 7, 8, 9], [4, 6, 7, 8, 10],
+                          [5, 7, 11, 12, 14]], closures)
+        # The shared /Resources were walked once
+        self.assertIs(pc.closure(6), pc.memo[6])
+
+    def test02(self):
+        """Bytes, attributed to the pages."""
+        report = page_report(self.core, decode=True)
+        self.assertEqual(11, report.objects)
+        p1, p2, p3 = report.pages
+        self.assertEqual(4096 + 32, p1.decoded_bytes)
+        self.assertEqual(1000 + 34, p3.decoded_bytes)
+        self.assertEqual(p1.stream_bytes, p2.stream_bytes)
+
+        # Every byte is attributed once
+        self.assertAlmostEqual(report.bytes,
+                               sum(p.attributed for p in report.pages))
+        self.assertEqual(sum(p.bytes for p in report.pages),
+                         round(report.sharing*report.bytes))
+        # The font is used by the 3 pages, the resources and image by 2
+        sizes = {k: PageClosures(self.core).graph.object_size(k)
+                 for k in (3, 6, 7, 8, 9)}
+        self.assertEqual(sizes[3] + sizes[9], p1.own_bytes)
+        self.assertAlmostEqual(sizes[3] + sizes[9] + sizes[7]/3
+                               + (sizes[6] + sizes[8])/2, p1.attributed)
+
+        report = page_report(self.core)
+        self.assertEqual(-1, report.pages[0].decoded_bytes)
+
+    def test03(self):
+        """An unreadable node of the page tree is skipped."""
+        with open(os.path.join(PageReportTest.path, 'doc07.pdf'), 'rb') as f:
+            data = f.read()
+        fd, filepath = tempfile.mkstemp(suffix='.pdf')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                # The node with the 2nd and 3rd pages
+                f.write(data.replace(b'13 0 obj', b'13 0 xbj'))
+            core = DocumentCore(filepath, lazy=True)
+            core.open()
+            try:
+                self.assertEqual([3], [objn for objn, _
+                                       in PageClosures(core).pages])
+                self.assertEqual(1, len(page_report(core).pages))
+            finally:
+                core.close()
+        finally:
+            os.remove(filepath)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
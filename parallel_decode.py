@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# parallel_decode.py - decode all the streams of a PDF file in a pool
+
+# Objects are parsed by the calling thread, in the order of the xref index,
+# and the stream data is handed over to the pool to be decoded. zlib releases
+# the GIL, so a thread pool is enough for FlateDecode streams; the predictors
+# and the other filters are pure python, a ProcessPoolExecutor will do better
+# for those.
+#
+# At most 'max_bytes' of encoded data are in the pool at any time: when the
+# budget is exhausted, parsing waits for some streams to be decoded (and
+# handed to the caller). A single stream larger than the budget is decoded
+# alone. An object that can't be parsed (it may have been a stream), or a
+# stream that can't be decoded, comes out with its error: the other streams
+# of the file are still decoded.
+#
+#     for ds in decode_streams(filepath):
+#         if ds.error is None:
+#             ...  # ds.data
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from document import DocumentCore
+from filters import FilterError, decode_stream
+from object_stream import EObject, filter_chain
+from token_stream import PdfParseError
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# class DecodedStream
+#-------------------------------------------------------------------------------
+
+class DecodedStream:
+    """The result of decoding one stream."""
+
+    def __init__(self, objn, gen, sd, data=None, rest=None, error=None):
+        self.objn = objn
+        self.gen = gen
+        self.sd = sd        # the stream dictionary, a PdfObject (or None)
+        self.data = data    # the decoded bytes
+        self.rest = rest    # names of the image filters that were not applied
+        self.error = error  # a FilterError or a PdfParseError, if the stream
+                            # couldn't be parsed or decoded
+
+    def __str__(self):
+        if self.error:
+            return f'{self.objn} {self.gen}: {self.error}'
+        return f'{self.objn} {self.gen}: {len(self.data)} bytes'
+
+#-------------------------------------------------------------------------------
+# decode_streams
+#-------------------------------------------------------------------------------
+
+# Default budget of encoded bytes being decoded at any time
+max_bytes = 64*1024*1024
+
+def _decode(data, chain):
+    # Runs in the pool, a module-level function so that it can be pickled
+    try:
+        data, rest = decode_stream(data, chain)
+        return data, rest, None
+    except FilterError as e:
+        return None, None, e
+
+def decode_streams(filepath, select=None, executor=None, max_bytes=max_bytes):
+    """Yield a DecodedStream for each stream of the file, as they're decoded.
+
+    If given, select(sd) is called with each stream dictionary, and streams
+    for which it returns False are skipped. The default executor is a thread
+    pool with one worker per CPU.
+    """
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+    core = DocumentCore(filepath)
+    core.open()
+
+    pending = {}  # future -> (objn, gen, stream dictionary, encoded size)
+    in_flight = 0
+
+    def done(futures):
+        nonlocal in_flight
+        for fut in futures:
+            objn, gen, sd, sz = pending.pop(fut)
+            in_flight -= sz
+            data, rest, error = fut.result()
+            yield DecodedStream(objn, gen, sd, data, rest, error)
+
+    try:
+        cur = core.cursor()
+        for objn, gen in core.object_numbers():
+            # Streams can't be stored in object streams
+            if core.xref.get_compressed(objn):
+                continue
+            # Don't cache the objects, the stream data would stay in memory
+            sd = None
+            try:
+                o = cur.get_object(objn, gen, cache=False)
+                if o is None or o.type != EObject.COUPLE:
+                    continue
+                sd, data = o.data[0], o.data[1].data
+                if select and not select(sd):
+                    continue
+                chain = filter_chain(sd, cur.deref)
+            except PdfParseError as e:
+                # One bad object mustn't stop the file
+                yield DecodedStream(objn, gen, sd, error=e)
+                continue
+
+            # Wait until there's room for this stream in the budget
+            while pending and in_flight + len(data) > max_bytes:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield from done(finished)
+
+            fut = executor.submit(_decode, data, chain)
+            pending[fut] = (objn, gen, sd, len(data))
+            in_flight += len(data)
+
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from done(finished)
+    finally:
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+        core.close()
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print(f'Usage: {sys.argv[0]} <filepath>')
+        exit(-1)
+    for ds in decode_streams(sys.argv[1]):
+        print(ds)
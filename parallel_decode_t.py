@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# parallel_decode_t.py
+
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from parallel_decode import decode_streams
+from token_stream import PdfParseError
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class ParallelDecodeTest(unittest.TestCase):
+    """Test decoding all the streams of a file in a pool."""
+
+    path = 't'
+
+    def test01(self):
+        """All the streams, in a thread pool."""
+        filepath = os.path.join(ParallelDecodeTest.path, 'doc01.pdf')
+        res = {ds.objn: ds for ds in decode_streams(filepath)}
+        self.assertEqual([6, 7], sorted(res))
+        for ds in res.values():
+            self.assertIsNone(ds.error)
+            self.assertTrue(ds.data.startswith(b'BT'))
+            self.assertTrue(ds.data.rstrip().endswith(b'ET'))
+
+    def test02(self):
+        """A budget smaller than any stream, and a selection."""
+        filepath = os.path.join(ParallelDecodeTest.path, 'doc02.pdf')
+        objns = sorted(ds.objn for ds in decode_streams(filepath, max_bytes=1))
+        self.assertEqual([6, 7, 11, 12], objns)
+
+        def is_objstm(sd):
+            typ = sd.data.get('Type')
+            return typ is not None and typ.data == b'ObjStm'
+
+        res = list(decode_streams(filepath, select=is_objstm))
+        self.assertEqual([11], [ds.objn for ds in res])
+        self.assertTrue(res[0].data.startswith(b'1 0 2 '))
+
+    def test03(self):
+        """A process pool."""
+        filepath = os.path.join(ParallelDecodeTest.path, 'doc01.pdf')
+        with ProcessPoolExecutor(max_workers=2) as ex:
+            threads = {ds.objn: ds.data for ds in decode_streams(filepath)}
+            procs = {ds.objn: ds.data
+                     for ds in decode_streams(filepath, executor=ex)}
+        self.assertEqual(threads, procs)
+
+    def test04(self):
+        """A stream that can't be parsed doesn't stop the others."""
+        with open(os.path.join(ParallelDecodeTest.path, 'doc01.pdf'),
+                  'rb') as f:
+            data = f.read()
+        fd, filepath = tempfile.mkstemp(suffix='.pdf')
+        try:
+            # Object 9, the /Length of object 6, is broken
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data.replace(b'9 0 obj\n49', b'9 0 obj\n}}'))
+            res = {ds.objn: ds for ds in decode_streams(filepath)}
+        finally:
+            os.remove(filepath)
+        # Object 9 itself may have been a stream
+        self.assertEqual([6, 7, 9], sorted(res))
+        self.assertIsNone(res[9].sd)
+        self.assertIsInstance(res[6].error, PdfParseError)
+        self.assertIsNone(res[6].data)
+        self.assertIsNone(res[7].error)
+        self.assertTrue(res[7].data.startswith(b'BT'))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
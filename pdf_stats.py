@@ -1,379 +1,669 @@
-#!/usr/bin/env python
-# pdf_stats.py - print out the pdf versions of every pdf file in a directory
-
-import os
-import re
-import sys
-from file_read_backwards import FileReadBackwards
-from object_stream import EObject, XrefSection, ObjectStream
-
-EOL = '(\r\n|\r|\n)'
-bEOL = b'(\r\n|\r|\n)'
-
-#-------------------------------------------------------------------------------
-# I want stdout to be unbuffered, always
-#-------------------------------------------------------------------------------
-
-# class Unbuffered(object):
-#     def __init__(self, stream):
-#         self.stream = stream
-#     def write(self, data):
-#         self.stream.write(data)
-#         self.stream.flush()
-#     def __getattr__(self, attr):
-#         return getattr(self.stream, attr)
-
-# import sys
-# sys.stdout = Unbuffered(sys.stdout)
-
-#-------------------------------------------------------------------------------
-# Printing LF and not CRLF on stdout on Windows 
-#-------------------------------------------------------------------------------
-
-import sys
-sys.stdout = open(sys.__stdout__.fileno(), 
-              mode=sys.__stdout__.mode, 
-              buffering=1, 
-              encoding=sys.__stdout__.encoding, 
-              errors=sys.__stdout__.errors, 
-              newline='\n', 
-              closefd=False)
-
-# Force utf-8 output
-sys.stdout.reconfigure(encoding='utf-8')
-                
-#-------------------------------------------------------------------------------
-# get_eol
-#-------------------------------------------------------------------------------
-
-def get_eol(filepath):
-    """Determine the type of line endings in this file."""
-    with open(filepath, 'rb') as f:
-        line = f.readline()
-    m = re.match(rb'%PDF-\d.\d\r\n', line)
-    if m:
-        return 'CRLF'
-    else:
-        m = re.match(rb'%PDF-\d.\d\r', line)
-        if m:
-            return 'CR'
-        else:
-            m = re.match(rb'%PDF-\d.\d\n', line)
-            if m:
-                return 'LF'
-    return ''
-
-#-------------------------------------------------------------------------------
-# get_version
-#-------------------------------------------------------------------------------
-
-def get_version(filepath):
-    """Extract the PDF Specification version number."""
-    with open(filepath, 'rb') as f:
-        line = f.readline()
-            
-        # Adding '$' at the end of the regexp causes it to fail for some
-        # files. It correctly matches files that use the Unix-style line
-        # ending 0a (\n, LF), but fails on files that use Mac-style 0d (\r,
-        # CR) or Windows-style 0d0a (\r\n, CRLF)
-
-        m = re.match(b'^%PDF-([0-9]).([0-9])' + bEOL, line)
-        if m:
-            return int(m.group(1)), int(m.group(2))
-        else:
-            return 0, 0
-
-#-------------------------------------------------------------------------------
-# count_updates
-#-------------------------------------------------------------------------------
-
-# FIXME too long !!!
-def count_updates(filepath):
-    """Count the number of EOF markers."""
-    cnt = 0
-    with open(filepath, 'rb') as f:
-        while True: 
-            line = f.readline()
-            if line == '':
-                return cnt
-            m = re.match(b'%%PDF' + bEOL, line)
-            if m:
-                cnt += 1
-
-#-------------------------------------------------------------------------------
-# get_trailer - read file from the end, extract trailer dict and xref offset
-#-------------------------------------------------------------------------------
-
-def get_trailer(filepath):
-    """Extract the trailer dictionary and xref offset."""
-    offset = -1
-    trailer = False
-    
-    with FileReadBackwards(filepath) as f:
-        # Last line
-        line = f.readline()
-        m = re.match('%%EOF' + EOL, line)
-        if not m:
-            print(f'"{filepath}" has no EOF marker')
-            return trailer, offset
-
-        # Byte offset of last cross-reference section
-        line = f.readline().rstrip()
-        offset = int(line)
-
-        # startxref
-        line = f.readline()
-        m = re.match('startxref' + EOL, line)
-        if not m:
-            print('syntax error: no startxref')
-
-        # end of trailer dictionary
-        line = f.readline()
-        m = re.search('>>' + EOL, line)
-        if m:
-            trailer = True
-
-        # FIXME I'm not actually getting the trailer dictionary here. I could
-        # (should ?) continue reading backwards until I find the 'trailer' and
-        # '<<'. But the trailer dict can old other dicts... can I parse this
-        # backwards ? I can't just look for the string 'trailer', it could be
-        # in the value of any dictionary key inside the trailer dictionary.
-            
-    return trailer, offset
-
-#-------------------------------------------------------------------------------
-# get_file_data - read file from the end, extract xref table, trailer
-#-------------------------------------------------------------------------------
-
-def get_file_data(filepath):
-    """Extract the xref table that is found from the file trailer."""
-    # This code does not support any context. It opens its own files, and
-    # doesn't need to worry about returning a proper state.
-    offset = -1
-    trailer = False
-
-    print(f'get_file_data: filepath={filepath}')
-
-    # "The line terminator is always b'\n' for binary files", so says the
-    # Python Std Library doc. It's really not a good idea to use readline()
-
-    with FileReadBackwards(filepath) as f:
-        # Last line
-        line = f.readline()
-        m = re.match('%%EOF' + EOL, line)
-        if not m:
-            print('syntax error: no EOF marker at the end of file')
-
-        # Byte offset of last cross-reference section
-        line = f.readline().rstrip()
-        offset = int(line)
-
-    # Here I use a different strategy than the one discussed in get_trailer()
-    # above: I use the offset information to jump to the beginning of the xref
-    # table, parse the entire xref table, and then look for a trailer... except
-    # that sometimes I don't find one :-(
-    
-    with open(filepath, 'rb') as f:
-        ob = ObjectStream(filepath, f)
-
-        # PDF Spec, § 7.5.8 Cross-Reference Streams, page 49:
-        
-        # Beginning with PDF 1.5, cross-reference information may be stored in
-        # a cross-reference stream instead of in a cross-reference table.
-        # Cross-reference streams are stream objects (see 7.3.8, "Stream
-        # Objects"), and contain a dictionary and a data stream.
-        
-        # The value following the startxref keyword shall be the offset of the
-        # cross-reference stream rather than the xref keyword.
-
-        ob.seek(offset)
-        o = ob.get_cross_reference()
-        if o.type == EObject.XREF_SECTION:
-            print('traditional')
-            xref_sec = o.data
-        elif o.type == EObject.IND_OBJ_DEF:
-            # o.data is a dictionary {'obj': xxx, 'objn': n, 'gen': m}
-            print('modern')
-            o = o.data['obj']  # COUPLE
-
-            # The values of all entries [in the stream dictionary] shall be
-            # direct objects; indirect references shall not be permitted. For
-            # arrays (the Index and W entries), all of their elements shall be
-            # direct objects as well. If the stream is encoded, the Filter and
-            # DecodeParms entries in Table 5 shall also be direct objects.
-
-            # Stream dictionary: all entries are direct objects
-            print(o.data[0].show())
-            d = o.data[0].data
-
-            # Size is required
-            sz = d['Size'].data
-
-            # Index is optional, defaults to [0, sz]
-            # FIXME there could be several subsections ?
-            if 'Index' in d:
-                arr = d['Index'].data
-                if len(arr) > 2:
-                    print('FIXME: more than one cross-reference table subsection')
-                first_objn = arr[0]
-                entry_cnt = arr[1]
-            else:
-                first_objn = 0
-                entry_cnt = sz
-
-            # Decoding parameters
-            columns = None
-            predictor = None
-            if 'DecodeParms' in d:
-                print("Decode params present:")
-                dp = d['DecodeParms'].data
-                if 'Columns' in dp:
-                    columns = dp['Columns'].data
-                if 'Predictor' in dp:
-                    predictor = dp['Predictor'].data
-            print(f'    columns={columns}\n    predictor={predictor}')
-                    
-            # W key holds an array of PdfObject INTEGER elements
-            w = [x.data for x in d['W'].data]
-            
-            # Show decoded stream
-            s = o.data[1].data
-            print(f'Compressed data stream length = {len(s)}'
-                  + f", /Length={d['Length'].data}")
-            p, x = ob.deflate_stream(s, columns, predictor, w)
-            if p:
-                xref_sec = XrefSection()
-                arr = x
-                # This a cross-reference sub-section
-                subs = XrefSubSection(first_objn, entry_cnt)
-                for t in arr:
-                    # FIXME there are type 2 entries
-                    subs.entries.append(t)
-                # FIXME more than one subsection ?
-                xref_sec.sub_sections.append(subs)
-                return 1, False
-            else:
-                zd = x
-                print(f'Uncompressed data stream length = {len(zd)}')
-                # print(zd)
-            return 0, False
-
-        # # Print out the cross reference table
-        print(o.show())
-        # print(xref_sec)
-        
-        # What comes after the cross reference section ?
-        trailer_follows = False
-        o = ob.next_object()
-        if o.type == EObject.TRAILER:
-            # Trailer immediately follows xref
-            print(o.show())
-            trailer_follows = True
-
-            # Now get the trailer dictionary
-            o = o.data
-            if o.type != EObject.DICTIONARY:
-                print("Error: trailer doesn't have a dictionary")
-                return (len(xref_sec.sub_sections), trailer_follows)
-
-            # # Need to read the Prev key first, otherwise we don't have all the
-            # # cross-references
-            # prev = o.data['Prev']
-            # if prev.type != EObject.IND_OBJ_REF:
-            #     print('Syntax error, /Prev key should be an indirect reference')
-            #     return (len(xref_section), trailer_follows)
-            # prev_objn = prev.data['objn']
-            # prev_gen = prev.data['gen']
-
-            # The Root key holds the catalog dictionary for the PDF
-            # document. It's a required key, and it's an indirect reference.
-            root = ob.deref_object(o.data['Root'])
-
-            if root:
-                # d is a python dictionary, but the items are PdfObjects
-                d = root.data
-                print(f"Catalog dictionary: {filepath.split(';')[0]}")
-                for k, v in d.items():
-                    print(f'    {k}: {v.show()}')
-            else:
-                print(f'Root is an indirect reference, not found in xref table')
-
-            # The Info key, if present, holds the information dictionary.
-            if 'Info' in o.data:
-                info = ob.deref_object(o.data['Info'])
-
-                if info:
-                    # d is a python dictionary, but the items are PdfObjects
-                    d = info.data
-                    print(f"Information dictionary: {filepath.split(';')[0]}")
-                    for k, v in d.items():
-                        print(f'    {k}: {v.show()}')
-
-        return len(xref_sec.sub_sections), trailer_follows
-        
-#-------------------------------------------------------------------------------
-# stats_file_to_csv
-#-------------------------------------------------------------------------------
-
-def stats_file_to_csv(filepath):
-    # Get the filename
-    filename = os.path.basename(filepath)
-    
-    # Get the file size
-    statinfo = os.stat(filepath)
-    sz = statinfo.st_size
-
-    # Get other info
-    eol = get_eol(filepath)
-    major, minor = get_version(filepath)
-    trailer, offset = get_trailer(filepath)
-    # eofs = count_updates(filepath)
-    nsubs, tfollows = get_file_data(filepath)
-
-    # # Print out one .csv line
-    # s = (f'{filename};{major}.{minor};{eol:4}'
-    #          + f';{"true" if trailer else "false"};{offset:8};{sz}')
-    # print(s, end='')
-    # if(nsubs == 0):
-    #     s = ';ignored;ignored'
-    # else:
-    #     s = f';{nsubs};{"true" if tfollows else "false"}'
-    # print(s)
-            
-        
-#-------------------------------------------------------------------------------
-# stats_dir_to_csv
-#-------------------------------------------------------------------------------
-
-def stats_dir_to_csv(path):
-    print('Filename;Version;EOL;Trailer;Offset;FileSize;#SubSections;TFollows')
-    for f in os.listdir(path):
-        if f.endswith('.pdf'):
-            filepath = os.path.join(path, f)
-            stats_file_to_csv(filepath)
-
-
-#-------------------------------------------------------------------------------
-# main
-#-------------------------------------------------------------------------------
-            
-if __name__ == '__main__':
-    # Check cmd line arguments
-    if len(sys.argv) == 2:
-        filepath = sys.argv[1]
-        stats_file_to_csv(filepath)
-    else:
-        # My pdf file repository
-        stats_dir_to_csv(r'C:\u\pdf')
-
-        # # Print catalog dictionaries
-        # with open('pdfs_simple.csv', 'r') as f:
-        #     first = True
-        #     for line in f:
-        #         if first:
-        #             first = False
-        #             continue
-        #         filename = line.split(';')[0]
-        #         print(filename)
-        #         filepath = os.path.join(r'C:\u\pdf', filename)
-        #         stats_file_to_csv(filepath)
+#!/usr/bin/env python
+# pdf_stats.py - print out the pdf versions of every pdf file in a directory
+
+import math
+import mmap
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from byte_source import MmapSource, SourceFile, open_source
+from object_stream import EObject, XrefSection, XrefSubSection, ObjectStream
+from scheduler import SizeScheduler
+
+EOL = '(\r\n|\r|\n)'
+bEOL = b'(\r\n|\r|\n)'
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+# class Unbuffered(object):
+#     def __init__(self, stream):
+#         self.stream = stream
+#     def write(self, data):
+#         self.stream.write(data)
+#         self.stream.flush()
+#     def __getattr__(self, attr):
+#         return getattr(self.stream, attr)
+
+# import sys
+# sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# Printing LF and not CRLF on stdout on Windows 
+#-------------------------------------------------------------------------------
+
+import sys
+sys.stdout = open(sys.__stdout__.fileno(), 
+              mode=sys.__stdout__.mode, 
+              buffering=1, 
+              encoding=sys.__stdout__.encoding, 
+              errors=sys.__stdout__.errors, 
+              newline='\n', 
+              closefd=False)
+
+# Force utf-8 output
+sys.stdout.reconfigure(encoding='utf-8')
+                
+#-------------------------------------------------------------------------------
+# get_eol
+#-------------------------------------------------------------------------------
+
+def get_eol(filepath):
+    """Determine the type of line endings in this file."""
+    with open(filepath, 'rb') as f:
+        line = f.readline()
+    return header_eol(line)
+
+def header_eol(line):
+    """Return the line ending of the header line of a file."""
+    m = re.match(rb'%PDF-\d.\d\r\n', line)
+    if m:
+        return 'CRLF'
+    else:
+        m = re.match(rb'%PDF-\d.\d\r', line)
+        if m:
+            return 'CR'
+        else:
+            m = re.match(rb'%PDF-\d.\d\n', line)
+            if m:
+                return 'LF'
+    return ''
+
+#-------------------------------------------------------------------------------
+# get_version
+#-------------------------------------------------------------------------------
+
+def get_version(filepath):
+    """Extract the PDF Specification version number."""
+    with open(filepath, 'rb') as f:
+        line = f.readline()
+    return header_version(line)
+
+def header_version(line):
+    """Return (major, minor) from the header line of a file, (0, 0) if it
+    isn't a PDF header."""
+    # Adding '$' at the end of the regexp causes it to fail for some
+    # files. It correctly matches files that use the Unix-style line
+    # ending 0a (\n, LF), but fails on files that use Mac-style 0d (\r,
+    # CR) or Windows-style 0d0a (\r\n, CRLF)
+
+    m = re.match(b'^%PDF-([0-9]).([0-9])' + bEOL, line)
+    if m:
+        return int(m.group(1)), int(m.group(2))
+    else:
+        return 0, 0
+
+#-------------------------------------------------------------------------------
+# find_markers
+#-------------------------------------------------------------------------------
+
+def _find_all(mm, marker):
+    """Offsets of 'marker' in mm, where it starts a line."""
+    offsets = []
+    k = mm.find(marker)
+    while k != -1:
+        # Skip occurrences in the middle of a line, e.g. in stream data
+        if k == 0 or mm[k - 1] in b'\r\n':
+            offsets.append(k)
+        k = mm.find(marker, k + len(marker))
+    return offsets
+
+def find_markers(filepath):
+    """Return the byte offsets of every '%%EOF' and 'startxref' keyword."""
+    if os.path.getsize(filepath) == 0:
+        # An empty file can't be mapped
+        return [], []
+    with open(filepath, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, 'madvise'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            return markers(mm)
+
+def markers(mm):
+    """Return the offsets of every '%%EOF' and 'startxref' keyword in mm."""
+    # mmap.find() scans the mapped file in C, no copy is made
+    return _find_all(mm, b'%%EOF'), _find_all(mm, b'startxref')
+
+#-------------------------------------------------------------------------------
+# count_updates
+#-------------------------------------------------------------------------------
+
+def count_updates(filepath):
+    """Count the number of EOF markers."""
+    eofs, _ = find_markers(filepath)
+    return len(eofs)
+
+#-------------------------------------------------------------------------------
+# get_trailer - read file from the end, extract trailer dict and xref offset
+#-------------------------------------------------------------------------------
+
+def get_trailer(filepath, log=print, f=None):
+    """Extract the trailer dictionary and xref offset.
+
+    f is the file already open, or None to open it.
+    """
+    if f is None:
+        with open_source(filepath) as f:
+            return get_trailer(filepath, log, f)
+    # One binary read of the end of the file, see ObjectStream.get_tail()
+    ob = ObjectStream(filepath, f)
+    trailer, offset = ob.get_tail()
+    if offset == -1:
+        log(f'"{filepath}" has no startxref')
+    return trailer, offset
+
+#-------------------------------------------------------------------------------
+# get_file_data - read file from the end, extract xref table, trailer
+#-------------------------------------------------------------------------------
+
+def get_file_data(filepath, log=print, offset=None, f=None):
+    """Extract the xref table that is found from the file trailer.
+
+    What is found along the way is passed to log(), print() by default.
+    offset is the one get_trailer() returned, if it was already called, and
+    f the file already open (or None to open it).
+    """
+    if f is None:
+        # deref_object() jumps around the file: read it through a block cache
+        with open_source(filepath) as f:
+            return get_file_data(filepath, log, offset, f)
+
+    log(f'get_file_data: filepath={filepath}')
+
+    # Byte offset of last cross-reference section
+    if offset is None:
+        _, offset = get_trailer(filepath, log, f)
+    if offset == -1:
+        return 0, False
+
+    # I use the offset information to jump to the beginning of the xref
+    # table, parse the entire xref table, and then look for a trailer... except
+    # that sometimes I don't find one :-(
+    
+    ob = ObjectStream(filepath, f)
+
+    # PDF Spec, § 7.5.8 Cross-Reference Streams, page 49:
+    
+    # Beginning with PDF 1.5, cross-reference information may be stored in
+    # a cross-reference stream instead of in a cross-reference table.
+    # Cross-reference streams are stream objects (see 7.3.8, "Stream
+    # Objects"), and contain a dictionary and a data stream.
+    
+    # The value following the startxref keyword shall be the offset of the
+    # cross-reference stream rather than the xref keyword.
+
+    ob.seek(offset)
+    o = ob.get_cross_reference()
+    if o.type == EObject.XREF_SECTION:
+        log('traditional')
+        xref_sec = o.data
+    elif o.type == EObject.IND_OBJ_DEF:
+        # o.data is a dictionary {'obj': xxx, 'objn': n, 'gen': m}
+        log('modern')
+        o = o.data['obj']  # COUPLE
+
+        # The values of all entries [in the stream dictionary] shall be
+        # direct objects; indirect references shall not be permitted. For
+        # arrays (the Index and W entries), all of their elements shall be
+        # direct objects as well. If the stream is encoded, the Filter and
+        # DecodeParms entries in Table 5 shall also be direct objects.
+
+        # Stream dictionary: all entries are direct objects
+        log(o.data[0].show())
+        d = o.data[0].data
+
+        # Size is required
+        sz = d['Size'].data
+
+        # Index is optional, defaults to [0, sz]
+        # FIXME there could be several subsections ?
+        if 'Index' in d:
+            arr = d['Index'].data
+            if len(arr) > 2:
+                log('FIXME: more than one cross-reference table subsection')
+            first_objn = arr[0]
+            entry_cnt = arr[1]
+        else:
+            first_objn = 0
+            entry_cnt = sz
+
+        # Decoding parameters
+        columns = None
+        predictor = None
+        if 'DecodeParms' in d:
+            log("Decode params present:")
+            dp = d['DecodeParms'].data
+            if 'Columns' in dp:
+                columns = dp['Columns'].data
+            if 'Predictor' in dp:
+                predictor = dp['Predictor'].data
+        log(f'    columns={columns}\n    predictor={predictor}')
+                
+        # W key holds an array of PdfObject INTEGER elements
+        w = [x.data for x in d['W'].data]
+        
+        # Show decoded stream
+        s = o.data[1].data
+        log(f'Compressed data stream length = {len(s)}'
+            + f", /Length={d['Length'].data}")
+        p, x = ob.deflate_stream(s, columns, predictor, w)
+        if p:
+            xref_sec = XrefSection()
+            arr = x
+            # This a cross-reference sub-section
+            subs = XrefSubSection(first_objn, entry_cnt)
+            for t in arr:
+                # FIXME there are type 2 entries
+                subs.entries.append(t)
+            # FIXME more than one subsection ?
+            xref_sec.sub_sections.append(subs)
+            return 1, False
+        else:
+            zd = x
+            log(f'Uncompressed data stream length = {len(zd)}')
+            # print(zd)
+        return 0, False
+
+    # # Print out the cross reference table
+    log(o.show())
+    # print(xref_sec)
+    
+    # What comes after the cross reference section ?
+    trailer_follows = False
+    o = ob.next_object()
+    if o.type == EObject.TRAILER:
+        # Trailer immediately follows xref
+        log(o.show())
+        trailer_follows = True
+
+        # Now get the trailer dictionary
+        o = o.data
+        if o.type != EObject.DICTIONARY:
+            log("Error: trailer doesn't have a dictionary")
+            return (len(xref_sec.sub_sections), trailer_follows)
+
+        # # Need to read the Prev key first, otherwise we don't have all the
+        # # cross-references
+        # prev = o.data['Prev']
+        # if prev.type != EObject.IND_OBJ_REF:
+        #     print('Syntax error, /Prev key should be an indirect reference')
+        #     return (len(xref_section), trailer_follows)
+        # prev_objn = prev.data['objn']
+        # prev_gen = prev.data['gen']
+
+        # The Root key holds the catalog dictionary for the PDF
+        # document. It's a required key, and it's an indirect reference.
+        root = ob.deref_object(o.data['Root'])
+
+        if root:
+            # d is a python dictionary, but the items are PdfObjects
+            d = root.data
+            log(f"Catalog dictionary: {filepath.split(';')[0]}")
+            for k, v in d.items():
+                log(f'    {k}: {v.show()}')
+        else:
+            log(f'Root is an indirect reference, not found in xref table')
+
+        # The Info key, if present, holds the information dictionary.
+        if 'Info' in o.data:
+            info = ob.deref_object(o.data['Info'])
+
+            if info:
+                # d is a python dictionary, but the items are PdfObjects
+                d = info.data
+                log(f"Information dictionary: {filepath.split(';')[0]}")
+                for k, v in d.items():
+                    log(f'    {k}: {v.show()}')
+
+    return len(xref_sec.sub_sections), trailer_follows
+        
+#-------------------------------------------------------------------------------
+# get_xref_style
+#-------------------------------------------------------------------------------
+
+def get_xref_style(filepath, offset):
+    """Return 'table' if startxref points to an xref table, 'stream' if it
+    points to a cross-reference stream, '' otherwise."""
+    if offset < 0:
+        return ''
+    with open(filepath, 'rb') as f:
+        f.seek(offset)
+        return xref_style(f.read(32))
+
+def xref_style(data):
+    """Return the xref style of the bytes at the startxref offset."""
+    data = data.lstrip(b'\x00\t\n\x0c\r ')
+    if data.startswith(b'xref'):
+        return 'table'
+    if re.match(rb'\d+\s+\d+\s+obj', data):
+        return 'stream'
+    return ''
+
+#-------------------------------------------------------------------------------
+# file_stats
+#-------------------------------------------------------------------------------
+
+def file_stats(filepath, log=print):
+    """Return the statistics of a file, a dict of the .csv columns.
+
+    The file is mapped once, and all the statistics are read from the mapping.
+    """
+    with open(filepath, 'rb') as f:
+        sz = os.fstat(f.fileno()).st_size
+        # An empty file can't be mapped
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if sz else b''
+    try:
+        # The header line, as readline() would return it
+        k = mm.find(b'\n', 0, 1024)
+        line = mm[:k + 1 if k != -1 else 1024]
+        eol = header_eol(line)
+        major, minor = header_version(line)
+        mf = SourceFile(MmapSource(mm))
+        trailer, offset = get_trailer(filepath, log, mf)
+        eofs, startxrefs = markers(mm)
+        nsubs, tfollows = get_file_data(filepath, log, offset, mf)
+        style = xref_style(mm[offset:offset + 32]) if offset >= 0 else ''
+    finally:
+        if sz:
+            mm.close()
+    return {
+        'filename': os.path.basename(filepath),
+        'version': f'{major}.{minor}',
+        'eol': eol,
+        'xref': style,
+        'trailer': trailer is not None,
+        'offset': offset,
+        'size': sz,
+        'subsections': nsubs,
+        'tfollows': tfollows,
+        'updates': len(eofs),
+        'eof_offsets': eofs,
+        'startxref_offsets': startxrefs,
+    }
+
+#-------------------------------------------------------------------------------
+# class FileRecord
+#-------------------------------------------------------------------------------
+
+csv_header = ('Filename;Version;EOL;Trailer;Offset;FileSize;#SubSections'
+              + ';TFollows;#Updates;EOFOffsets;StartxrefOffsets')
+
+class FileRecord:
+    """The statistics of one file, see file_stats()."""
+
+    def __init__(self, filename, size=0):
+        self.filename = filename
+        self.size = size
+        self.version = ''        # '1.7', '0.0' if there's no header
+        self.eol = ''            # of the header: 'CRLF', 'CR', 'LF' or ''
+        self.xref = ''           # 'table', 'stream', or '' if not found
+        self.trailer = False
+        self.offset = -1         # of the last xref section
+        self.subsections = 0
+        self.tfollows = False
+        self.updates = 0         # number of %%EOF markers
+        self.eof_offsets = []
+        self.startxref_offsets = []
+        self.error = None        # str, if the file couldn't be processed
+
+    def csv(self):
+        """Return the .csv line of the record, see csv_header."""
+        if self.error:
+            # As many columns as the other lines
+            error = self.error.replace(';', ',').replace('\n', ' ')
+            return (f'{self.filename};error;{error}'
+                    + ';'*(csv_header.count(';') - 2))
+        s = (f'{self.filename};{self.version};{self.eol:4}'
+             + f';{"true" if self.trailer else "false"};{self.offset:8}'
+             + f';{self.size}')
+        if self.subsections == 0:
+            s += ';ignored;ignored'
+        else:
+            s += f';{self.subsections};{"true" if self.tfollows else "false"}'
+        return (s + f';{self.updates}'
+                + f';{" ".join(str(k) for k in self.eof_offsets)}'
+                + f';{" ".join(str(k) for k in self.startxref_offsets)}')
+
+def _quiet(*args, **kwargs):
+    pass
+
+def file_record(filepath):
+    """Return the FileRecord of a file, with its error set if it couldn't be
+    processed."""
+    try:
+        st = file_stats(filepath, log=_quiet)
+    except Exception as e:
+        # One bad file mustn't stop the batch
+        try:
+            size = os.path.getsize(filepath)
+        except OSError:
+            size = 0
+        rec = FileRecord(os.path.basename(filepath), size)
+        rec.error = f'{type(e).__name__}: {e}'
+        return rec
+    rec = FileRecord(st['filename'], st['size'])
+    for key, v in st.items():
+        setattr(rec, key, v)
+    return rec
+
+#-------------------------------------------------------------------------------
+# class QuantileSketch
+#-------------------------------------------------------------------------------
+
+class QuantileSketch:
+    """Approximate quantiles of non-negative values, in constant space.
+
+    A value x > 0 is counted in the bucket k such that gamma**(k-1) < x <=
+    gamma**k, with gamma = (1 + alpha)/(1 - alpha): the quantiles come out
+    within a relative error of alpha, and sizes from 1 byte to 1 TB fit in
+    about 1400 buckets with alpha = 1%. Two sketches with the same alpha are
+    merged by adding their buckets.
+    """
+
+    def __init__(self, alpha=0.01):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = Counter()
+        self.zeros = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def add(self, x):
+        if x <= 0:
+            self.zeros += 1
+        else:
+            self.buckets[math.ceil(math.log(x) / self.log_gamma)] += 1
+        self.count += 1
+        self.min = x if self.min is None else min(self.min, x)
+        self.max = x if self.max is None else max(self.max, x)
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            raise ValueError('cannot merge sketches of different accuracies')
+        self.buckets.update(other.buckets)
+        self.zeros += other.zeros
+        self.count += other.count
+        for x in (other.min, other.max):
+            if x is not None:
+                self.min = x if self.min is None else min(self.min, x)
+                self.max = x if self.max is None else max(self.max, x)
+
+    def quantile(self, q):
+        """Return the q (0 to 1) quantile, None if the sketch is empty."""
+        if not self.count:
+            return None
+        rank = q*(self.count - 1)
+        if rank < self.zeros:
+            return self.min
+        cnt = self.zeros
+        for k in sorted(self.buckets):
+            cnt += self.buckets[k]
+            if cnt > rank:
+                x = 2*self.gamma**k / (self.gamma + 1)
+                return min(max(x, self.min), self.max)
+        return self.max
+
+#-------------------------------------------------------------------------------
+# class CorpusAggregate
+#-------------------------------------------------------------------------------
+
+class CorpusAggregate:
+    """The statistics of many files, folded record by record."""
+
+    def __init__(self):
+        self.files = 0
+        self.errors = 0
+        self.bytes = 0
+        self.versions = Counter()
+        self.eol = Counter()
+        self.xref = Counter()
+        self.updates = Counter()  # number of %%EOF -> number of files
+        self.trailers = 0         # files with a trailer dictionary
+        self.sizes = QuantileSketch()
+
+    def add(self, rec):
+        """Fold in a FileRecord."""
+        self.files += 1
+        self.bytes += rec.size
+        self.sizes.add(rec.size)
+        if rec.error:
+            self.errors += 1
+            return
+        self.versions[rec.version] += 1
+        self.eol[rec.eol] += 1
+        self.xref[rec.xref] += 1
+        self.updates[rec.updates] += 1
+        self.trailers += rec.trailer
+
+    def merge(self, other):
+        """Fold in another CorpusAggregate, e.g. computed by a worker."""
+        self.files += other.files
+        self.errors += other.errors
+        self.bytes += other.bytes
+        self.versions.update(other.versions)
+        self.eol.update(other.eol)
+        self.xref.update(other.xref)
+        self.updates.update(other.updates)
+        self.trailers += other.trailers
+        self.sizes.merge(other.sizes)
+
+    def summary(self):
+        """Return the statistics, a dict."""
+        return {
+            'files': self.files,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'versions': dict(sorted(self.versions.items())),
+            'eol': dict(sorted(self.eol.items())),
+            'xref': dict(sorted(self.xref.items())),
+            'updates': dict(sorted(self.updates.items())),
+            'trailers': self.trailers,
+            'size': {'min': self.sizes.min,
+                     'p50': self.sizes.quantile(0.5),
+                     'p90': self.sizes.quantile(0.9),
+                     'p99': self.sizes.quantile(0.99),
+                     'max': self.sizes.max},
+        }
+
+    def __str__(self):
+        lines = []
+        for key, v in self.summary().items():
+            if isinstance(v, dict):
+                # '' for no EOL or no xref, and rounded quantiles
+                v = ', '.join(f'{"none" if k == "" else k}:'
+                              f' {round(x) if isinstance(x, float) else x}'
+                              for k, x in v.items())
+            lines.append(f'{key:9}: {v}')
+        return '\n'.join(lines)
+
+#-------------------------------------------------------------------------------
+# stats_files
+#-------------------------------------------------------------------------------
+
+def stats_files(filepaths, agg, executor=None, workers=None):
+    """Yield the FileRecord of each file as it is done, and fold them into
+    agg, a CorpusAggregate.
+
+    The files are run by a SizeScheduler, largest first, in executor (a
+    process pool of workers by default, the parsing is CPU bound), so that
+    the batch doesn't end with one worker busy with the largest file.
+    """
+    workers = workers or os.cpu_count()
+    ex = executor or ProcessPoolExecutor(max_workers=workers)
+    try:
+        sched = SizeScheduler(file_record, workers=workers, executor=ex)
+        for filepath, rec, error in sched.run(list(filepaths)):
+            if error:
+                # file_record() doesn't raise, but the pool may
+                rec = FileRecord(os.path.basename(filepath))
+                rec.error = error
+            agg.add(rec)
+            yield rec
+    finally:
+        if executor is None:
+            ex.shutdown()
+
+#-------------------------------------------------------------------------------
+# stats_file_to_csv
+#-------------------------------------------------------------------------------
+
+def stats_file_to_csv(filepath):
+    st = file_stats(filepath)
+    rec = FileRecord(st['filename'], st['size'])
+    for key, v in st.items():
+        setattr(rec, key, v)
+
+    # Print out one .csv line
+    print(rec.csv())
+    return rec
+
+#-------------------------------------------------------------------------------
+# stats_dir_to_csv
+#-------------------------------------------------------------------------------
+
+def stats_dir_to_csv(path, executor=None):
+    """Print the .csv line of each file of a directory, then the summary of
+    the directory, and return its CorpusAggregate."""
+    print(csv_header)
+    filepaths = [os.path.join(path, f) for f in sorted(os.listdir(path))
+                 if f.endswith('.pdf')]
+    agg = CorpusAggregate()
+    for rec in stats_files(filepaths, agg, executor):
+        print(rec.csv())
+    print()
+    print(agg)
+    return agg
+
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+            
+if __name__ == '__main__':
+    # Check cmd line arguments
+    if len(sys.argv) != 2:
+        print(f'Usage: {sys.argv[0]} <filepath or directory>')
+        print('See corpus_watch.py to keep the statistics of a directory'
+              ' up to date')
+        exit(-1)
+    if os.path.isdir(sys.argv[1]):
+        stats_dir_to_csv(sys.argv[1])
+    else:
+        stats_file_to_csv(sys.argv[1])
+
+    # # Print catalog dictionaries
+    # with open('pdfs_simple.csv', 'r') as f:
+    #     first = True
+    #     for line in f:
+    #         if first:
+    #             first = False
+    #             continue
+    #         filename = line.split(';')[0]
+    #         print(filename)
+    #         filepath = os.path.join(r'C:\u\pdf', filename)
+    #         stats_file_to_csv(filepath)
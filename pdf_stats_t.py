@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# pdf_stats_t.py
+
+import os
+import random
+import tempfile
+import unittest
+from pdf_stats import (CorpusAggregate, QuantileSketch, csv_header,
+                       file_record, file_stats, find_markers, get_eol,
+                       get_file_data, get_trailer, get_version, get_xref_style,
+                       stats_files)
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class PdfStatsTest(unittest.TestCase):
+    """Test the per-file records and their aggregates."""
+
+    path = 't'
+
+    def filepaths(self):
+        return sorted(os.path.join(PdfStatsTest.path, name)
+                      for name in os.listdir(PdfStatsTest.path)
+                      if name.endswith('.pdf'))
+
+    def test01(self):
+        """Quantiles within the relative error, with and without merging."""
+        rnd = random.Random(0)
+        values = [int(rnd.lognormvariate(10, 2)) for _ in range(20000)]
+        whole = QuantileSketch()
+        parts = [QuantileSketch() for _ in range(4)]
+        for i, x in enumerate(values):
+            whole.add(x)
+            parts[i % 4].add(x)
+        merged = QuantileSketch()
+        for p in parts:
+            merged.merge(p)
+
+        values.sort()
+        for q in (0.0, 0.1, 0.5, 0.9, 0.99, 1.0):
+            exact = values[int(q*(len(values) - 1))]
+            for sk in (whole, merged):
+                self.assertLessEqual(abs(sk.quantile(q) - exact),
+                                     0.01*exact + 1e-9)
+        self.assertEqual(whole.buckets, merged.buckets)
+        self.assertEqual((values[0], values[-1]), (merged.min, merged.max))
+        self.assertTrue(len(whole.buckets) < 2000)
+
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+        with self.assertRaises(ValueError):
+            whole.merge(QuantileSketch(alpha=0.05))
+
+    def test02(self):
+        """Records of the test files."""
+        rec = file_record(os.path.join(PdfStatsTest.path, 'doc03.pdf'))
+        self.assertIsNone(rec.error)
+        self.assertEqual(('1.4', 'LF', 'table', 3),
+                         (rec.version, rec.eol, rec.xref, rec.updates))
+        self.assertTrue(rec.csv().startswith('doc03.pdf;1.4;LF  ;true;'))
+
+        rec = file_record(os.path.join(PdfStatsTest.path, 'doc02.pdf'))
+        self.assertEqual('stream', rec.xref)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            bad = os.path.join(tmp, 'bad.pdf')
+            with open(bad, 'wb') as f:
+                f.write(b'%PDF-1.4\nstartxref\n5\n%%EOF\n')
+            self.assertEqual('', get_xref_style(bad, 5))
+            rec = file_record(bad)
+            self.assertIsNotNone(rec.error)
+            self.assertEqual(os.path.getsize(bad), rec.size)
+            self.assertTrue(rec.csv().startswith(f'bad.pdf;error;'))
+            self.assertEqual(len(csv_header.split(';')),
+                             len(rec.csv().split(';')))
+
+            # Nothing to map
+            empty = os.path.join(tmp, 'empty.pdf')
+            open(empty, 'wb').close()
+            st = file_stats(empty, log=lambda *args: None)
+            self.assertEqual(('0.0', '', '', -1, []),
+                             (st['version'], st['eol'], st['xref'],
+                              st['offset'], st['eof_offsets']))
+
+    def test03(self):
+        """Records folded as the files are done, largest first."""
+        filepaths = self.filepaths()
+        agg = CorpusAggregate()
+        records = list(stats_files(filepaths, agg, workers=2))
+        self.assertEqual(sorted(os.path.basename(fp) for fp in filepaths),
+                         sorted(rec.filename for rec in records))
+
+        whole = CorpusAggregate()
+        for rec in records:
+            whole.add(rec)
+        self.assertEqual(whole.summary(), agg.summary())
+
+        summary = agg.summary()
+        self.assertEqual(len(filepaths), summary['files'])
+        self.assertEqual(0, summary['errors'])
+        self.assertEqual(sum(map(os.path.getsize, filepaths)),
+                         summary['bytes'])
+        self.assertEqual(1, summary['versions']['1.5'])
+        self.assertEqual(1, summary['xref']['stream'])
+        self.assertEqual(1, summary['updates'][3])
+        self.assertEqual(min(map(os.path.getsize, filepaths)),
+                         summary['size']['min'])
+        self.assertIn('versions :', str(agg))
+
+    def test04(self):
+        """One mapping of the file, the same statistics as reading it."""
+        quiet = lambda *args: None
+        for filepath in self.filepaths():
+            st = file_stats(filepath, log=quiet)
+            _, offset = get_trailer(filepath, quiet)
+            major, minor = get_version(filepath)
+            self.assertEqual(
+                (f'{major}.{minor}', get_eol(filepath), offset,
+                 get_xref_style(filepath, offset), find_markers(filepath),
+                 get_file_data(filepath, quiet)),
+                (st['version'], st['eol'], st['offset'], st['xref'],
+                 (st['eof_offsets'], st['startxref_offsets']),
+                 (st['subsections'], st['tfollows'])))
+            self.assertEqual(len(csv_header.split(';')),
+                             len(file_record(filepath).csv().split(';')))
+
+if __name__ == '__main__':
+    unittest.main()
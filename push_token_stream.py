@@ -0,0 +1,455 @@
+#!/usr/bin/env python
+# push_token_stream.py - parse PDF spec tokens from bytes pushed in chunks
+
+# TokenStream pulls its bytes from a seekable file, and seeks back whenever it
+# has looked too far ahead. PushTokenStream is driven the other way around:
+# the caller pushes arbitrary chunks of bytes with feed() (as they arrive from
+# a socket, or out of a decompressor), and gets back every token that is
+# complete so far. A token that straddles two chunks is carried over
+# internally until the rest of it arrives, so there is never any seeking.
+
+import re
+import sys
+from token_stream import EToken, Token, TokenStream
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# Character classes, taken from TokenStream
+#-------------------------------------------------------------------------------
+
+wspace = TokenStream.wspace
+delims = TokenStream.delims
+hex_digit = TokenStream.hex_digit
+
+# A run of regular characters: neither whitespace, nor delimiter, nor eol
+regular_run = re.compile(b'[^' + re.escape(wspace + delims + b'\r\n')
+                         + b']+')
+eol = re.compile(rb'[\r\n]')
+version = re.compile(rb'%PDF-(\d).(\d)')
+
+# Keywords, cf. TokenStream.get_regular_run()
+keywords = {
+    b'true': EToken.TRUE,
+    b'false': EToken.FALSE,
+    b'null': EToken.NULL,
+    b'obj': EToken.OBJECT_BEGIN,
+    b'endobj': EToken.OBJECT_END,
+    b'stream': EToken.STREAM_BEGIN,
+    b'endstream': EToken.STREAM_END,
+    b'R': EToken.OBJ_REF,
+    b'xref': EToken.XREF_SECTION,
+    b'trailer': EToken.TRAILER,
+    b'startxref': EToken.STARTXREF,
+}
+
+# Escape sequences in literal strings, PDF spec § 7.3.4.2, table 3
+escapes = {
+    ord('n'): ord('\n'),
+    ord('r'): ord('\r'),
+    ord('t'): ord('\t'),
+    ord('b'): ord('\b'),
+    ord('f'): ord('\f'),
+    ord('('): ord('('),
+    ord(')'): ord(')'),
+    ord('\\'): ord('\\'),
+}
+
+octal_digit = b'01234567'
+
+# States of the stream data handling
+NO_STREAM = 0
+AFTER_STREAM = 1   # 'stream' keyword seen, expecting the end-of-line
+IN_STREAM = 2      # looking for 'endstream'
+
+#-------------------------------------------------------------------------------
+# class PushTokenStream
+#-------------------------------------------------------------------------------
+
+class PushTokenStream:
+
+    # Initializer
+    def __init__(self):
+        self.buf = bytearray()
+        self.pos = 0       # index in self.buf of the next byte to be analyzed
+        self.offset = 0    # stream offset of self.buf[0]
+        self.stream_state = NO_STREAM
+        self.scan_from = 0  # where to resume looking for 'endstream'
+        self.partial = None  # how far the token at self.pos has been scanned
+        self.closed = False
+
+    def tell(self):
+        """Return the stream offset of the next byte to be analyzed."""
+        return self.offset + self.pos
+
+    #---------------------------------------------------------------------------
+    # feed
+    #---------------------------------------------------------------------------
+
+    def feed(self, data):
+        """Push some more bytes, return the list of tokens now complete."""
+        self.buf += data
+        tokens = self._scan(final=False)
+
+        # Forget the bytes that have been analyzed
+        if self.pos > 0:
+            del self.buf[:self.pos]
+            self.offset += self.pos
+            self.scan_from = max(0, self.scan_from - self.pos)
+            self.pos = 0
+        return tokens
+
+    #---------------------------------------------------------------------------
+    # close
+    #---------------------------------------------------------------------------
+
+    def close(self):
+        """No more bytes will come: return the remaining tokens, and EOF."""
+        tokens = self._scan(final=True)
+        self.buf = bytearray()
+        self.offset += self.pos
+        self.pos = 0
+        self.closed = True
+        tokens.append(Token(EToken.EOF))
+        return tokens
+
+    #---------------------------------------------------------------------------
+    # _scan
+    #---------------------------------------------------------------------------
+
+    def _scan(self, final):
+        tokens = []
+        while True:
+            tok = self._next_token(final)
+            if tok is None:
+                return tokens
+
+            # The end-of-line after 'stream' starts the stream data
+            if self.stream_state == AFTER_STREAM:
+                if tok.type in (EToken.CR, EToken.LF, EToken.CRLF):
+                    self.stream_state = IN_STREAM
+                    self.scan_from = self.pos
+                elif tok.type != EToken.STREAM_BEGIN:
+                    self.stream_state = NO_STREAM
+            tokens.append(tok)
+
+    #---------------------------------------------------------------------------
+    # _next_token
+    #---------------------------------------------------------------------------
+
+    def _next_token(self, final):
+        """Return the next complete token, or None if more bytes are needed."""
+        # self.pos is only moved forward once a token is complete, so that
+        # returning None leaves the partial token in self.buf for next time.
+        buf = self.buf
+        n = len(buf)
+
+        if self.stream_state == IN_STREAM:
+            return self._stream_data(final)
+
+        # Skip whitespace
+        i = self.pos
+        while i < n and buf[i] in wspace:
+            i += 1
+        self.pos = i
+        if i == n:
+            return None
+
+        cc = buf[i]
+        if cc == ord('('):
+            return self._literal_string(final)
+        elif cc == ord('<'):
+            if i + 1 == n:
+                return self._incomplete(final)
+            if buf[i + 1] == ord('<'):
+                self.pos = i + 2
+                return Token(EToken.DICT_BEGIN)
+            return self._hex_string(final)
+        elif cc == ord('>'):
+            if i + 1 == n:
+                return self._incomplete(final)
+            if buf[i + 1] == ord('>'):
+                self.pos = i + 2
+                return Token(EToken.DICT_END)
+            self.pos = i + 1
+            return Token(EToken.ERROR, "error: '>' not followed by a second '>'")
+        elif cc == ord('/'):
+            return self._name(final)
+        elif cc == ord('%'):
+            return self._comment(final)
+        elif cc == ord('['):
+            self.pos = i + 1
+            return Token(EToken.ARRAY_BEGIN)
+        elif cc == ord(']'):
+            self.pos = i + 1
+            return Token(EToken.ARRAY_END)
+        elif cc == ord('\r'):
+            if i + 1 == n and not final:
+                # Is it '\r' or '\r\n' ? We can't tell yet
+                return None
+            if i + 1 < n and buf[i + 1] == ord('\n'):
+                self.pos = i + 2
+                return Token(EToken.CRLF)
+            self.pos = i + 1
+            return Token(EToken.CR)
+        elif cc == ord('\n'):
+            self.pos = i + 1
+            return Token(EToken.LF)
+        elif cc in b')>{}':
+            self.pos = i + 1
+            return Token(EToken.ERROR, f"error: unexpected character '{chr(cc)}'")
+        else:
+            return self._regular_run(final)
+
+    def _incomplete(self, final):
+        """The token at self.pos is not complete yet."""
+        if not final:
+            return None
+        # There won't be any more bytes, this is an error
+        self.pos = len(self.buf)
+        return Token(EToken.ERROR, 'error: incomplete token at end of data')
+
+    # A token that is cut by the end of a chunk is scanned again when the next
+    # chunk comes, but only from where the previous scan stopped: the functions
+    # below leave their state in self.partial when they return None, with
+    # indexes relative to self.pos, which feed() may move. Otherwise a long
+    # string fed one byte at a time would be scanned in quadratic time.
+
+    #---------------------------------------------------------------------------
+    # _literal_string
+    #---------------------------------------------------------------------------
+
+    def _literal_string(self, final):
+        """self.pos is on the opening paren, get the entire string."""
+        buf = self.buf
+        n = len(buf)
+        skip, parens, ls = self.partial or (1, 1, bytearray())
+        self.partial = None
+        i = self.pos + skip
+        while i < n:
+            cc = buf[i]
+            i += 1
+            if cc == ord(')'):
+                parens -= 1
+                if parens == 0:
+                    self.pos = i
+                    return Token(EToken.LITERAL_STRING, ls)
+                ls.append(cc)
+            elif cc == ord('('):
+                parens += 1
+                ls.append(cc)
+            elif cc == ord('\\'):
+                # Escape sequences need up to 3 more bytes
+                if i + 3 > n and not final:
+                    self.partial = (i - 1 - self.pos, parens, ls)
+                    return None
+                if i == n:
+                    break
+                cc2 = buf[i]
+                if cc2 in escapes:
+                    ls.append(escapes[cc2])
+                    i += 1
+                elif cc2 in octal_digit:
+                    # One, two or three octal digits
+                    j = i + 1
+                    while j < n and j < i + 3 and buf[j] in octal_digit:
+                        j += 1
+                    ls.append(int(buf[i:j], 8) & 0xff)
+                    i = j
+                elif cc2 == ord('\r'):
+                    # A backslash at the end of a line continues the string
+                    i += 2 if i + 1 < n and buf[i + 1] == ord('\n') else 1
+                elif cc2 == ord('\n'):
+                    i += 1
+                # Otherwise, the backslash is ignored
+            else:
+                # All other characters just get added to the string
+                ls.append(cc)
+        if not final:
+            self.partial = (n - self.pos, parens, ls)
+        return self._incomplete(final)
+
+    #---------------------------------------------------------------------------
+    # _hex_string
+    #---------------------------------------------------------------------------
+
+    def _hex_string(self, final):
+        """self.pos is on the opening 'less than', get the entire string."""
+        skip = self.partial or 1
+        self.partial = None
+        end = self.buf.find(b'>', self.pos + skip)
+        if end == -1:
+            if not final:
+                self.partial = len(self.buf) - self.pos
+            return self._incomplete(final)
+        hs = bytes(self.buf[self.pos + 1:end]).translate(None, wspace + b'\r\n')
+        self.pos = end + 1
+        if hs.strip(hex_digit):
+            return Token(EToken.ERROR,
+                         "error: '<' not followed by hex digit or second '<'")
+        if len(hs)%2 == 1:
+            hs += b'0'
+        return Token(EToken.HEX_STRING, bytes.fromhex(hs.decode()))
+
+    #---------------------------------------------------------------------------
+    # _name
+    #---------------------------------------------------------------------------
+
+    def _name(self, final):
+        """self.pos is on the opening '/', get the rest of the characters."""
+        i = self.pos + 1
+        end = self.pos + (self.partial or 1)
+        self.partial = None
+        m = regular_run.match(self.buf, end)
+        if m:
+            end = m.end()
+        if end == len(self.buf) and not final:
+            # The name may continue in the next chunk
+            self.partial = end - self.pos
+            return None
+        raw = bytes(self.buf[i:end])
+        self.pos = end
+
+        # Names may hold '#xx' hexadecimal codes
+        if b'#' not in raw:
+            return Token(EToken.NAME, bytearray(raw))
+        name = bytearray()
+        k = 0
+        while k < len(raw):
+            hc = raw[k+1:k+3]
+            if raw[k] == ord('#') and len(hc) == 2 and not hc.strip(hex_digit):
+                name += bytes.fromhex(hc.decode())
+                k += 3
+            else:
+                name.append(raw[k])
+                k += 1
+        return Token(EToken.NAME, name)
+
+    #---------------------------------------------------------------------------
+    # _comment
+    #---------------------------------------------------------------------------
+
+    def _comment(self, final):
+        """self.pos is on a '%': version marker, EOF marker, or comment."""
+        i = self.pos
+        skip = self.partial or 0
+        self.partial = None
+        m = eol.search(self.buf, i + skip)
+        if not m and not final:
+            self.partial = len(self.buf) - i
+            return None
+        end = m.start() if m else len(self.buf)
+        line = self.buf[i:end]
+
+        # Is it a version marker ?
+        m = version.match(line)
+        if m:
+            self.pos = i + 8
+            return Token(EToken.VERSION_MARKER,
+                         (int(m.group(1)), int(m.group(2))))
+
+        # Is it an EOF marker ?
+        if line.startswith(b'%%EOF'):
+            self.pos = i + 5
+            return Token(EToken.EOF_MARKER)
+
+        # It's a comment, ignore characters up to eol. The end-of-line marker
+        # itself is the next token, as in TokenStream.
+        self.pos = end
+        return self._next_token(final)
+
+    #---------------------------------------------------------------------------
+    # _regular_run
+    #---------------------------------------------------------------------------
+
+    def _regular_run(self, final):
+        """self.pos is on a regular character, get the entire run of them."""
+        end = self.pos + (self.partial or 0)
+        self.partial = None
+        m = regular_run.match(self.buf, end)
+        if m:
+            end = m.end()
+        if end == len(self.buf) and not final:
+            # The run may continue in the next chunk
+            self.partial = end - self.pos
+            return None
+        s = bytes(self.buf[self.pos:end])
+        self.pos = end
+
+        t = keywords.get(s)
+        if t:
+            if t == EToken.STREAM_BEGIN:
+                self.stream_state = AFTER_STREAM
+            return Token(t)
+        try:
+            return Token(EToken.INTEGER, int(s))
+        except ValueError:
+            try:
+                return Token(EToken.REAL, float(s))
+            except ValueError:
+                return Token(EToken.ERROR, "Unrecognized regular character run.")
+
+    #---------------------------------------------------------------------------
+    # _stream_data
+    #---------------------------------------------------------------------------
+
+    # The stream dictionary's /Length may be an indirect reference to an
+    # object that hasn't arrived yet, so the end of the data is found by
+    # looking for the 'endstream' keyword instead.
+
+    def _stream_data(self, final):
+        """Return the bytes between 'stream' and 'endstream'."""
+        end = self.buf.find(b'endstream', self.scan_from)
+        if end == -1:
+            if not final:
+                # Don't search the same bytes again next time, but the keyword
+                # may have been cut in two by the end of the chunk
+                self.scan_from = max(self.pos, len(self.buf) - 8)
+                return None
+            end = len(self.buf)
+
+        # "There should be an end-of-line marker after the data and before
+        # endstream; this marker shall not be included in the stream length".
+        # PDF spec, § 7.3.8.1, page 19. It is the next token.
+        data_end = end
+        if self.buf.endswith(b'\r\n', self.pos, end):
+            data_end -= 2
+        elif data_end > self.pos and self.buf[data_end - 1] in b'\r\n':
+            data_end -= 1
+
+        data = bytearray(self.buf[self.pos:data_end])
+        self.pos = data_end
+        self.stream_state = NO_STREAM
+        return Token(EToken.STREAM_DATA, data=data)
+
+#-------------------------------------------------------------------------------
+# push_tokens - tokens from an iterable of chunks
+#-------------------------------------------------------------------------------
+
+def push_tokens(chunks):
+    """Yield the tokens from an iterable of byte chunks, ending with EOF."""
+    pt = PushTokenStream()
+    for chunk in chunks:
+        yield from pt.feed(chunk)
+    yield from pt.close()
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    print('This module is not meant to be executed directly.')
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# push_token_stream_t.py
+
+import io
+import os
+import unittest
+from token_stream import EToken, TokenStream
+from push_token_stream import PushTokenStream, push_tokens
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class PushTokenStreamTest(unittest.TestCase):
+    """Test the parsing of tokens from chunks of bytes."""
+
+    path = 't'
+
+    def pull_all(self, data):
+        """Get all the tokens from a TokenStream, as (type, data) tuples."""
+        tk = TokenStream('<bytes>', io.BytesIO(data))
+        tokens = []
+        while True:
+            tok = tk.next_token()
+            tokens.append((tok.type, tok.data))
+            if tok.type == EToken.EOF:
+                return tokens
+
+    def test01(self):
+        """Same tokens as TokenStream, whatever the size of the chunks."""
+        for name in ['token_stream.dat', 'dict2.dat', 'flex1.dat',
+                     'literal01.dat']:
+            filepath = os.path.join(PushTokenStreamTest.path, name)
+            with open(filepath, 'rb') as f:
+                data = f.read()
+            expected = self.pull_all(data)
+            for sz in [1, 2, 7, 64, len(data)]:
+                chunks = [data[i:i+sz] for i in range(0, len(data), sz)]
+                tokens = [(t.type, t.data) for t in push_tokens(chunks)]
+                self.assertEqual(expected, tokens, f'{name}, chunks of {sz}')
+
+    def test02(self):
+        """Partial tokens are carried over to the next feed()."""
+        pt = PushTokenStream()
+
+        tokens = pt.feed(b'<</Conte')
+        self.assertEqual(1, len(tokens))
+        self.assertEqual(EToken.DICT_BEGIN, tokens[0].type)
+
+        # The name is complete, the integer may not be
+        tokens = pt.feed(b'nts 66')
+        self.assertEqual(1, len(tokens))
+        self.assertEqual(EToken.NAME, tokens[0].type)
+        self.assertEqual(b'Contents', tokens[0].data)
+
+        tokens = pt.feed(b'24 0 R>')
+        self.assertEqual([EToken.INTEGER, EToken.INTEGER, EToken.OBJ_REF],
+                         [t.type for t in tokens])
+        self.assertEqual(6624, tokens[0].data)
+
+        tokens = pt.feed(b'>(a (b')
+        self.assertEqual(1, len(tokens))
+        self.assertEqual(EToken.DICT_END, tokens[0].type)
+
+        tokens = pt.feed(b')\\)')
+        self.assertEqual(0, len(tokens))
+        self.assertEqual(22, pt.tell())
+
+        tokens = pt.close()
+        self.assertEqual(2, len(tokens))
+        self.assertEqual(EToken.ERROR, tokens[0].type)
+        self.assertEqual(EToken.EOF, tokens[1].type)
+
+    def test03(self):
+        """Stream data is found up to 'endstream', across chunks."""
+        filepath = os.path.join(PushTokenStreamTest.path, 'stream.dat')
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        for sz in [1, 5, 4096]:
+            chunks = [data[i:i+sz] for i in range(0, len(data), sz)]
+            tokens = list(push_tokens(chunks))
+            types = [t.type for t in tokens]
+            i = types.index(EToken.STREAM_DATA)
+            self.assertEqual(EToken.STREAM_BEGIN, types[i - 2])
+            self.assertEqual(EToken.CRLF, types[i - 1])
+            # /Length 724, the end-of-line before 'endstream' is not included
+            self.assertEqual(724, len(tokens[i].data))
+            self.assertEqual(EToken.CRLF, types[i + 1])
+            self.assertEqual(EToken.STREAM_END, types[i + 2])
+            self.assertEqual([EToken.EOF_MARKER, EToken.CRLF, EToken.EOF], types[-3:])
+
+    def test04(self):
+        """Long tokens fed one byte at a time, in linear time."""
+        data = (b'(' + b'a\\n(b)\\053\\\r\n'*5000 + b') <' + b'0a1b '*10000
+                + b'> /' + b'n#41'*10000 + b' %' + b'x'*40000 + b'\n'
+                + b'1'*4000 + b' ' + b'3.'*20000 + b' ')
+        expected = [(t.type, t.data) for t in push_tokens([data])]
+        self.assertEqual([EToken.LITERAL_STRING, EToken.HEX_STRING,
+                          EToken.NAME, EToken.LF, EToken.INTEGER,
+                          EToken.ERROR, EToken.EOF],
+                         [t for t, _ in expected])
+        self.assertEqual(b'a\n(b)+'*5000, expected[0][1])
+        self.assertEqual(b'A'*10000, expected[2][1][1::2])
+        chunks = (data[i:i+1] for i in range(len(data)))
+        tokens = [(t.type, t.data) for t in push_tokens(chunks)]
+        self.assertEqual(expected, tokens)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
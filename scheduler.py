@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+# scheduler.py - run a job over many files of very different sizes
+
+# A corpus mixes 20 KB letters and 2 GB scanned books. Mapped over the files
+# in directory order, a job ends with one worker busy with the largest file,
+# started last, while the others have nothing left to do. Here:
+#
+#     - the files are sorted by size, largest first, so that the long tasks
+#       start early and the short ones fill in the gaps at the end (LPT)
+#     - small files are grouped into chunks of about chunk_bytes, so that a
+#       task isn't dominated by the overhead of the pool; the chunks are small
+#       enough for the workers to keep pulling them from the pool's queue
+#       until the very end, which balances the load
+#     - optionally, split(filepath) cuts the work of a large file in parts
+#       (see split_streams(), that decodes the streams of a file by ranges of
+#       object numbers), which are scheduled like the other tasks
+#
+# Every task records when it started and ended, its CPU time, and on which
+# worker, and the BatchReport says how busy the workers were, how much of the
+# cores they actually used, and how long the tail was. The two differ: threads
+# running python code take turns on the GIL, so they are all busy while only
+# one core works.
+#
+#     sched = SizeScheduler(file_stats, workers=8)
+#     for filepath, res, error in sched.run(filepaths):
+#         ...
+#     print(sched.report)
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from document import DocumentCore
+from filters import FilterError, decode_stream
+from lazy_object import lazy_stream
+from object_stream import EObject, filter_chain
+from token_stream import PdfParseError
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# Tasks
+#-------------------------------------------------------------------------------
+
+def _worker_id():
+    return f'{os.getpid()}.{threading.get_ident()}'
+
+# A task runs in a thread of the pool, or in the main thread of a process of
+# the pool: either way, time.thread_time() is the CPU time of the task alone
+
+def _run_files(func, filepaths):
+    """Run func on each file, return [(filepath, result, error, start, end,
+    cpu, worker)]. Runs in the pool, a module-level function so that it can be
+    pickled."""
+    res = []
+    for filepath in filepaths:
+        # time.monotonic() is the same clock in all the processes
+        start = time.monotonic()
+        cpu = time.thread_time()
+        try:
+            r, error = func(filepath), None
+        except Exception as e:
+            # One bad file mustn't stop the batch
+            r, error = None, f'{type(e).__name__}: {e}'
+        res.append((filepath, r, error, start, time.monotonic(),
+                    time.thread_time() - cpu, _worker_id()))
+    return res
+
+def _run_part(filepath, func, args):
+    """Run func(*args), a part of the work on filepath."""
+    start = time.monotonic()
+    cpu = time.thread_time()
+    try:
+        r, error = func(*args), None
+    except Exception as e:
+        r, error = None, f'{type(e).__name__}: {e}'
+    return [(filepath, r, error, start, time.monotonic(),
+             time.thread_time() - cpu, _worker_id())]
+
+#-------------------------------------------------------------------------------
+# class BatchReport
+#-------------------------------------------------------------------------------
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p*len(values)))]
+
+class BatchReport:
+    """How a batch went: timings in seconds."""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.cores = min(workers, os.cpu_count() or 1)
+        self.files = 0
+        self.tasks = 0
+        self.bytes = 0
+        self.wall = 0.0
+        self.busy = 0.0         # the sum of the task durations
+        self.cpu = 0.0          # the sum of the CPU times of the tasks
+        self.occupancy = 0.0    # busy / (wall*workers)
+        self.utilization = 0.0  # cpu / (wall*cores), of the cores
+        self.latencies = []     # duration of each file, or part of file
+        self.tail = 0.0         # between the first and the last worker done
+
+    def percentile(self, p):
+        """Return the p (0 to 1) percentile of the latencies."""
+        return _percentile(self.latencies, p)
+
+    def __str__(self):
+        return (f'{self.files} files ({self.bytes} bytes) in {self.tasks}'
+                f' tasks on {self.workers} workers, {self.wall:.3f} s,'
+                f' busy {self.occupancy:.0%},'
+                f' core utilization {self.utilization:.0%}'
+                f' of {self.cores},'
+                f' latency p50 {self.percentile(0.5):.3f} s,'
+                f' p99 {self.percentile(0.99):.3f} s,'
+                f' max {max(self.latencies, default=0):.3f} s,'
+                f' tail {self.tail:.3f} s')
+
+#-------------------------------------------------------------------------------
+# class SizeScheduler
+#-------------------------------------------------------------------------------
+
+chunk_bytes = 8*1024*1024
+chunk_files = 64
+split_sz = 64*1024*1024
+
+class SizeScheduler:
+    """Run func(filepath) over many files, largest first, in a pool.
+
+    executor is a ThreadPoolExecutor or a ProcessPoolExecutor (then func
+    must be picklable) with 'workers' workers; by default a thread pool of
+    one worker per CPU. If split is given, split(filepath) is called for the
+    files of split_sz bytes or more, and returns a list of (func, args): the
+    parts of the work on the file, run as separate tasks.
+    """
+
+    def __init__(self, func, workers=None, executor=None, split=None,
+                 chunk_bytes=chunk_bytes, split_sz=split_sz):
+        self.func = func
+        self.workers = workers or os.cpu_count()
+        self.executor = executor
+        self.split = split
+        self.chunk_bytes = chunk_bytes
+        self.split_sz = split_sz
+        self.report = None
+
+    def tasks(self, filepaths, sizes=None):
+        """Return the tasks, (function, args), largest first."""
+        if sizes is None:
+            sizes = {fp: os.path.getsize(fp) for fp in filepaths}
+        ordered = sorted(filepaths, key=lambda fp: -sizes[fp])
+        tasks = []
+        chunk, chunk_sz = [], 0
+        for filepath in ordered:
+            sz = sizes[filepath]
+            if self.split and sz >= self.split_sz:
+                try:
+                    parts = self.split(filepath)
+                except Exception:
+                    # One bad file mustn't stop the batch: its task will
+                    # report the error
+                    tasks.append((_run_files, (self.func, [filepath])))
+                    continue
+                if parts:
+                    tasks += [(_run_part, (filepath, func, args))
+                              for func, args in parts]
+                    continue
+            if sz >= self.chunk_bytes:
+                tasks.append((_run_files, (self.func, [filepath])))
+                continue
+            chunk.append(filepath)
+            chunk_sz += sz
+            if chunk_sz >= self.chunk_bytes or len(chunk) == chunk_files:
+                tasks.append((_run_files, (self.func, chunk)))
+                chunk, chunk_sz = [], 0
+        if chunk:
+            tasks.append((_run_files, (self.func, chunk)))
+        return tasks
+
+    def run(self, filepaths, sizes=None):
+        """Yield (filepath, result, error) as the files are done; a split file
+        comes once per part. error is None, or a str if func raised. The
+        BatchReport is in self.report at the end."""
+        if sizes is None:
+            sizes = {fp: os.path.getsize(fp) for fp in filepaths}
+        tasks = self.tasks(filepaths, sizes)
+        report = self.report = BatchReport(self.workers)
+        report.files = len(filepaths)
+        report.tasks = len(tasks)
+        report.bytes = sum(sizes[fp] for fp in filepaths)
+
+        executor = self.executor
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=self.workers)
+        last_end = {}  # worker -> end of its last task
+        t0 = time.monotonic()
+        try:
+            # The pool's queue hands the tasks out in order, to whichever
+            # worker is free
+            futures = [executor.submit(f, *args) for f, args in tasks]
+            for fut in as_completed(futures):
+                for (filepath, r, error, start, end, cpu,
+                     worker) in fut.result():
+                    report.latencies.append(end - start)
+                    report.busy += end - start
+                    report.cpu += cpu
+                    last_end[worker] = max(end, last_end.get(worker, end))
+                    yield filepath, r, error
+        finally:
+            if self.executor is None:
+                executor.shutdown()
+        report.wall = time.monotonic() - t0
+        if report.wall > 0:
+            report.occupancy = report.busy / (report.wall*self.workers)
+            report.utilization = report.cpu / (report.wall*report.cores)
+        if last_end:
+            report.tail = max(last_end.values()) - min(last_end.values())
+
+#-------------------------------------------------------------------------------
+# Splitting the work on a file: decoding its streams
+#-------------------------------------------------------------------------------
+
+def decoded_sizes(filepath, objns=None):
+    """Return {objn: decoded length} of the streams of a file (or of the
+    streams among objns), -1 for those that can't be decoded."""
+    core = DocumentCore(filepath, lazy=True)
+    core.open()
+    try:
+        cursor = core.cursor()
+        if objns is None:
+            objns = [objn for objn, _ in core.object_numbers()]
+        res = {}
+        for objn in objns:
+            entry = core.xref.get_object(objn, 0)
+            if entry is None or not entry[2]:
+                # Streams are never stored in object streams
+                continue
+            try:
+                o = lazy_stream(core.mm, entry[0])
+                if o is None:
+                    continue
+                _, _, sd, start = o
+                length = cursor.deref(sd.data.get('Length'))
+                if length is None or length.type != EObject.INTEGER:
+                    res[objn] = -1
+                    continue
+                data, rest = decode_stream(
+                    core.mm[start:start + length.data],
+                    filter_chain(sd, cursor.deref))
+                res[objn] = -1 if rest else len(data)
+            except (FilterError, PdfParseError):
+                res[objn] = -1
+        return res
+    finally:
+        core.close()
+
+def split_streams(filepath, parts=None):
+    """Return [(decoded_sizes, (filepath, objns))], the work of decoding
+    the streams of a file cut in parts (one per CPU by default)."""
+    parts = parts or os.cpu_count()
+    core = DocumentCore(filepath, lazy=True)
+    core.open()
+    try:
+        objns = [objn for objn, _ in core.object_numbers()
+                 if not core.xref.get_compressed(objn)]
+    finally:
+        core.close()
+    n = max(1, -(-len(objns) // parts))
+    return [(decoded_sizes, (filepath, objns[k:k + n]))
+            for k in range(0, len(objns), n)]
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(f'Usage: {sys.argv[0]} <filepath> ...')
+        exit(-1)
+    sched = SizeScheduler(decoded_sizes, split=split_streams)
+    for filepath, res, error in sched.run(sys.argv[1:]):
+        if error:
+            print(f'{filepath}: {error}')
+    print(sched.report)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# scheduler_t.py
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from scheduler import SizeScheduler, decoded_sizes, split_streams
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+def _fail_on_doc02(filepath):
+    if filepath.endswith('doc02.pdf'):
+        raise ValueError('bad file')
+    return os.path.getsize(filepath)
+
+def _sleep(filepath):
+    time.sleep(0.05)
+    return filepath
+
+class SchedulerTest(unittest.TestCase):
+    """Test the size-aware scheduling of a batch."""
+
+    path = 't'
+
+    def filepaths(self):
+        return sorted(os.path.join(SchedulerTest.path, name)
+                      for name in os.listdir(SchedulerTest.path)
+                      if name.endswith('.pdf'))
+
+    def test01(self):
+        """Largest first, small files in chunks."""
+        sizes = {'a': 100, 'b': 5000, 'c': 10, 'd': 60, 'e': 2000, 'f': 30}
+        sched = SizeScheduler(len, chunk_bytes=1000)
+        tasks = sched.tasks(list(sizes), sizes)
+        self.assertEqual([['b'], ['e'], ['a', 'd', 'f', 'c']],
+                         [args[1] for _, args in tasks])
+
+        # Chunks are closed once they reach chunk_bytes
+        sched = SizeScheduler(len, chunk_bytes=100)
+        tasks = sched.tasks(list(sizes), sizes)
+        self.assertEqual([['b'], ['e'], ['a'], ['d', 'f', 'c']],
+                         [args[1] for _, args in tasks])
+
+    def test02(self):
+        """Every file comes out once, with its result or its error."""
+        filepaths = self.filepaths()
+        sched = SizeScheduler(_fail_on_doc02, workers=3, chunk_bytes=4096)
+        res = {fp: (r, error) for fp, r, error in sched.run(filepaths)}
+        self.assertEqual(set(filepaths), set(res))
+        for fp, (r, error) in res.items():
+            if fp.endswith('doc02.pdf'):
+                self.assertIsNone(r)
+                self.assertEqual('ValueError: bad file', error)
+            else:
+                self.assertEqual(os.path.getsize(fp), r)
+                self.assertIsNone(error)
+
+        report = sched.report
+        self.assertEqual(len(filepaths), report.files)
+        self.assertEqual(len(filepaths), len(report.latencies))
+        self.assertEqual(sum(map(os.path.getsize, filepaths)), report.bytes)
+        self.assertTrue(0 < report.occupancy <= 1)
+        self.assertTrue(0 <= report.utilization <= 1)
+        self.assertTrue(report.busy <= report.wall*report.workers)
+        self.assertTrue(report.cpu <= report.busy)
+        self.assertTrue(0 <= report.tail <= report.wall)
+        self.assertTrue(report.percentile(0.5) <= report.percentile(0.99)
+                        <= max(report.latencies))
+        self.assertIn('core utilization', str(report))
+
+    def test03(self):
+        """The work on a large file split in parts."""
+        filepath = os.path.join(SchedulerTest.path, 'doc05.pdf')
+        whole = decoded_sizes(filepath)
+        self.assertTrue(whole)
+        parts = split_streams(filepath, 3)
+        self.assertEqual(3, len(parts))
+
+        sched = SizeScheduler(decoded_sizes, workers=3,
+                              split=lambda fp: split_streams(fp, 3),
+                              split_sz=0)
+        merged = {}
+        cnt = 0
+        for fp, r, error in sched.run([filepath]):
+            self.assertEqual(filepath, fp)
+            self.assertIsNone(error)
+            merged.update(r)
+            cnt += 1
+        self.assertEqual(3, cnt)
+        self.assertEqual(3, sched.report.tasks)
+        self.assertEqual(whole, merged)
+
+    def test04(self):
+        """In a process pool."""
+        filepaths = self.filepaths()
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            sched = SizeScheduler(decoded_sizes, workers=2,
+                                  executor=executor, chunk_bytes=4096)
+            res = {fp: r for fp, r, error in sched.run(filepaths)
+                   if error is None}
+        fp = os.path.join(SchedulerTest.path, 'doc05.pdf')
+        self.assertEqual(decoded_sizes(fp), res[fp])
+        self.assertEqual(len(filepaths), len(sched.report.latencies))
+
+    def test05(self):
+        """A large file that can't be split is run in one task."""
+        tmp = tempfile.mkdtemp()
+        try:
+            filepath = os.path.join(tmp, 'truncated.pdf')
+            with open(os.path.join(SchedulerTest.path, 'doc05.pdf'),
+                      'rb') as f:
+                data = f.read()
+            with open(filepath, 'wb') as f:
+                f.write(data[:1000])
+            good = os.path.join(SchedulerTest.path, 'doc01.pdf')
+            sched = SizeScheduler(decoded_sizes, workers=2,
+                                  split=split_streams, split_sz=0)
+            res = {fp: (r, error) for fp, r, error
+                   in sched.run([filepath, good])}
+        finally:
+            shutil.rmtree(tmp)
+        self.assertIsNone(res[filepath][0])
+        self.assertTrue(res[filepath][1].startswith('PdfParseError: '))
+        self.assertEqual(decoded_sizes(good), res[good][0])
+
+    def test06(self):
+        """Busy workers that don't use the cores."""
+        sched = SizeScheduler(_sleep, workers=4, chunk_bytes=1)
+        sizes = {str(k): 1 for k in range(8)}
+        self.assertEqual(8, len(list(sched.run(list(sizes), sizes))))
+        report = sched.report
+        self.assertGreater(report.occupancy, 0.5)
+        self.assertLess(report.utilization, 0.5)
+        self.assertLess(report.cpu, report.busy/2)
+
+if __name__ == '__main__':
+    unittest.main()
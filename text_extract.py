@@ -0,0 +1,502 @@
+#!/usr/bin/env python
+# text_extract.py - extract the plain text of the pages of a PDF file
+
+# The pages come from the page tree walk, their content streams are decoded
+# with the filter pipeline and parsed by content_operations(). The text
+# showing operators (Tj, TJ, ', ") are interpreted with the text state (Tf,
+# Tc, Tw, Tz, TL, Ts) and the text matrix (Td, TD, Tm, T*), only to know where
+# the strings go: a string that starts well after the end of the previous one
+# is preceded by a space, one that starts on another line by a newline.
+#
+# Character codes are mapped to unicode with the /ToUnicode CMap of the font,
+# or else with its /Encoding. A Font object is built once per font dictionary
+# and kept for the whole document, with its CMaps and its widths, since the
+# same fonts are used by page after page. The CMaps themselves are compiled
+# once per process, by cmap.get_cmap().
+#
+#     for text in extract_text(filepath):
+#         print(text)
+
+import sys
+from cmap import CMapError, get_cmap, glyph_unicode, predefined
+from content_stream import content_operations
+from document import PdfDocument
+from filters import FilterError, decode_stream
+from lazy_object import lazy_stream
+from object_stream import EObject, filter_chain
+from token_stream import PdfParseError
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+#-------------------------------------------------------------------------------
+# Encodings
+#-------------------------------------------------------------------------------
+
+def _table(codec):
+    return [bytes([i]).decode(codec, errors='replace') for i in range(256)]
+
+# PDF Spec, Annex D: the simple font encodings. StandardEncoding differs from
+# latin-1 mostly in the quotes, which doesn't matter much for plain text.
+encodings = {
+    b'WinAnsiEncoding': _table('cp1252'),
+    b'MacRomanEncoding': _table('mac_roman'),
+    b'StandardEncoding': _table('latin-1'),
+    b'PDFDocEncoding': _table('latin-1'),
+}
+
+#-------------------------------------------------------------------------------
+# class Font
+#-------------------------------------------------------------------------------
+
+def _number(o):
+    return o.data if o.type in (EObject.INTEGER, EObject.REAL) else 0
+
+class Font:
+    """What the text extraction needs to know about a font: how to split
+    strings into codes, map them to text, and how wide they are."""
+
+    def __init__(self, font, deref, load_cmap=None):
+        # font is the font dictionary, a python dict of PdfObjects. load_cmap
+        # returns the CMap of a name or a stream (or a reference to one).
+        load_cmap = load_cmap or (lambda o: None)
+        sub = deref(font.get('Subtype'))
+        self.subtype = bytes(sub.data) if sub and sub.type == EObject.NAME \
+            else b''
+        self.composite = self.subtype == b'Type0'
+        self.to_unicode = load_cmap(font.get('ToUnicode'))
+        self.cmap = None      # composite fonts: the encoding CMap
+        self.encoding = None  # simple fonts: 256 str
+        self.widths = {}      # code (CID) -> width in thousandths of text space
+        self.default_width = 0
+
+        if self.composite:
+            self.cmap = load_cmap(font.get('Encoding')) \
+                or predefined[b'Identity-H']
+            self.default_width = 1000
+            desc = deref(font.get('DescendantFonts'))
+            if desc is not None and desc.type == EObject.ARRAY and desc.data:
+                cid = deref(desc.data[0])
+                if cid is not None and cid.type == EObject.DICTIONARY:
+                    self._cid_widths(cid.data, deref)
+        else:
+            self._simple_encoding(font, deref)
+            self._simple_widths(font, deref)
+
+    def _simple_encoding(self, font, deref):
+        enc = deref(font.get('Encoding'))
+        table = encodings[b'StandardEncoding']
+        if enc is not None and enc.type == EObject.NAME:
+            table = encodings.get(bytes(enc.data), table)
+        elif enc is not None and enc.type == EObject.DICTIONARY:
+            base = deref(enc.data.get('BaseEncoding'))
+            if base is not None and base.type == EObject.NAME:
+                table = encodings.get(bytes(base.data), table)
+            diffs = deref(enc.data.get('Differences'))
+            if diffs is not None and diffs.type == EObject.ARRAY:
+                table = list(table)
+                code = 0
+                for o in diffs.data:
+                    o = deref(o)
+                    if o.type == EObject.INTEGER:
+                        code = o.data
+                    elif o.type == EObject.NAME and 0 <= code < 256:
+                        table[code] = glyph_unicode(
+                            bytes(o.data).decode('latin-1'))
+                        code += 1
+        self.encoding = table
+
+    def _simple_widths(self, font, deref):
+        first = deref(font.get('FirstChar'))
+        widths = deref(font.get('Widths'))
+        # Type 3 glyph widths are in glyph space
+        scale = 1
+        matrix = deref(font.get('FontMatrix'))
+        if matrix is not None and matrix.type == EObject.ARRAY and matrix.data:
+            m0 = deref(matrix.data[0])
+            if m0.type in (EObject.INTEGER, EObject.REAL):
+                scale = m0.data * 1000
+        if first is not None and widths is not None \
+           and widths.type == EObject.ARRAY:
+            for k, o in enumerate(widths.data):
+                o = deref(o)
+                if o.type in (EObject.INTEGER, EObject.REAL):
+                    self.widths[first.data + k] = o.data * scale
+        fd = deref(font.get('FontDescriptor'))
+        if fd is not None and fd.type == EObject.DICTIONARY:
+            mw = deref(fd.data.get('MissingWidth'))
+            if mw is not None and mw.type in (EObject.INTEGER, EObject.REAL):
+                self.default_width = mw.data
+
+    def _cid_widths(self, cid, deref):
+        dw = deref(cid.get('DW'))
+        if dw is not None and dw.type in (EObject.INTEGER, EObject.REAL):
+            self.default_width = dw.data
+        w = deref(cid.get('W'))
+        if w is None or w.type != EObject.ARRAY:
+            return
+        # PDF Spec, § 9.7.4.3: c [w1 w2 ...], or c_first c_last w
+        items = [deref(o) for o in w.data]
+        i = 0
+        while i + 1 < len(items) and items[i].type == EObject.INTEGER:
+            c = items[i].data
+            if items[i+1].type == EObject.ARRAY:
+                for k, o in enumerate(items[i+1].data):
+                    self.widths[c + k] = _number(deref(o))
+                i += 2
+            elif i + 2 < len(items) and items[i+1].type == EObject.INTEGER:
+                for k in range(c, items[i+1].data + 1):
+                    self.widths[k] = _number(items[i+2])
+                i += 3
+            else:
+                break
+
+    def decode(self, s):
+        """Return a list of (text, width, single byte 32) for string s."""
+        res = []
+        tu = self.to_unicode
+        if self.composite:
+            cmap = self.cmap
+            for code, n in cmap.codes(s):
+                text = tu.lookup(code, n) if tu else None
+                cid = cmap.lookup(code, n)
+                res.append((text or '',
+                            self.widths.get(cid, self.default_width),
+                            n == 1 and code == 32))
+        else:
+            enc = self.encoding
+            for code in s:
+                text = tu.lookup(code, 1) if tu else None
+                if text is None:
+                    text = enc[code]
+                res.append((text, self.widths.get(code, self.default_width),
+                            code == 32))
+        return res
+
+#-------------------------------------------------------------------------------
+# class TextState
+#-------------------------------------------------------------------------------
+
+class TextState:
+    """The text state parameters, saved and restored by q and Q."""
+
+    def __init__(self):
+        self.font = None
+        self.size = 0
+        self.char_space = 0  # Tc
+        self.word_space = 0  # Tw
+        self.scale = 1       # Tz, as a fraction
+        self.leading = 0     # TL
+        self.rise = 0        # Ts
+
+    def copy(self):
+        ts = TextState()
+        ts.__dict__.update(self.__dict__)
+        return ts
+
+#-------------------------------------------------------------------------------
+# class TextExtractor
+#-------------------------------------------------------------------------------
+
+def _inherited(page, key, deref):
+    """Return the value of key in the page, or in its closest ancestor."""
+    node = page
+    for _ in range(64):
+        v = node.data.get(key)
+        if v is not None:
+            return deref(v)
+        node = deref(node.data.get('Parent'))
+        if node is None or node.type != EObject.DICTIONARY:
+            return None
+    return None
+
+class TextExtractor:
+    """Extract the text of the pages of a PdfDocument.
+
+    The Font objects and the parsed CMaps are kept across pages, keyed by the
+    object number of the font dictionary (of the CMap stream). The streams
+    are read once, and not kept in the document's cache.
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.deref = doc.deref
+        self.fonts = {}  # (objn, gen) -> Font
+        self.cmaps = {}  # (objn, gen) -> CMap
+
+    #---------------------------------------------------------------------------
+    # Decoding streams, fonts
+    #---------------------------------------------------------------------------
+
+    def load_stream(self, o):
+        """Return the object referenced by 'o', not caching it: a stream, of
+        which only the decoded data is used."""
+        if o is None or o.type != EObject.IND_OBJ_REF:
+            return o
+        return self.doc.cursor().get_object(o.data['objn'], o.data['gen'],
+                                            cache=False)
+
+    def stream_dict(self, ref):
+        """Return the dictionary of the stream referenced by ref, without
+        reading its data; None if it isn't a stream."""
+        core = self.doc.core
+        objn, gen = ref.data['objn'], ref.data['gen']
+        o = core.cached(objn)
+        if o is not None:
+            return o.data[0] if o.type == EObject.COUPLE else None
+        # Streams are never stored in object streams
+        entry = core.xref.get_object(objn, gen)
+        if core.xref.get_compressed(objn) or not entry or not entry[2]:
+            return None
+        try:
+            s = lazy_stream(core.mm, entry[0])
+        except PdfParseError:
+            return None
+        return s[2] if s else None
+
+    def stream_data(self, o):
+        """Return the decoded data of a stream object, None if it can't be."""
+        o = self.load_stream(o)
+        if o is None or o.type != EObject.COUPLE:
+            return None
+        sd, s = o.data
+        try:
+            data, rest = decode_stream(s.data, filter_chain(sd, self.deref))
+        except FilterError:
+            return None
+        return None if rest else data
+
+    def cmap(self, ref):
+        """Return the CMap of a name, or of a stream, None if there's none."""
+        if ref is None:
+            return None
+        if ref.type == EObject.NAME:
+            return predefined.get(bytes(ref.data))
+        key = None
+        if ref.type == EObject.IND_OBJ_REF:
+            key = (ref.data['objn'], ref.data['gen'])
+            if key in self.cmaps:
+                return self.cmaps[key]
+        o = self.load_stream(ref)
+        cmap = None
+        if o is not None and o.type == EObject.COUPLE:
+            # Compiled once per process, whatever the document
+            sd, s = o.data
+            try:
+                cmap = get_cmap(s.data, filter_chain(sd, self.deref))
+            except (FilterError, CMapError):
+                pass
+        if key is not None:
+            self.cmaps[key] = cmap
+        return cmap
+
+    def font(self, ref):
+        """Return the Font of a font dictionary (or a reference to one)."""
+        key = None
+        if ref.type == EObject.IND_OBJ_REF:
+            key = (ref.data['objn'], ref.data['gen'])
+            font = self.fonts.get(key)
+            if font is not None:
+                return font
+        o = self.deref(ref)
+        if o is None or o.type != EObject.DICTIONARY:
+            return None
+        font = Font(o.data, self.deref, self.cmap)
+        if key is not None:
+            self.fonts[key] = font
+        return font
+
+    def _resource(self, resources, category, name):
+        if resources is None or resources.type != EObject.DICTIONARY:
+            return None
+        d = self.deref(resources.data.get(category))
+        if d is None or d.type != EObject.DICTIONARY:
+            return None
+        return d.data.get(name.decode('latin-1'))
+
+    #---------------------------------------------------------------------------
+    # page_text
+    #---------------------------------------------------------------------------
+
+    def page_text(self, page):
+        """Return the text of a page dictionary, a str."""
+        contents = self.load_stream(page.data.get('Contents'))
+        if contents is None:
+            return ''
+        streams = contents.data if contents.type == EObject.ARRAY \
+            else [contents]
+        parts = [self.stream_data(o) for o in streams]
+        # The streams of an array are concatenated, as if they were one
+        data = b'\n'.join(bytes(p) for p in parts if p is not None)
+        out = []
+        self._run(data, _inherited(page, 'Resources', self.deref), out, set())
+        return ''.join(out).strip()
+
+    def _run(self, data, resources, out, forms):
+        """Interpret a content stream, append its text to out."""
+        ts = TextState()
+        saved = []
+        tm = tlm = (1, 0, 0, 1, 0, 0)
+        last = None  # (x, y) in text space units at the end of the last string
+
+        def show(s):
+            nonlocal tm, last
+            font = ts.font
+            if font is None:
+                return
+            a, b, c, d, e, f = tm
+            size = ts.size * (abs(d) or abs(b) or 1)
+            if last is not None:
+                dy = f - last[1]
+                dx = e - last[0]
+                if abs(dy) > 0.5 * size:
+                    out.append('\n')
+                elif dx > 0.15 * size or dx < -size:
+                    out.append(' ')
+            for text, w, space in font.decode(s):
+                out.append(text)
+                tx = (w / 1000 * ts.size + ts.char_space
+                      + (ts.word_space if space else 0)) * ts.scale
+                e += tx * a
+                f += tx * b
+            tm = (a, b, c, d, e, f)
+            last = (e, f)
+
+        def move(tx, ty):
+            nonlocal tm, tlm
+            a, b, c, d, e, f = tlm
+            tlm = tm = (a, b, c, d, tx*a + ty*c + e, tx*b + ty*d + f)
+
+        for op, operands in content_operations(data):
+            if op in ('Tj', "'", '"'):
+                if op == "'" or op == '"':
+                    if op == '"' and len(operands) == 3:
+                        ts.word_space = _number(operands[0])
+                        ts.char_space = _number(operands[1])
+                    move(0, -ts.leading)
+                if operands and operands[-1].type == EObject.STRING:
+                    show(operands[-1].data)
+            elif op == 'TJ':
+                if operands and operands[0].type == EObject.ARRAY:
+                    for o in operands[0].data:
+                        if o.type == EObject.STRING:
+                            show(o.data)
+                        elif o.type in (EObject.INTEGER, EObject.REAL):
+                            a, b, c, d, e, f = tm
+                            tx = -o.data / 1000 * ts.size * ts.scale
+                            tm = (a, b, c, d, e + tx*a, f + tx*b)
+            elif op == 'Td' and len(operands) == 2:
+                move(_number(operands[0]), _number(operands[1]))
+            elif op == 'TD' and len(operands) == 2:
+                ts.leading = -_number(operands[1])
+                move(_number(operands[0]), _number(operands[1]))
+            elif op == 'T*':
+                move(0, -ts.leading)
+            elif op == 'Tm' and len(operands) == 6:
+                tm = tlm = tuple(_number(o) for o in operands)
+            elif op == 'BT':
+                tm = tlm = (1, 0, 0, 1, 0, 0)
+            elif (op == 'Tf' and len(operands) == 2
+                  and operands[0].type == EObject.NAME):
+                try:
+                    ref = self._resource(resources, 'Font', operands[0].data)
+                    ts.font = self.font(ref) if ref is not None else None
+                except PdfParseError:
+                    # A broken font: the rest of the page goes on
+                    ts.font = None
+                ts.size = _number(operands[1])
+            elif op == 'Tc' and operands:
+                ts.char_space = _number(operands[0])
+            elif op == 'Tw' and operands:
+                ts.word_space = _number(operands[0])
+            elif op == 'Tz' and operands:
+                ts.scale = _number(operands[0]) / 100
+            elif op == 'TL' and operands:
+                ts.leading = _number(operands[0])
+            elif op == 'Ts' and operands:
+                ts.rise = _number(operands[0])
+            elif op == 'q':
+                saved.append(ts.copy())
+            elif op == 'Q' and saved:
+                ts = saved.pop()
+            elif (op == 'Do' and operands
+                  and operands[0].type == EObject.NAME):
+                try:
+                    self._form(resources, operands[0].data, out, forms)
+                except PdfParseError:
+                    # A broken XObject: the rest of the page goes on
+                    pass
+
+    def _form(self, resources, name, out, forms):
+        """Append the text of a form XObject."""
+        ref = self._resource(resources, 'XObject', name)
+        if ref is None or ref.type != EObject.IND_OBJ_REF:
+            return
+        key = (ref.data['objn'], ref.data['gen'])
+        if key in forms:
+            # A form that draws itself
+            return
+        # Images are skipped without reading their data
+        sd = self.stream_dict(ref)
+        if sd is None or sd.type != EObject.DICTIONARY:
+            return
+        sub = sd.data.get('Subtype')
+        if sub is None or sub.data != b'Form':
+            return
+        o = self.load_stream(ref)
+        data = self.stream_data(o)
+        if data is None:
+            return
+        sd = o.data[0].data
+        res = self.deref(sd.get('Resources')) or resources
+        out.append('\n')
+        forms.add(key)
+        try:
+            self._run(data, res, out, forms)
+        finally:
+            forms.discard(key)
+
+    #---------------------------------------------------------------------------
+    # pages
+    #---------------------------------------------------------------------------
+
+    def pages(self):
+        """Yield the text of each page, in order."""
+        for page in self.doc.pages():
+            yield self.page_text(page)
+
+#-------------------------------------------------------------------------------
+# extract_text
+#-------------------------------------------------------------------------------
+
+def extract_text(filepath):
+    """Yield the text of each page of a PDF file, in order."""
+    with PdfDocument(filepath) as doc:
+        yield from TextExtractor(doc).pages()
+
+#-------------------------------------------------------------------------------
+# main
+#-------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(f'Usage: {sys.argv[0]} <filepath>')
+        exit(-1)
+    # One page after the other, separated by form feeds
+    for i, text in enumerate(extract_text(sys.argv[1])):
+        if i > 0:
+            print('\f', end='')
+        print(text)
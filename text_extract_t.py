@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# text_extract_t.py
+
+import os
+import tempfile
+import unittest
+from document import PdfDocument
+from object_stream import EObject
+from text_extract import TextExtractor, extract_text
+
+#-------------------------------------------------------------------------------
+# I want stdout to be unbuffered, always
+#-------------------------------------------------------------------------------
+
+class Unbuffered(object):
+    def __init__(self, stream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+import sys
+sys.stdout = Unbuffered(sys.stdout)
+
+# -----------------------------------------------------------------------------
+# Tests
+# -----------------------------------------------------------------------------
+
+class TextExtractTest(unittest.TestCase):
+    """Test the extraction of the text of pages."""
+
+    path = 't'
+
+    def test01(self):
+        """Simple fonts, one content stream per page."""
+        filepath = os.path.join(TextExtractTest.path, 'doc01.pdf')
+        self.assertEqual(['Hello, world', 'Second page'],
+                         list(extract_text(filepath)))
+
+    def test02(self):
+        """Spacing, line breaks, Differences, ToUnicode, form XObjects."""
+        filepath = os.path.join(TextExtractTest.path, 'doc04.pdf')
+        self.assertEqual(['Hello world\nCafé ☺\nThird line\nFourth',
+                          'αβγ fiγ\nIn a form'],
+                         list(extract_text(filepath)))
+
+    def test03(self):
+        """Fonts and CMaps are parsed once per document."""
+        filepath = os.path.join(TextExtractTest.path, 'doc04.pdf')
+        with PdfDocument(filepath) as doc:
+            te = TextExtractor(doc)
+            list(te.pages())
+            self.assertEqual({(5, 0), (6, 0)}, set(te.fonts))
+            self.assertEqual([(12, 0)], list(te.cmaps))
+            font = te.fonts[(5, 0)]
+            self.assertIs(font, te.font(doc.get_object(2).data['Resources']
+                                        .data['Font'].data['F1']))
+            self.assertEqual(600, te.fonts[(6, 0)].widths[3])
+
+    def test04(self):
+        """The content streams and the XObjects aren't kept in the cache."""
+        filepath = os.path.join(TextExtractTest.path, 'doc04.pdf')
+        for lazy in (False, True):
+            with PdfDocument(filepath, lazy=lazy) as doc:
+                te = TextExtractor(doc)
+                self.assertEqual(2, len(list(te.pages())))
+                self.assertEqual([], [objn for objn, o in doc.core.cache.items()
+                                      if o.type == EObject.COUPLE])
+                xobjects = doc.get_object(2).data['Resources'].data['XObject']
+                sd = te.stream_dict(xobjects.data['X1'])
+                self.assertEqual(b'Form', bytes(sd.data['Subtype'].data))
+
+    def test05(self):
+        """Malformed operands, a broken font and a broken form XObject."""
+        filepath = os.path.join(TextExtractTest.path, 'doc04.pdf')
+        with PdfDocument(filepath) as doc:
+            te = TextExtractor(doc)
+            out = []
+            te._run(b'BT (F1) 12 Tf [1] Do /F1 12 Tf (x) Tj ET',
+                    doc.get_object(2).data['Resources'], out, set())
+            self.assertEqual(['x'], out)
+
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        # The font of the second page, and its form XObject
+        data = data.replace(b'6 0 obj', b'6 0 xbj')
+        data = data.replace(b'10 0 obj', b'10 0 xbj')
+        fd, filepath = tempfile.mkstemp(suffix='.pdf')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            self.assertEqual(['Hello world\nCafé ☺\nThird line\nFourth', ''],
+                             list(extract_text(filepath)))
+        finally:
+            os.remove(filepath)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)